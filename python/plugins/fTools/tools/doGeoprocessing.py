@@ -641,24 +641,21 @@ class geoprocessingThread( QThread ):
       if not useField:
         self.emit( SIGNAL( "runStatus(PyQt_PyObject)" ), 0 )
         self.emit( SIGNAL( "runRange(PyQt_PyObject)" ), ( 0, nFeat ) )
-        first = True
+        union = ftools_utils.CascadedUnion()
         for inFeat in selectionA:
           nElement += 1
           self.emit( SIGNAL( "runStatus(PyQt_PyObject)" ), nElement )
-          if first:
+          if attrs is None:
             attrs = inFeat.attributes()
-            tmpInGeom = QgsGeometry( inFeat.geometry() )
-            outFeat.setGeometry( tmpInGeom )
-            first = False
-          else:
-            tmpInGeom = QgsGeometry( inFeat.geometry() )
-            tmpOutGeom = QgsGeometry( outFeat.geometry() )
-            try:
-              tmpOutGeom = QgsGeometry( tmpOutGeom.combine( tmpInGeom ) )
-              outFeat.setGeometry( tmpOutGeom )
-            except:
-              GEOS_EXCEPT = False
-              continue
+          try:
+            union.add( inFeat.geometry() )
+          except:
+            GEOS_EXCEPT = False
+            continue
+        try:
+          outFeat.setGeometry( union.result() )
+        except:
+          GEOS_EXCEPT = False
         outFeat.setAttributes( attrs )
         writer.addFeature( outFeat )
       else:
@@ -675,18 +672,21 @@ class geoprocessingThread( QThread ):
           tempItem = unicode(atMap[self.myParam]).strip()
 
           if not (tempItem in outFeats):
-            outFeats[tempItem] = QgsGeometry(inFeat.geometry())
+            outFeats[tempItem] = ftools_utils.CascadedUnion()
             attrs[tempItem] = atMap
-          else:
-            try:
-              outFeats[tempItem] = outFeats[tempItem].combine(inFeat.geometry())
-            except:
-              GEOS_EXCEPT = False
-              continue
+          try:
+            outFeats[tempItem].add(inFeat.geometry())
+          except:
+            GEOS_EXCEPT = False
+            continue
         for k in outFeats.keys():
           feature = QgsFeature()
           feature.setAttributes(attrs[k])
-          feature.setGeometry(outFeats[k])
+          try:
+            feature.setGeometry(outFeats[k].result())
+          except:
+            GEOS_EXCEPT = False
+            continue
           writer.addFeature( feature )
     # there is no selection in input layer
     else:
@@ -694,25 +694,22 @@ class geoprocessingThread( QThread ):
       if not useField:
         self.emit( SIGNAL( "runStatus(PyQt_PyObject)" ), 0)
         self.emit( SIGNAL( "runRange(PyQt_PyObject)" ), ( 0, nFeat ) )
-        first = True
+        union = ftools_utils.CascadedUnion()
         fitA = vproviderA.getFeatures()
         while fitA.nextFeature( inFeat ):
           nElement += 1
           self.emit( SIGNAL( "runStatus(PyQt_PyObject)" ),  nElement )
-          if first:
+          if attrs is None:
             attrs = inFeat.attributes()
-            tmpInGeom = QgsGeometry( inFeat.geometry() )
-            outFeat.setGeometry( tmpInGeom )
-            first = False
-          else:
-            tmpInGeom = QgsGeometry( inFeat.geometry() )
-            tmpOutGeom = QgsGeometry( outFeat.geometry() )
-            try:
-              tmpOutGeom = QgsGeometry( tmpOutGeom.combine( tmpInGeom ) )
-              outFeat.setGeometry( tmpOutGeom )
-            except:
-              GEOS_EXCEPT = False
-              continue
+          try:
+            union.add( inFeat.geometry() )
+          except:
+            GEOS_EXCEPT = False
+            continue
+        try:
+          outFeat.setGeometry( union.result() )
+        except:
+          GEOS_EXCEPT = False
         outFeat.setAttributes( attrs )
         writer.addFeature( outFeat )
       else:
@@ -730,18 +727,21 @@ class geoprocessingThread( QThread ):
           tempItem = unicode(atMap[self.myParam]).strip()
 
           if not (tempItem in outFeats):
-            outFeats[tempItem] = QgsGeometry(inFeat.geometry())
+            outFeats[tempItem] = ftools_utils.CascadedUnion()
             attrs[tempItem] = atMap
-          else:
-            try:
-              outFeats[tempItem] = outFeats[tempItem].combine(inFeat.geometry())
-            except:
-              GEOS_EXCEPT = False
-              continue
+          try:
+            outFeats[tempItem].add(inFeat.geometry())
+          except:
+            GEOS_EXCEPT = False
+            continue
         for k in outFeats.keys():
           feature = QgsFeature()
           feature.setAttributes(attrs[k])
-          feature.setGeometry(outFeats[k])
+          try:
+            feature.setGeometry(outFeats[k].result())
+          except:
+            GEOS_EXCEPT = False
+            continue
           writer.addFeature( feature )
     del writer
     return GEOS_EXCEPT, FEATURE_EXCEPT, True, None
@@ -47,6 +47,7 @@
 # getVectorLayerByName( QgsVectorLayer.name() )
 # getFieldList( QgsVectorLayer )
 # createIndex( QgsVectorDataProvider )
+# CascadedUnion()
 # addShapeToCanvas( QString *file path )
 # getUniqueValues( QgsVectorDataProvider, int *field id )
 # saveDialog( QWidget *parent )
@@ -259,6 +260,38 @@ def createIndex( provider ):
         index.insertFeature( feat )
     return index
 
+# Computes the union of many geometries, merging them in pairs of similar
+# size instead of adding each one to a single geometry that keeps growing
+class CascadedUnion:
+    def __init__( self ):
+        # (level, geometry) tuples, a geometry at a given level is the union
+        # of 2^level added geometries
+        self.partials = []
+
+    def add( self, geom ):
+        geom = QgsGeometry( geom )
+        level = 0
+        while self.partials and self.partials[ -1 ][ 0 ] == level:
+            geom = self.combine( self.partials.pop()[ 1 ], geom )
+            level += 1
+        self.partials.append( ( level, geom ) )
+
+    # Returns the union of all added geometries, None if there are none
+    def result( self ):
+        geom = None
+        for ( level, partial ) in reversed( self.partials ):
+            if geom is None:
+                geom = partial
+            else:
+                geom = self.combine( partial, geom )
+        return geom
+
+    def combine( self, geomA, geomB ):
+        geom = geomA.combine( geomB )
+        if geom is None:
+            raise ValueError( "Geometry exception while computing union" )
+        return QgsGeometry( geom )
+
 # Convinience function to add a vector layer to canvas based on input shapefile path ( as string )
 def addShapeToCanvas( shapefile_path ):
     file_info = QFileInfo( shapefile_path )
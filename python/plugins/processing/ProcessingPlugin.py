@@ -33,6 +33,8 @@ from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from qgis.core import *
 from processing.core.Processing import Processing
+from processing.core.ProcessingLog import ProcessingLog
+from processing.core.AlgorithmStats import AlgorithmStats
 from processing.gui.ProcessingToolbox import ProcessingToolbox
 from processing.gui.HistoryDialog import HistoryDialog
 from processing.gui.ConfigDialog import ConfigDialog
@@ -115,6 +117,9 @@ class ProcessingPlugin:
     def unload(self):
         self.toolbox.setVisible(False)
         self.menu.deleteLater()
+        Processing.stopWatchingFolders()
+        ProcessingLog.stopLogging()
+        AlgorithmStats.stop()
 
         # delete temporary output files
         folder = tempFolder()
@@ -50,15 +50,15 @@ class BarPlot(GeoAlgorithm):
         namefieldname = self.getParameterValue(self.NAME_FIELD)
         valuefieldname = self.getParameterValue(self.VALUE_FIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, namefieldname,
-                                           valuefieldname)
+        values = vector.columns(layer, namefieldname, valuefieldname)
         plt.close()
 
         ind = np.arange(len(values[namefieldname]))
         width = 0.8
-        plt.bar(ind, values[valuefieldname], width, color='r')
+        plt.bar(ind, vector.numericColumn(values[valuefieldname]).filled(0),
+                width, color='r')
 
-        plt.xticks(ind, values[namefieldname], rotation=45)
+        plt.xticks(ind, values[namefieldname].tolist(), rotation=45)
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
@@ -25,6 +25,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.RasterWriter import RasterWriter
@@ -43,7 +44,7 @@ class CreateConstantRaster(GeoAlgorithm):
 
     def processAlgorithm(self, progress):
         output = self.getOutputFromName(self.OUTPUT)
-        value = self.getOutputValue(self.NUMBER)
+        value = self.getParameterValue(self.NUMBER)
         layer = dataobjects.getObjectFromUri(
             self.getParameterValue(self.INPUT))
         cellsize = (layer.extent().xMaximum() - layer.extent().xMinimum()) \
@@ -57,7 +58,13 @@ class CreateConstantRaster(GeoAlgorithm):
                          1,
                          self.crs,
                         )
-        w.matrix[:] = value
+        for y in xrange(0, w.ny, w.TILE_SIZE):
+            for x in xrange(0, w.nx, w.TILE_SIZE):
+                block = numpy.empty(w.tileShape(x / w.TILE_SIZE, y
+                                    / w.TILE_SIZE))
+                block.fill(value)
+                w.setBlock(block, x, y)
+            progress.setPercentage(int(y * 100 / w.ny))
         w.close()
 
     def defineCharacteristics(self):
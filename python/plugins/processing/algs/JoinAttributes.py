@@ -84,22 +84,25 @@ class JoinAttributes(GeoAlgorithm):
         inFeat2 = QgsFeature()
         outFeat = QgsFeature()
 
+        # Read the attributes of the second layer once, keeping the
+        # first feature with each value of the join field
+        joinAttributes = {}
+        features2 = vector.features(layer2, geometry=False)
+        for inFeat2 in features2:
+            attrs2 = inFeat2.attributes()
+            joinValue2 = vector.valueKey(attrs2[joinField2Index])
+            if joinValue2 is not None and joinValue2 not in joinAttributes:
+                joinAttributes[joinValue2] = attrs2
+
         # Create output vector layer with additional attribute
         features = vector.features(layer)
         for inFeat in features:
             inGeom = inFeat.geometry()
             attrs = inFeat.attributes()
-            joinValue1 = attrs[joinField1Index]
-            features2 = vector.features(layer2)
-            for inFeat2 in features2:
-                # Maybe it should cache this entries...
-                attrs2 = inFeat2.attributes()
-                joinValue2 = attrs2[joinField2Index]
-                if joinValue1 == joinValue2:
-                    # Create the new feature
-                    outFeat.setGeometry(inGeom)
-                    attrs.extend(attrs2)
-                    break
+            joinValue1 = vector.valueKey(attrs[joinField1Index])
+            outFeat.setGeometry(inGeom)
+            if joinValue1 in joinAttributes:
+                attrs.extend(joinAttributes[joinValue1])
             outFeat.setAttributes(attrs)
             writer.addFeature(outFeat)
         del writer
@@ -53,18 +53,19 @@ class MeanAndStdDevPlot(GeoAlgorithm):
         meanfieldname = self.getParameterValue(self.MEAN_FIELD)
         stddevfieldname = self.getParameterValue(self.STDDEV_FIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, namefieldname,
-                meanfieldname, stddevfieldname)
+        values = vector.columns(layer, namefieldname, meanfieldname,
+                                stddevfieldname)
         plt.close()
 
         ind = np.arange(len(values[namefieldname]))
         width = 0.8
-        plt.bar(ind, values[meanfieldname], width, color='r',
-                yerr=values[stddevfieldname],
+        plt.bar(ind, vector.numericColumn(values[meanfieldname]).filled(0),
+                width, color='r',
+                yerr=vector.numericColumn(values[stddevfieldname]).filled(0),
                 error_kw=dict(ecolor='yellow'),
                )
 
-        plt.xticks(ind, values[namefieldname], rotation=45)
+        plt.xticks(ind, values[namefieldname].tolist(), rotation=45)
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
@@ -68,7 +68,7 @@ class PointsDisplacement(GeoAlgorithm):
         writer = output.getVectorWriter(provider.fields(),
                 provider.geometryType(), provider.crs())
 
-        features = vector.features(layer)
+        features = vector.features(layer, attributes=[])
 
         current = 0
         total = 100.0 / len(features)
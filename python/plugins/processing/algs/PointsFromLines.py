@@ -79,7 +79,7 @@ class PointsFromLines(GeoAlgorithm):
         self.pointId = 0
 
         current = 0
-        features = vector.features(layer)
+        features = vector.features(layer, attributes=[])
         total = 100.0 / len(features)
         for f in features:
             geom = f.geometry()
@@ -62,7 +62,7 @@ class PointsLayerFromTable(GeoAlgorithm):
 
         outFeat = QgsFeature()
         nElement = 0
-        features = vector.features(vlayer)
+        features = vector.features(vlayer, geometry=False)
         nFeat = len(features)
         for feature in features:
             nElement += 1
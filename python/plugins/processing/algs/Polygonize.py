@@ -64,7 +64,7 @@ class Polygonize(GeoAlgorithm):
             fields.append(QgsField('perimeter', QVariant.Double,
                                    'double', 16, 2))
         allLinesList = []
-        features = vector.features(vlayer)
+        features = vector.features(vlayer, attributes=[])
         current = 0
         total = 40.0 / float(len(features))
         for inFeat in features:
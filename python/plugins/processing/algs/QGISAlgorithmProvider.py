@@ -183,5 +183,8 @@ class QGISAlgorithmProvider(AlgorithmProvider):
     def _loadAlgorithms(self):
         self.algs = self.alglist
 
+    def getSupportedOutputTableExtensions(self):
+        return ['csv', 'sqlite']
+
     def supportsNonFileBasedOutput(self):
         return True
@@ -25,6 +25,7 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import numpy
 import matplotlib.pyplot as plt
 import matplotlib.pylab as lab
 from PyQt4.QtCore import *
@@ -50,21 +51,37 @@ class RasterLayerHistogram(GeoAlgorithm):
         layer = dataobjects.getObjectFromUri(uri)
         outputplot = self.getOutputValue(self.PLOT)
         outputtable = self.getOutputFromName(self.TABLE)
-        values = raster.scanraster(layer, progress)
-        nbins = self.getParameterValue(self.BINS)
+        nbins = int(self.getParameterValue(self.BINS))
+
+        # Range of values is needed before counting values in each bin
+        stats = raster.RasterStatistics()
+        for (xOffset, yOffset, block) in raster.blocks(layer):
+            stats.add(block)
+        if stats.count == 0:
+            (minvalue, maxvalue) = (0, 1)
+        elif stats.min == stats.max:
+            (minvalue, maxvalue) = (stats.min - 0.5, stats.max + 0.5)
+        else:
+            (minvalue, maxvalue) = (stats.min, stats.max)
+
+        n = numpy.zeros(nbins)
+        bins = None
+        for (xOffset, yOffset, block) in raster.blocks(layer,
+                progress=progress):
+            (counts, bins) = numpy.histogram(block.compressed(), nbins,
+                    (minvalue, maxvalue))
+            n += counts
+        if bins is None:
+            bins = numpy.linspace(minvalue, maxvalue, nbins + 1)
 
-        # ALERT: this is potentially blocking if the layer is too big
         plt.close()
-        valueslist = []
-        for v in values:
-            if v is not None:
-                valueslist.append(v)
-        (n, bins, values) = plt.hist(valueslist, nbins)
+        plt.bar(bins[:-1], n, numpy.diff(bins))
         fields = [QgsField('CENTER_VALUE', QVariant.Double),
                   QgsField('NUM_ELEM', QVariant.Double)]
         writer = outputtable.getTableWriter(fields)
-        for i in xrange(len(values)):
+        for i in xrange(nbins):
             writer.addRecord([str(bins[i]) + '-' + str(bins[i + 1]), n[i]])
+        writer.close()
         plotFilename = outputplot + '.png'
         lab.savefig(plotFilename)
         f = open(outputplot, 'w')
@@ -25,7 +25,6 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-import math
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -53,34 +52,19 @@ class RasterLayerStatistics(GeoAlgorithm):
         outputFile = self.getOutputValue(self.OUTPUT_HTML_FILE)
         uri = self.getParameterValue(self.INPUT)
         layer = dataobjects.getObjectFromUri(uri)
-        values = raster.scanraster(layer, progress)
-
-        n = 0
-        nodata = 0
-        mean = 0
-        M2 = 0
-        sum = 0
-        minvalue = None
-        maxvalue = None
-
-        for v in values:
-            if v is not None:
-                sum += v
-                n = n + 1
-                delta = v - mean
-                mean = mean + delta / n
-                M2 = M2 + delta * (v - mean)
-                if minvalue is None:
-                    minvalue = v
-                    maxvalue = v
-                else:
-                    minvalue = min(v, minvalue)
-                    maxvalue = max(v, maxvalue)
-            else:
-                nodata += 1
-
-        variance = M2 / (n - 1)
-        stddev = math.sqrt(variance)
+
+        stats = raster.RasterStatistics()
+        for (xOffset, yOffset, block) in raster.blocks(layer,
+                progress=progress):
+            stats.add(block)
+
+        n = stats.count
+        nodata = stats.nodata
+        sum = stats.sum
+        mean = stats.mean
+        minvalue = stats.min
+        maxvalue = stats.max
+        stddev = stats.std()
 
         data = []
         data.append('Valid cells: ' + unicode(n))
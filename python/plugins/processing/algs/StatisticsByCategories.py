@@ -70,7 +70,8 @@ class StatisticsByCategories(GeoAlgorithm):
         valuesField = layer.fieldNameIndex(valuesFieldName)
         categoriesField = layer.fieldNameIndex(categoriesFieldName)
 
-        features = vector.features(layer)
+        features = vector.features(layer, attributes=[valuesField,
+                                   categoriesField], geometry=False)
         nFeats = len(features)
         values = {}
         nFeat = 0
@@ -93,6 +94,7 @@ class StatisticsByCategories(GeoAlgorithm):
             (min, max, mean, stddev) = calculateStats(v)
             record = [cat, min, max, mean, stddev]
             writer.addRecord(record)
+        writer.close()
 
 
 def calculateStats(values):
@@ -49,10 +49,10 @@ class VectorLayerHistogram(GeoAlgorithm):
         layer = getObjectFromUri(uri)
         fieldname = self.getParameterValue(self.FIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, fieldname)
+        values = vector.numericColumns(layer, fieldname)
         plt.close()
         bins = self.getParameterValue(self.BINS)
-        plt.hist(values[fieldname], bins)
+        plt.hist(values[fieldname].compressed(), bins)
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
@@ -50,10 +50,13 @@ class VectorLayerScatterplot(GeoAlgorithm):
         xfieldname = self.getParameterValue(self.YFIELD)
         yfieldname = self.getParameterValue(self.XFIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, xfieldname, yfieldname)
+        values = vector.numericColumns(layer, xfieldname, yfieldname)
         plt.close()
 
-        plt.scatter(values[xfieldname], values[yfieldname])
+        # Only features with both values are plotted
+        valid = ~(values[xfieldname].mask | values[yfieldname].mask)
+        plt.scatter(values[xfieldname].data[valid],
+                    values[yfieldname].data[valid])
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
@@ -36,7 +36,8 @@ from processing.parameters.ParameterString import ParameterString
 from processing.parameters.ParameterNumber import ParameterNumber
 from processing.parameters.ParameterBoolean import ParameterBoolean
 from processing.outputs.OutputVector import OutputVector
-from processing.tools.raster import mapToPixel
+from processing.tools.raster import ZoneStatistics, applyGeoTransform, \
+        invertGeoTransform
 from processing.tools import dataobjects, vector
 
 
@@ -49,6 +50,10 @@ class ZonalStatistics(GeoAlgorithm):
     GLOBAL_EXTENT = 'GLOBAL_EXTENT'
     OUTPUT_LAYER = 'OUTPUT_LAYER'
 
+    # Size, in pixels, of the blocks the raster is read in, unless the
+    # whole raster is loaded in memory
+    TILE_SIZE = 1024
+
     def defineCharacteristics(self):
         self.name = 'Zonal Statistics'
         self.group = 'Raster tools'
@@ -73,52 +78,20 @@ class ZonalStatistics(GeoAlgorithm):
         bandNumber = self.getParameterValue(self.RASTER_BAND)
         columnPrefix = self.getParameterValue(self.COLUMN_PREFIX)
         useGlobalExtent = self.getParameterValue(self.GLOBAL_EXTENT)
+        tileSize = self.TILE_SIZE
 
         rasterDS = gdal.Open(rasterPath, gdal.GA_ReadOnly)
         geoTransform = rasterDS.GetGeoTransform()
         rasterBand = rasterDS.GetRasterBand(bandNumber)
         noData = rasterBand.GetNoDataValue()
 
-        cellXSize = abs(geoTransform[1])
-        cellYSize = abs(geoTransform[5])
         rasterXSize = rasterDS.RasterXSize
         rasterYSize = rasterDS.RasterYSize
-
-        rasterBBox = QgsRectangle(geoTransform[0], geoTransform[3] - cellYSize
-                                  * rasterYSize, geoTransform[0] + cellXSize
-                                  * rasterXSize, geoTransform[3])
-
-        rasterGeom = QgsGeometry.fromRect(rasterBBox)
-
-        crs = osr.SpatialReference()
-        crs.ImportFromProj4(str(layer.crs().toProj4()))
-
         if useGlobalExtent:
-            xMin = rasterBBox.xMinimum()
-            xMax = rasterBBox.xMaximum()
-            yMin = rasterBBox.yMinimum()
-            yMax = rasterBBox.yMaximum()
-
-            (startColumn, startRow) = mapToPixel(xMin, yMax, geoTransform)
-            (endColumn, endRow) = mapToPixel(xMax, yMin, geoTransform)
-
-            width = endColumn - startColumn
-            height = endRow - startRow
-
-            srcOffset = (startColumn, startRow, width, height)
-            srcArray = rasterBand.ReadAsArray(*srcOffset)
-
-            newGeoTransform = (
-                geoTransform[0] + srcOffset[0] * geoTransform[1],
-                geoTransform[1],
-                0.0,
-                geoTransform[3] + srcOffset[1] * geoTransform[5],
-                0.0,
-                geoTransform[5],
-                )
-
-        memVectorDriver = ogr.GetDriverByName('Memory')
-        memRasterDriver = gdal.GetDriverByName('MEM')
+            tileSize = max(rasterXSize, rasterYSize)
+        tileColumns = (rasterXSize + tileSize - 1) / tileSize
+        tileRows = (rasterYSize + tileSize - 1) / tileSize
+        inverseTransform = invertGeoTransform(geoTransform)
 
         fields = layer.pendingFields()
         (idxMin, fields) = vector.findOrCreateField(layer, fields,
@@ -139,101 +112,164 @@ class ZonalStatistics(GeoAlgorithm):
                 columnPrefix + 'range', 21, 6)
         (idxCV, fields) = vector.findOrCreateField(layer, fields, columnPrefix
                 + 'cv', 21, 6)
-
-        # idxMedian, fields = ftools_utils.findOrCreateField(layer, fields,
-        #        columnPrefix + "median", 21, 6)
+        (idxMedian, fields) = vector.findOrCreateField(layer, fields,
+                columnPrefix + 'median', 21, 6)
 
         writer = self.getOutputFromName(
                 self.OUTPUT_LAYER).getVectorWriter(fields.toList(),
                         layer.dataProvider().geometryType(), layer.crs())
 
-        outFeat = QgsFeature()
-
-        outFeat.initAttributes(len(fields))
-        outFeat.setFields(fields)
-
-        current = 0
-        features = vector.features(layer)
-        total = 100.0 / len(features)
-        for f in features:
-            geom = f.geometry()
-
-            intersectedGeom = rasterGeom.intersection(geom)
-            ogrGeom = ogr.CreateGeometryFromWkt(intersectedGeom.exportToWkt())
-
-            if not useGlobalExtent:
-                bbox = intersectedGeom.boundingBox()
-
-                xMin = bbox.xMinimum()
-                xMax = bbox.xMaximum()
-                yMin = bbox.yMinimum()
-                yMax = bbox.yMaximum()
-
-                (startColumn, startRow) = mapToPixel(xMin, yMax, geoTransform)
-                (endColumn, endRow) = mapToPixel(xMax, yMin, geoTransform)
-
-                width = endColumn - startColumn
-                height = endRow - startRow
+        crs = osr.SpatialReference()
+        crs.ImportFromProj4(str(layer.crs().toProj4()))
 
-                if width == 0 or height == 0:
+        # Zones are rasterized as a grid of labels, so a pixel can only
+        # belong to one zone in each grid. Overlapping zones are given
+        # different colors, and each color is rasterized separately.
+        index = vector.indexedlayer(layer)
+        fids = index.ids()
+        zones = {}
+        colors = {}
+        lastTile = {}
+        numColors = 0
+        for (zone, fid) in enumerate(fids):
+            zones[fid] = zone
+            geom = index.geometry(fid)
+            if geom is None:
+                continue
+            bbox = geom.boundingBox()
+            used = set()
+            for other in index.intersects(bbox):
+                if other not in colors or colors[other] in used:
                     continue
+                otherGeom = index.geometry(other)
+                if geom.intersects(otherGeom) \
+                        and not geom.touches(otherGeom):
+                    used.add(colors[other])
+            color = 0
+            while color in used:
+                color += 1
+            colors[fid] = color
+            numColors = max(numColors, color + 1)
+
+            # Values of the zone are complete once the last tile
+            # touching its bounding box has been read
+            corners = [applyGeoTransform(x, y, inverseTransform) for (x,
+                       y) in [(bbox.xMinimum(), bbox.yMinimum()),
+                       (bbox.xMinimum(), bbox.yMaximum()), (bbox.xMaximum(),
+                       bbox.yMinimum()), (bbox.xMaximum(), bbox.yMaximum())]]
+            column = max(0, min(rasterXSize - 1, int(max(c[0] for c in
+                         corners))))
+            row = max(0, min(rasterYSize - 1, int(max(c[1] for c in
+                      corners))))
+            tile = row / tileSize * tileColumns + column / tileSize
+            lastTile.setdefault(tile, []).append(zone)
 
-                srcOffset = (startColumn, startRow, width, height)
-                srcArray = rasterBand.ReadAsArray(*srcOffset)
+        memVectorDriver = ogr.GetDriverByName('Memory')
+        memRasterDriver = gdal.GetDriverByName('MEM')
 
-                newGeoTransform = (
-                    geoTransform[0] + srcOffset[0] * geoTransform[1],
+        statistics = ZoneStatistics(len(fids))
+        total = 100.0 / (tileRows * tileColumns + 1)
+        for tileRow in xrange(tileRows):
+            for tileColumn in xrange(tileColumns):
+                xOffset = tileColumn * tileSize
+                yOffset = tileRow * tileSize
+                width = min(tileSize, rasterXSize - xOffset)
+                height = min(tileSize, rasterYSize - yOffset)
+                (tileX, tileY) = applyGeoTransform(xOffset, yOffset,
+                        geoTransform)
+                tileGeoTransform = (
+                    tileX,
                     geoTransform[1],
-                    0.0,
-                    geoTransform[3] + srcOffset[1] * geoTransform[5],
-                    0.0,
+                    geoTransform[2],
+                    tileY,
+                    geoTransform[4],
                     geoTransform[5],
                     )
+                corners = [applyGeoTransform(x, y, tileGeoTransform)
+                           for (x, y) in [(0, 0), (0, height), (width, 0),
+                           (width, height)]]
+                tileRect = QgsRectangle(min(c[0] for c in corners),
+                        min(c[1] for c in corners), max(c[0] for c in
+                        corners), max(c[1] for c in corners))
+
+                memVDS = memVectorDriver.CreateDataSource('out')
+                memLayers = [None] * numColors
+                for fid in index.intersects(tileRect):
+                    if fid not in colors:
+                        continue
+                    color = colors[fid]
+                    if memLayers[color] is None:
+                        memLayers[color] = memVDS.CreateLayer('zones%i'
+                                % color, crs, ogr.wkbPolygon)
+                        memLayers[color].CreateField(ogr.FieldDefn('zone',
+                                ogr.OFTInteger))
+                    ft = ogr.Feature(memLayers[color].GetLayerDefn())
+                    ft.SetGeometry(ogr.CreateGeometryFromWkb(
+                            index.geometry(fid).asWkb()))
+                    ft.SetField('zone', zones[fid] + 1)
+                    memLayers[color].CreateFeature(ft)
+                    ft.Destroy()
+
+                srcArray = None
+                for memLayer in memLayers:
+                    if memLayer is None:
+                        continue
+                    if srcArray is None:
+                        srcArray = rasterBand.ReadAsArray(xOffset, yOffset,
+                                width, height).astype(numpy.float64)
+                        valid = numpy.isfinite(srcArray)
+                        if noData is not None:
+                            valid &= srcArray != noData
+
+                    # Rasterize the zones, using zone + 1 as label
+                    rasterizedDS = memRasterDriver.Create('', width, height,
+                            1, gdal.GDT_Int32)
+                    rasterizedDS.SetGeoTransform(tileGeoTransform)
+                    gdal.RasterizeLayer(rasterizedDS, [1], memLayer,
+                                        options=['ATTRIBUTE=zone'])
+                    labels = rasterizedDS.ReadAsArray()
+                    rasterizedDS = None
+
+                    mask = valid & (labels > 0)
+                    statistics.add(labels[mask] - 1, srcArray[mask])
+
+                memLayers = None
+                memVDS = None
+
+                tile = tileRow * tileColumns + tileColumn
+                for zone in lastTile.pop(tile, []):
+                    statistics.finish(zone)
+                progress.setPercentage(int((tile + 1) * total))
 
-            # Create a temporary vector layer in memory
-            memVDS = memVectorDriver.CreateDataSource('out')
-            memLayer = memVDS.CreateLayer('poly', crs, ogr.wkbPolygon)
-
-            ft = ogr.Feature(memLayer.GetLayerDefn())
-            ft.SetGeometry(ogrGeom)
-            memLayer.CreateFeature(ft)
-            ft.Destroy()
-
-            # Rasterize it
-            rasterizedDS = memRasterDriver.Create('', srcOffset[2],
-                    srcOffset[3], 1, gdal.GDT_Byte)
-            rasterizedDS.SetGeoTransform(newGeoTransform)
-            gdal.RasterizeLayer(rasterizedDS, [1], memLayer, burn_values=[1])
-            rasterizedArray = rasterizedDS.ReadAsArray()
-
-            srcArray = numpy.nan_to_num(srcArray)
-            masked = numpy.ma.MaskedArray(srcArray,
-                    mask=numpy.logical_or(srcArray == noData,
-                    numpy.logical_not(rasterizedArray)))
-
-            outFeat.setGeometry(geom)
-
-            attrs = f.attributes()
-            attrs.insert(idxMin, float(masked.min()))
-            attrs.insert(idxMax, float(masked.max()))
-            attrs.insert(idxSum, float(masked.sum()))
-            attrs.insert(idxCount, int(masked.count()))
-            attrs.insert(idxMean, float(masked.mean()))
-            attrs.insert(idxStd, float(masked.std()))
-            attrs.insert(idxUnique, numpy.unique(masked.compressed()).size)
-            attrs.insert(idxRange, float(masked.max()) - float(masked.min()))
-            attrs.insert(idxCV, float(masked.var()))
-            # attrs.insert(idxMedian, float(masked.median()))
+        rasterDS = None
 
+        outFeat = QgsFeature()
+        outFeat.initAttributes(len(fields))
+        outFeat.setFields(fields)
+
+        for (zone, fid) in enumerate(fids):
+            feat = index.feature(fid)
+            outFeat.setGeometry(feat.geometry())
+            attrs = feat.attributes()
+            attrs.extend([None] * (len(fields) - len(attrs)))
+            stats = statistics.statistics(zone)
+            if stats is not None:
+                attrs[idxMin] = stats['min']
+                attrs[idxMax] = stats['max']
+                attrs[idxSum] = stats['sum']
+                attrs[idxCount] = stats['count']
+                attrs[idxMean] = stats['mean']
+                attrs[idxStd] = stats['std']
+                attrs[idxUnique] = stats['unique']
+                attrs[idxRange] = stats['range']
+                attrs[idxCV] = stats['var']
+                attrs[idxMedian] = stats['median']
+            else:
+                attrs[idxCount] = 0
+                attrs[idxUnique] = 0
             outFeat.setAttributes(attrs)
             writer.addFeature(outFeat)
 
-            memVDS = None
-            rasterizedDS = None
-
-            current += 1
-            progress.setPercentage(int(current * total))
-
-        rasterDS = None
+        progress.setPercentage(100)
 
         del writer
@@ -25,7 +25,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-import math
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -96,52 +96,27 @@ class BasicStatisticsNumbers(GeoAlgorithm):
         medianValue = 0
         stdDevValue = 0
 
-        isFirst = True
-        values = []
-
-        features = vector.features(layer)
-        count = len(features)
-        total = 100.0 / float(count)
-        current = 0
-        for ft in features:
-            value = float(ft.attributes()[index])
-            if isFirst:
-                minValue = value
-                maxValue = value
-                isFirst = False
-            else:
-                if value < minValue:
-                    minValue = value
-                if value > maxValue:
-                    maxValue = value
-
-            values.append(value)
-            sumValue += value
-
-            current += 1
-            progress.setPercentage(int(current * total))
-
-        # Calculate additional values
-        rValue = maxValue - minValue
-        uniqueValue = vector.getUniqueValuesCount(layer, index)
+        # Values are read in a single pass. Null values and those that
+        # are not numbers are ignored
+        values = vector.numericColumns(layer, index)[index].compressed()
+        count = len(values)
+        uniqueValue = len(numpy.unique(values))
 
         if count > 0:
+            minValue = float(values.min())
+            maxValue = float(values.max())
+            sumValue = float(values.sum())
             meanValue = sumValue / count
             if meanValue != 0.00:
-                for v in values:
-                    stdDevValue += (v - meanValue) * (v - meanValue)
-                stdDevValue = math.sqrt(stdDevValue / count)
+                stdDevValue = float(values.std())
                 cvValue = stdDevValue / meanValue
 
+        rValue = maxValue - minValue
+
         if count > 1:
-            tmp = values
-            tmp.sort()
-
-            # Calculate median
-            if count % 2 == 0:
-                medianValue = 0.5 * (tmp[(count - 1) / 2] + tmp[count / 2])
-            else:
-                medianValue = tmp[(count + 1) / 2 - 1]
+            medianValue = float(numpy.median(values))
+
+        progress.setPercentage(100)
 
         data = []
         data.append('Count: ' + unicode(count))
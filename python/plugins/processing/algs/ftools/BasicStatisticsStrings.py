@@ -26,6 +26,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import codecs
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -89,42 +90,24 @@ class BasicStatisticsStrings(GeoAlgorithm):
         countEmpty = 0
         countFilled = 0
 
-        isFirst = True
-        values = []
-
-        features = vector.features(layer)
-        count = len(features)
-        total = 100.0 / float(count)
-        current = 0
-        for ft in features:
-            length = float(len(ft.attributes()[index]))
-
-            if isFirst:
-                minValue = length
-                maxValue = length
-                isFirst = False
-            else:
-                if length < minValue:
-                    minValue = length
-                if length > maxValue:
-                    maxValue = length
-
-            if length != 0.00:
-                countFilled += 1
-            else:
-                countEmpty += 1
-
-            values.append(length)
-            sumValue += length
-
-            current += 1
-            progress.setPercentage(int(current * total))
-
-        n = float(len(values))
-        if n > 0:
-            meanValue = sumValue / n
-
-        uniqueValues = vector.getUniqueValuesCount(layer, index)
+        # Values are read in a single pass. Null values are counted as
+        # empty strings
+        values = vector.columns(layer, index)[index]
+        count = len(values)
+        lengths = numpy.array([(0 if v is None else len(unicode(v))) for v
+                              in values.tolist()], dtype=float)
+
+        if count > 0:
+            minValue = float(lengths.min())
+            maxValue = float(lengths.max())
+            sumValue = float(lengths.sum())
+            meanValue = sumValue / count
+        countFilled = int((lengths != 0).sum())
+        countEmpty = count - countFilled
+
+        uniqueValues = len(set(vector.valueKey(v) for v in values.tolist()))
+
+        progress.setPercentage(100)
 
         data = []
         data.append('Minimum length: ' + unicode(minValue))
@@ -47,7 +47,7 @@ def buffering(progress, writer, distance, field, useField, layer, dissolve,
 
     # With dissolve
     if dissolve:
-        first = True
+        union = vector.CascadedUnion()
         for inFeat in features:
             attrs = inFeat.attributes()
             if useField:
@@ -57,16 +57,12 @@ def buffering(progress, writer, distance, field, useField, layer, dissolve,
 
             inGeom = QgsGeometry(inFeat.geometry())
             outGeom = inGeom.buffer(float(value), segments)
-            if first:
-                tempGeom = QgsGeometry(outGeom)
-                first = False
-            else:
-                tempGeom = tempGeom.combine(outGeom)
+            union.add(outGeom)
 
             current += 1
             progress.setPercentage(int(current * total))
 
-        outFeat.setGeometry(tempGeom)
+        outFeat.setGeometry(union.result())
         outFeat.setAttributes(attrs)
         writer.addFeature(outFeat)
     else:
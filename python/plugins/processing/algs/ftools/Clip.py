@@ -61,12 +61,12 @@ class Clip(GeoAlgorithm):
                 layerA.dataProvider().crs())
 
         inFeatA = QgsFeature()
-        inFeatB = QgsFeature()
         outFeat = QgsFeature()
 
-        index = vector.spatialindex(layerB)
+        index = vector.indexedlayer(layerB, attributes=[])
 
-        selectionA = vector.features(layerA)
+        # Features outside the extent of the clip layer are not read
+        selectionA = vector.features(layerA, rect=index.extent())
 
         current = 0
         total = 100.0 / float(len(selectionA))
@@ -75,57 +75,46 @@ class Clip(GeoAlgorithm):
             geom = QgsGeometry(inFeatA.geometry())
             attrs = inFeatA.attributes()
             intersects = index.intersects(geom.boundingBox())
-            first = True
             found = False
-            if len(intersects) > 0:
-                for i in intersects:
-                    layerB.getFeatures(
-                            QgsFeatureRequest().setFilterFid(i)).nextFeature(
-                                    inFeatB)
-                    tmpGeom = QgsGeometry(inFeatB.geometry())
-                    if tmpGeom.intersects(geom):
-                        found = True
-                        if first:
-                            outFeat.setGeometry(QgsGeometry(tmpGeom))
-                            first = False
-                        else:
-                            try:
-                                cur_geom = QgsGeometry(outFeat.geometry())
-                                new_geom = QgsGeometry(
-                                        cur_geom.combine(tmpGeom))
-                                outFeat.setGeometry(QgsGeometry(new_geom))
-                            except:
-                                ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
-                                        'GEOS geoprocessing error: One or \
-                                        more input features have invalid \
-                                        geometry.'
-                                        )
-                                break
-                if found:
+            union = vector.CascadedUnion()
+            for i in intersects:
+                tmpGeom = index.geometry(i)
+                if tmpGeom.intersects(geom):
+                    found = True
                     try:
-                        cur_geom = QgsGeometry(outFeat.geometry())
-                        new_geom = QgsGeometry(geom.intersection(cur_geom))
-                        if new_geom.wkbType() == 0:
-                            int_com = QgsGeometry(geom.combine(cur_geom))
-                            int_sym = QgsGeometry(geom.symDifference(cur_geom))
-                            new_geom = QgsGeometry(int_com.difference(int_sym))
-                        try:
-                            outFeat.setGeometry(new_geom)
-                            outFeat.setAttributes(attrs)
-                            writer.addFeature(outFeat)
-                        except:
-                            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
-                                    'Feature geometry error: One or more \
-                                     output features ignored due to invalid \
-                                     geometry.'
-                                    )
-                            continue
+                        union.add(tmpGeom)
+                    except ValueError:
+                        ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
+                                'GEOS geoprocessing error: One or \
+                                more input features have invalid \
+                                geometry.'
+                                )
+                        break
+            if found:
+                try:
+                    cur_geom = union.result()
+                    new_geom = QgsGeometry(geom.intersection(cur_geom))
+                    if new_geom.wkbType() == 0:
+                        int_com = QgsGeometry(geom.combine(cur_geom))
+                        int_sym = QgsGeometry(geom.symDifference(cur_geom))
+                        new_geom = QgsGeometry(int_com.difference(int_sym))
+                    try:
+                        outFeat.setGeometry(new_geom)
+                        outFeat.setAttributes(attrs)
+                        writer.addFeature(outFeat)
                     except:
                         ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
-                                'GEOS geoprocessing error: One or more input \
-                                features have invalid geometry.'
+                                'Feature geometry error: One or more \
+                                 output features ignored due to invalid \
+                                 geometry.'
                                 )
                         continue
+                except:
+                    ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
+                            'GEOS geoprocessing error: One or more input \
+                            features have invalid geometry.'
+                            )
+                    continue
 
             current += 1
             progress.setPercentage(int(current * total))
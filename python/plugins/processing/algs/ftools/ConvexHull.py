@@ -106,7 +106,7 @@ class ConvexHull(GeoAlgorithm):
             for i in unique:
                 hull = []
                 first = True
-                features = vector.features(layer)
+                features = vector.features(layer, attributes=[index])
                 for f in features:
                     idVar = f[fieldName]
                     if unicode(idVar).strip() == unicode(i).strip:
@@ -134,7 +134,7 @@ class ConvexHull(GeoAlgorithm):
         else:
             hull = []
             total = 100.0 / float(layer.featureCount())
-            features = vector.features(layer)
+            features = vector.features(layer, attributes=[])
             for f in features:
                 inGeom = QgsGeometry(f.geometry())
                 points = vector.extractPoints(inGeom)
@@ -66,7 +66,7 @@ class Delaunay(GeoAlgorithm):
         ptDict = {}
         ptNdx = -1
         c = voronoi.Context()
-        features = vector.features(layer)
+        features = vector.features(layer, attributes=[])
         for inFeat in features:
             geom = QgsGeometry(inFeat.geometry())
             point = geom.asPoint()
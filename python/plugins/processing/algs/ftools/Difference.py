@@ -71,10 +71,9 @@ class Difference(GeoAlgorithm):
                         layerA.dataProvider().crs())
 
         inFeatA = QgsFeature()
-        inFeatB = QgsFeature()
         outFeat = QgsFeature()
 
-        index = vector.spatialindex(layerB)
+        index = vector.indexedlayer(layerB, attributes=[])
 
         selectionA = vector.features(layerA)
 
@@ -88,9 +87,7 @@ class Difference(GeoAlgorithm):
             attrs = inFeatA.attributes()
             intersections = index.intersects(geom.boundingBox())
             for i in intersections:
-                request = QgsFeatureRequest().setFilterFid(i)
-                inFeatB = layerB.getFeatures(request).next()
-                tmpGeom = QgsGeometry(inFeatB.geometry())
+                tmpGeom = index.geometry(i)
                 try:
                     if diff_geom.intersects(tmpGeom):
                         diff_geom = QgsGeometry(diff_geom.difference(tmpGeom))
@@ -63,62 +63,18 @@ class Dissolve(GeoAlgorithm):
                                                  vproviderA.geometryType(),
                                                  vproviderA.crs())
         outFeat = QgsFeature()
-        nElement = 0
-        nFeat = vproviderA.featureCount()
+        features = vector.features(vlayerA)
         if not useField:
-            first = True
-            features = vector.features(vlayerA)
-            for inFeat in features:
-                nElement += 1
-                progress.setPercentage(int(nElement / nFeat * 100))
-                if first:
-                    attrs = inFeat.attributes()
-                    tmpInGeom = QgsGeometry(inFeat.geometry())
-                    outFeat.setGeometry(tmpInGeom)
-                    first = False
-                else:
-                    tmpInGeom = QgsGeometry(inFeat.geometry())
-                    tmpOutGeom = QgsGeometry(outFeat.geometry())
-                    try:
-                        tmpOutGeom = QgsGeometry(tmpOutGeom.combine(tmpInGeom))
-                        outFeat.setGeometry(tmpOutGeom)
-                    except:
-                        raise GeoAlgorithmExecutionException(
-                                'Geometry exception while dissolving')
-                    outFeat.setAttributes(attrs)
-                    writer.addFeature(outFeat)
-        else:
-            unique = vector.getUniqueValues(vlayerA, int(field))
-            nFeat = nFeat * len(unique)
-            for item in unique:
-                first = True
-                add = True
-                features = vector.features(vlayerA)
-                for inFeat in features:
-                    nElement += 1
-                    progress.setPercentage(int(nElement / nFeat * 100))
-                    atMap = inFeat.attributes()
-                    tempItem = atMap[field]
-                    if unicode(tempItem).strip() == unicode(item).strip():
-                        if first:
-                            QgsGeometry(inFeat.geometry())
-                            tmpInGeom = QgsGeometry(inFeat.geometry())
-                            outFeat.setGeometry(tmpInGeom)
-                            first = False
-                            attrs = inFeat.attributes()
-                        else:
-                            tmpInGeom = QgsGeometry(inFeat.geometry())
-                            tmpOutGeom = QgsGeometry(outFeat.geometry())
-                            try:
-                                tmpOutGeom = QgsGeometry(
-                                        tmpOutGeom.combine(tmpInGeom))
-                                outFeat.setGeometry(tmpOutGeom)
-                            except:
-                                raise GeoAlgorithmExecutionException(
-                                        'Geometry exception while dissolving')
-                if add:
-                    outFeat.setAttributes(attrs)
-                    writer.addFeature(outFeat)
+            field = None
+        try:
+            groups = vector.dissolve(features, field, progress)
+        except ValueError:
+            raise GeoAlgorithmExecutionException(
+                    'Geometry exception while dissolving')
+        for (attrs, geom) in groups:
+            outFeat.setGeometry(geom)
+            outFeat.setAttributes(attrs)
+            writer.addFeature(outFeat)
         del writer
 
     def defineCharacteristics(self):
@@ -272,7 +272,10 @@ class Eliminate(GeoAlgorithm):
                 # End while fit
 
                 if mergeWithFid is not None:
-                    # A successful candidate
+                    # A successful candidate. The geometry is changed
+                    # right away, since the polygons eliminated next
+                    # choose their neighbour by its current area or
+                    # shared boundary
                     newGeom = mergeWithGeom.combine(geom2Eliminate)
 
                     if inLayer.changeGeometry(mergeWithFid, newGeom):
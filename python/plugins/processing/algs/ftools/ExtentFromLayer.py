@@ -121,7 +121,7 @@ class ExtentFromLayer(GeoAlgorithm):
 
     def featureExtent(self, layer, writer, progress):
         current = 0
-        features = vector.features(layer)
+        features = vector.features(layer, attributes=[])
         total = 100.0 / float(len(features))
         feat = QgsFeature()
         for f in features:
@@ -54,31 +54,30 @@ class ExtractByLocation(GeoAlgorithm):
         layer = dataobjects.getObjectFromUri(filename)
         filename = self.getParameterValue(self.INTERSECT)
         selectLayer = dataobjects.getObjectFromUri(filename)
-        index = vector.spatialindex(layer)
+        index = vector.indexedlayer(layer)
 
         geom = QgsGeometry()
-        selectedSet = []
+        selectedSet = set()
         current = 0
-        features = vector.features(selectLayer)
-        featureCount = len(features)
+        features = vector.features(selectLayer, attributes=[],
+                                   rect=index.extent())
         total = 100.0 / float(len(features))
         for current,f in enumerate(features):
             geom = QgsGeometry(f.geometry())
             intersects = index.intersects(geom.boundingBox())
             for i in intersects:
-                request = QgsFeatureRequest().setFilterFid(i)
-                feat = layer.getFeatures(request).next()
-                tmpGeom = QgsGeometry(feat.geometry())
-                if geom.intersects(tmpGeom):
-                    selectedSet.append(feat.id())
+                if i in selectedSet:
+                    continue
+                if geom.intersects(index.geometry(i)):
+                    selectedSet.add(i)
             progress.setPercentage(int(current * total))
 
         output = self.getOutputFromName(self.OUTPUT)
         writer = output.getVectorWriter(layer.fields(),
                 layer.geometryType(), layer.crs())
 
-        for (i, feat) in enumerate(features):
-            if feat.id() in selectedSet:
-                writer.addFeature(feat)
-            progress.setPercentage(100 * i / float(featureCount))
+        selectedSet = sorted(selectedSet)
+        for (i, fid) in enumerate(selectedSet):
+            writer.addFeature(index.feature(fid))
+            progress.setPercentage(100 * i / float(len(selectedSet)))
         del writer
@@ -51,11 +51,11 @@ class Intersection(GeoAlgorithm):
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fields,
                 vproviderA.geometryType(), vproviderA.crs())
         inFeatA = QgsFeature()
-        inFeatB = QgsFeature()
         outFeat = QgsFeature()
-        index = vector.spatialindex(vlayerB)
+        index = vector.indexedlayer(vlayerB)
         nElement = 0
-        selectionA = vector.features(vlayerA)
+        # Features outside the extent of the other layer are not read
+        selectionA = vector.features(vlayerA, rect=index.extent())
         nFeat = len(selectionA)
         for inFeatA in selectionA:
             nElement += 1
@@ -64,11 +64,9 @@ class Intersection(GeoAlgorithm):
             atMapA = inFeatA.attributes()
             intersects = index.intersects(geom.boundingBox())
             for i in intersects:
-                request = QgsFeatureRequest().setFilterFid(i)
-                inFeatB = vlayerB.getFeatures(request).next()
-                tmpGeom = QgsGeometry(inFeatB.geometry())
+                tmpGeom = index.geometry(i)
                 if geom.intersects(tmpGeom):
-                    atMapB = inFeatB.attributes()
+                    atMapB = index.attributeValues(i)
                     int_geom = QgsGeometry(geom.intersection(tmpGeom))
                     if int_geom.wkbType() == 7:
                         int_com = geom.combine(tmpGeom)
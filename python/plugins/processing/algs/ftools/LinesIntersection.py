@@ -75,15 +75,15 @@ class LinesIntersection(GeoAlgorithm):
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fieldList,
                 QGis.WKBPoint, layerA.dataProvider().crs())
 
-        spatialIndex = vector.spatialindex(layerB)
+        spatialIndex = vector.indexedlayer(layerB)
 
         inFeatA = QgsFeature()
-        inFeatB = QgsFeature()
         outFeat = QgsFeature()
         inGeom = QgsGeometry()
         tmpGeom = QgsGeometry()
 
-        features = vector.features(layerA)
+        # Lines outside the extent of the other layer are not read
+        features = vector.features(layerA, rect=spatialIndex.extent())
 
         current = 0
         total = 100.0 / float(len(features))
@@ -99,13 +99,11 @@ class LinesIntersection(GeoAlgorithm):
 
             if hasIntersections:
                 for i in lines:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    inFeatB = layerB.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(inFeatB.geometry())
+                    tmpGeom = spatialIndex.geometry(i)
 
                     points = []
                     attrsA = inFeatA.attributes()
-                    attrsB = inFeatB.attributes()
+                    attrsB = spatialIndex.attributeValues(i)
 
                     if inGeom.intersects(tmpGeom):
                         tempGeom = inGeom.intersection(tmpGeom)
@@ -75,7 +75,8 @@ class MeanCoords(GeoAlgorithm):
                                              QGis.WKBPoint, layer.crs())
 
         current = 0
-        features = vector.features(layer)
+        features = vector.features(layer, attributes=[i for i in
+                                   (uniqueIndex, weightIndex) if i >= 0])
         total = 100.0 / float(len(features))
 
         means = {}
@@ -26,12 +26,16 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import math
+import numpy
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
 from processing.parameters.ParameterVector import ParameterVector
 from processing.outputs.OutputHTML import OutputHTML
 from processing.outputs.OutputNumber import OutputNumber
 from processing.tools import dataobjects, vector
+from processing.tools.kdtree import KDTree
 
 
 class NearestNeighbourAnalysis(GeoAlgorithm):
@@ -73,29 +77,27 @@ class NearestNeighbourAnalysis(GeoAlgorithm):
                 self.getParameterValue(self.POINTS))
         output = self.getOutputValue(self.OUTPUT)
 
-        spatialIndex = vector.spatialindex(layer)
+        (points, fids) = vector.pointCoordinates(layer)
+        count = len(points)
+        if count < 2:
+            raise GeoAlgorithmExecutionException(
+                    'At least two points are needed to compute the nearest '
+                    'neighbour index')
 
-        neighbour = QgsFeature()
-        distance = QgsDistanceArea()
-
-        sumDist = 0.00
         A = layer.extent()
         A = float(A.width() * A.height())
 
-        current = 0
-        features = vector.features(layer)
-        count = len(features)
-        total = 100.0 / float(len(features))
-        for feat in features:
-            neighbourID = spatialIndex.nearestNeighbor(
-                    feat.geometry().asPoint(), 2)[1]
-            request = QgsFeatureRequest().setFilterFid(neighbourID)
-            neighbour = layer.getFeatures(request).next()
-            sumDist += distance.measureLine(neighbour.geometry().asPoint(),
-                    feat.geometry().asPoint())
-
-            current += 1
-            progress.setPercentage(int(current * total))
+        # The two nearest points are searched, since the first one is
+        # usually the point itself, unless there are duplicated points
+        sumDist = 0.0
+        tree = KDTree(points)
+        for (start, distances, indices) in tree.queryBlocks(points, 2):
+            own = numpy.arange(start, start + len(distances))
+            nearest = numpy.where(indices[:, 0] == own, distances[:, 1],
+                                  distances[:, 0])
+            sumDist += float(nearest.sum())
+            progress.setPercentage(int(100.0 * (start + len(distances))
+                                   / count))
 
         do = float(sumDist) / count
         de = float(0.5 / math.sqrt(count / A))
@@ -25,15 +25,16 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-import math
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
 from processing.parameters.ParameterNumber import ParameterNumber
+from processing.parameters.ParameterBoolean import ParameterBoolean
 from processing.parameters.ParameterVector import ParameterVector
 from processing.parameters.ParameterSelection import ParameterSelection
 from processing.parameters.ParameterTableField import ParameterTableField
 from processing.outputs.OutputTable import OutputTable
 from processing.tools import dataobjects, vector
+from processing.tools.kdtree import PointIndex
 
 
 class PointDistance(GeoAlgorithm):
@@ -44,6 +45,7 @@ class PointDistance(GeoAlgorithm):
     TARGET_FIELD = 'TARGET_FIELD'
     MATRIX_TYPE = 'MATRIX_TYPE'
     NEAREST_POINTS = 'NEAREST_POINTS'
+    ELLIPSOIDAL = 'ELLIPSOIDAL'
     DISTANCE_MATRIX = 'DISTANCE_MATRIX'
 
     MAT_TYPES = ['Linear (N*k x 3) distance matrix',
@@ -70,6 +72,10 @@ class PointDistance(GeoAlgorithm):
         self.addParameter(ParameterNumber(self.NEAREST_POINTS,
                           'Use only the nearest (k) target points', 0, 9999,
                           0))
+        self.addParameter(ParameterBoolean(self.ELLIPSOIDAL,
+                          'Measure distances on the WGS84 ellipsoid (in '
+                          'meters)', False))
+        self.addedParameters = [self.ELLIPSOIDAL]
 
         self.addOutput(OutputTable(self.DISTANCE_MATRIX, 'Distance matrix'))
 
@@ -81,119 +87,92 @@ class PointDistance(GeoAlgorithm):
                 self.getParameterValue(self.TARGET_LAYER))
         targetField = self.getParameterValue(self.TARGET_FIELD)
         matType = self.getParameterValue(self.MATRIX_TYPE)
-        nPoints = self.getParameterValue(self.NEAREST_POINTS)
+        nPoints = int(self.getParameterValue(self.NEAREST_POINTS))
+        ellipsoidal = self.getParameterValue(self.ELLIPSOIDAL)
 
         outputFile = self.getOutputFromName(self.DISTANCE_MATRIX)
 
+        # Distances on the ellipsoid are measured between geographic
+        # coordinates
+        crs = None
+        if ellipsoidal:
+            crs = QgsCoordinateReferenceSystem('EPSG:4326')
+        (inPoints, inIDs) = vector.pointCoordinates(inLayer,
+                inLayer.fieldNameIndex(inField), crs)
+        (targetPoints, targetIDs) = vector.pointCoordinates(targetLayer,
+                targetLayer.fieldNameIndex(targetField), crs)
+        index = PointIndex(targetPoints, ellipsoidal)
+
         if nPoints < 1:
-            nPoints = len(vector.features(targetLayer))
+            nPoints = len(targetIDs)
 
         self.writer = outputFile.getTableWriter([])
 
         if matType == 0:
             # Linear distance matrix
-            self.linearMatrix(inLayer, inField, targetLayer, targetField,
-                matType, nPoints, progress)
+            self.linearMatrix(inPoints, inIDs, index, targetIDs, matType,
+                              nPoints, progress)
         elif matType == 1:
-           # Standard distance matrix
-            self.regularMatrix(inLayer, inField, targetLayer, targetField,
-                nPoints, progress)
+            # Standard distance matrix
+            self.regularMatrix(inPoints, inIDs, index, targetIDs, nPoints,
+                               progress)
         elif matType == 2:
             # Summary distance matrix
-            self.linearMatrix(inLayer, inField, targetLayer, targetField,
-                matType, nPoints, progress)
+            self.linearMatrix(inPoints, inIDs, index, targetIDs, matType,
+                              nPoints, progress)
+
+        self.writer.close()
 
-    def linearMatrix(self, inLayer, inField, targetLayer, targetField,
-                     matType, nPoints, progress):
+    def linearMatrix(self, inPoints, inIDs, index, targetIDs, matType,
+                     nPoints, progress):
         if matType == 0:
             self.writer.addRecord(['InputID', 'TargetID', 'Distance'])
         else:
             self.writer.addRecord(['InputID', 'MEAN', 'STDDEV', 'MIN', 'MAX'])
 
-        index = vector.spatialindex(targetLayer)
-
-        inIdx = inLayer.fieldNameIndex(inField)
-        inLayer.select([inIdx])
-        outIdx = targetLayer.fieldNameIndex(inField)
-
-        outFeat = QgsFeature()
-        inGeom = QgsGeometry()
-        outGeom = QgsGeometry()
-        distArea = QgsDistanceArea()
-
-        features = vector.features(inLayer)
-        current = 0
-        total = 100.0 / float(len(features))
-        for inFeat in features:
-            inGeom = inFeat.geometry()
-            inID = inFeat.attributes()[inIdx]
-            featList = index.nearestNeighbor(inGeom.asPoint(), nPoints)
-            distList = []
-            vari = 0.0
-            for i in featList:
-                request = QgsFeatureRequest().setFilterFid(i)
-                outFeat = targetLayer.getFeatures(request).next()
-                outID = outFeat.attributes()[outIdx]
-                outGeom = outFeat.geometry()
-                dist = distArea.measureLine(inGeom.asPoint(),
-                        outGeom.asPoint())
-                if matType == 0:
-                    self.writer.addRecord([unicode(inID), unicode(outID),
-                            unicode(dist)])
-                else:
-                    distList.append(float(dist))
-
-            if matType == 2:
-                mean = sum(distList) / len(distList)
-                for i in distList:
-                    vari += (i - mean) * (i - mean)
-                vari = math.sqrt(vari / len(distList))
-                self.writer.addRecord([unicode(inID), unicode(mean),
-                                      unicode(vari), unicode(min(distList)),
-                                      unicode(max(distList))])
-
-            current += 1
-            progress.setPercentage(int(current * total))
-
-    def regularMatrix(self, inLayer, inField, targetLayer, targetField,
-                      nPoints, progress):
-        index = vector.spatialindex(targetLayer)
-
-        inIdx = inLayer.fieldNameIndex(inField)
-        outIdx = targetLayer.fieldNameIndex(inField)
-
-        outFeat = QgsFeature()
-        inGeom = QgsGeometry()
-        outGeom = QgsGeometry()
-        distArea = QgsDistanceArea()
-
-        first = True
-        current = 0
-        features = vector.features(inLayer)
-        total = 100.0 / float(len(features))
-
-        for inFeat in features:
-            inGeom = inFeat.geometry()
-            inID = inFeat.attributes()[inIdx]
-            if first:
-                featList = index.nearestNeighbor(inGeom.asPoint(), nPoints)
-                first = False
-                data = ['ID']
-                for i in featList:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    outFeat = targetLayer.getFeatures(request).next()
-                    data.append(unicode(outFeat.attributes[outIdx]))
-                self.writer.addRecord(data)
-
-            data = [unicode(inID)]
-            for i in featList:
-                request = QgsFeatureRequest().setFilterFid(i)
-                outFeat = targetLayer.getFeatures(request).next()
-                outGeom = outFeat.geometry()
-                dist = distArea.measureLine(inGeom.asPoint(),
-                        outGeom.asPoint())
-                data.append(unicode(float(dist)))
-            self.writer.addRecord(data)
-
-            current += 1
-            progress.setPercentage(int(current * total))
+        total = len(inIDs)
+        for (start, distances, indices) in index.queryBlocks(inPoints,
+                                                             nPoints):
+            ids = inIDs[start:start + len(distances)]
+            if matType == 0:
+                records = []
+                for (inID, dists, targets) in zip(ids, distances.tolist(),
+                                                  indices.tolist()):
+                    records.extend([unicode(inID), unicode(targetIDs[i]),
+                                   unicode(dist)] for (i, dist) in
+                                   zip(targets, dists))
+                self.writer.addRecords(records)
+            else:
+                mean = distances.mean(axis=1)
+                std = distances.std(axis=1)
+                self.writer.addRecords([unicode(inID), unicode(values[0]),
+                        unicode(values[1]), unicode(values[2]),
+                        unicode(values[3])] for (inID, values) in zip(ids,
+                        zip(mean.tolist(), std.tolist(),
+                        distances.min(axis=1).tolist(),
+                        distances.max(axis=1).tolist())))
+
+            progress.setPercentage(int(100.0 * (start + len(distances))
+                                   / total))
+
+    def regularMatrix(self, inPoints, inIDs, index, targetIDs, nPoints,
+                      progress):
+        if len(inIDs) == 0:
+            return
+
+        # As it has always been, the columns are the nearest target
+        # points to the first input point, and every row has the
+        # distances to those same points
+        (distances, targets) = index.query(inPoints[:1], nPoints)
+        targets = targets[0]
+        self.writer.addRecord(['ID'] + [unicode(targetIDs[i]) for i in
+                              targets.tolist()])
+
+        total = len(inIDs)
+        for (start, distances) in index.distanceBlocks(inPoints, targets):
+            ids = inIDs[start:start + len(distances)]
+            self.writer.addRecords([unicode(inID)] + [unicode(dist) for dist
+                                   in dists] for (inID, dists) in zip(ids,
+                                   distances.tolist()))
+            progress.setPercentage(int(100.0 * (start + len(distances))
+                                   / total))
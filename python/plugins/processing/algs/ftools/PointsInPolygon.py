@@ -75,10 +75,9 @@ class PointsInPolygon(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(pointLayer)
+        spatialIndex = vector.indexedlayer(pointLayer, attributes=[])
 
         ftPoly = QgsFeature()
-        ftPoint = QgsFeature()
         outFeat = QgsFeature()
         geom = QgsGeometry()
 
@@ -99,9 +98,7 @@ class PointsInPolygon(GeoAlgorithm):
 
             if hasIntersections:
                 for i in points:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftPoint = pointLayer.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(ftPoint.geometry())
+                    tmpGeom = spatialIndex.geometry(i)
                     if geom.contains(tmpGeom):
                         count += 1
 
@@ -80,9 +80,9 @@ class PointsInPolygonUnique(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(pointLayer)
+        spatialIndex = vector.indexedlayer(pointLayer,
+                                           attributes=[classFieldIndex])
 
-        ftPoint = QgsFeature()
         outFeat = QgsFeature()
         geom = QgsGeometry()
 
@@ -103,11 +103,9 @@ class PointsInPolygonUnique(GeoAlgorithm):
 
             if hasIntersections:
                 for i in points:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftPoint = pointLayer.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(ftPoint.geometry())
+                    tmpGeom = spatialIndex.geometry(i)
                     if geom.contains(tmpGeom):
-                        clazz = ftPoint.attributes()[classFieldIndex]
+                        clazz = spatialIndex.attributeValues(i)[classFieldIndex]
                         if not clazz in classes:
                             classes.append(clazz)
 
@@ -82,9 +82,8 @@ class PointsInPolygonWeighted(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(pointLayer)
+        spatialIndex = vector.indexedlayer(pointLayer, attributes=[fieldIdx])
 
-        ftPoint = QgsFeature()
         outFeat = QgsFeature()
         geom = QgsGeometry()
 
@@ -106,11 +105,9 @@ class PointsInPolygonWeighted(GeoAlgorithm):
             if hasIntersections:
                 progress.setText(str(len(points)))
                 for i in points:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftPoint = pointLayer.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(ftPoint.geometry())
+                    tmpGeom = spatialIndex.geometry(i)
                     if geom.contains(tmpGeom):
-                        weight = str(ftPoint.attributes()[fieldIdx])
+                        weight = str(spatialIndex.attributeValues(i)[fieldIdx])
                         try:
                             count += float(weight)
                         except:
@@ -77,7 +77,7 @@ class RandomExtractWithinSubsets(GeoAlgorithm):
 
         features = vector.features(layer)
         featureCount = len(features)
-        unique = vector.getUniqueValues(layer, index)
+        groups = vector.valueGroups(layer, index)
         value = int(self.getParameterValue(self.NUMBER))
         if method == 0:
             if value > featureCount:
@@ -96,21 +96,11 @@ class RandomExtractWithinSubsets(GeoAlgorithm):
         writer = output.getVectorWriter(layer.fields(),
                 layer.geometryType(), layer.crs())
 
-        selran = []
-        current = 0
-        total = 100.0 / float(featureCount * len(unique))
-        features = vector.features(layer)
-
-        if not len(unique) == featureCount:
-            for classValue in unique:
-                classFeatures = []
-                for i, feature in enumerate(features):
-                    attrs = feature.attributes()
-                    if attrs[index] == classValue:
-                        classFeatures.append(i)
-                    current += 1
-                    progress.setPercentage(int(current * total))
-
+        # Ids of the selected features, or None to write all of them
+        selran = None
+        if not len(groups) == featureCount:
+            selran = set()
+            for (classValue, classFeatures) in groups:
                 if method == 1:
                     selValue = int(round(value * len(classFeatures), 0))
                 else:
@@ -121,14 +111,12 @@ class RandomExtractWithinSubsets(GeoAlgorithm):
                 else:
                     selFeat = random.sample(classFeatures, selValue)
 
-                selran.extend(selFeat)
-        else:
-            selran = range(0, featureCount)
+                selran.update(selFeat)
 
 
         features = vector.features(layer)
         for (i, feat) in enumerate(features):
-            if i in selran:
+            if selran is None or feat.id() in selran:
                 writer.addFeature(feat)
             progress.setPercentage(100 * i / float(featureCount))
         del writer
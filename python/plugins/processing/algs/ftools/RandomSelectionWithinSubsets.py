@@ -77,7 +77,7 @@ class RandomSelectionWithinSubsets(GeoAlgorithm):
         layer.removeSelection()
         index = layer.fieldNameIndex(field)
 
-        unique = vector.getUniqueValues(layer, index)
+        groups = vector.valueGroups(layer, index)
         featureCount = layer.featureCount()
 
         value = int(self.getParameterValue(self.NUMBER))
@@ -94,22 +94,9 @@ class RandomSelectionWithinSubsets(GeoAlgorithm):
             value = value / 100.0
 
         selran = []
-        inFeat = QgsFeature()
-
-        current = 0
-        total = 100.0 / float(featureCount * len(unique))
-
-        if not len(unique) == featureCount:
-            for i in unique:
-                features = vector.features(layer)
-                FIDs = []
-                for inFeat in features:
-                    attrs = inFeat.attributes()
-                    if attrs[index] == i:
-                        FIDs.append(inFeat.id())
-                    current += 1
-                    progress.setPercentage(int(current * total))
 
+        if not len(groups) == featureCount:
+            for (classValue, FIDs) in groups:
                 if method == 1:
                     selValue = int(round(value * len(FIDs), 0))
                 else:
@@ -66,22 +66,22 @@ class SelectByLocation(GeoAlgorithm):
         selectLayer = dataobjects.getObjectFromUri(filename)
 
         oldSelection = set(inputLayer.selectedFeaturesIds())
-        index = vector.spatialindex(inputLayer)
+        index = vector.indexedlayer(inputLayer, attributes=[])
 
         geom = QgsGeometry()
-        selectedSet = []
+        selectedSet = set()
         current = 0
-        features = vector.features(selectLayer)
+        features = vector.features(selectLayer, attributes=[],
+                                   rect=index.extent())
         total = 100.0 / float(len(features))
         for f in features:
             geom = QgsGeometry(f.geometry())
             intersects = index.intersects(geom.boundingBox())
             for i in intersects:
-                request = QgsFeatureRequest().setFilterFid(i)
-                feat = inputLayer.getFeatures(request).next()
-                tmpGeom = QgsGeometry(feat.geometry())
-                if geom.intersects(tmpGeom):
-                    selectedSet.append(feat.id())
+                if i in selectedSet:
+                    continue
+                if geom.intersects(index.geometry(i)):
+                    selectedSet.add(i)
             current += 1
             progress.setPercentage(int(current * total))
 
@@ -89,6 +89,8 @@ class SelectByLocation(GeoAlgorithm):
             selectedSet = list(oldSelection.union(selectedSet))
         elif method == 2:
             selectedSet = list(oldSelection.difference(selectedSet))
+        else:
+            selectedSet = list(selectedSet)
 
         inputLayer.setSelectedFeatures(selectedSet)
         self.setOutputValue(self.OUTPUT, filename)
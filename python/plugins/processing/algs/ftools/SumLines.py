@@ -82,9 +82,8 @@ class SumLines(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(lineLayer)
+        spatialIndex = vector.indexedlayer(lineLayer, attributes=[])
 
-        ftLine = QgsFeature()
         ftPoly = QgsFeature()
         outFeat = QgsFeature()
         inGeom = QgsGeometry()
@@ -107,9 +106,7 @@ class SumLines(GeoAlgorithm):
 
             if hasIntersections:
                 for i in lines:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftLine = lineLayer.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(ftLine.geometry())
+                    tmpGeom = spatialIndex.geometry(i)
                     if inGeom.intersects(tmpGeom):
                         outGeom = inGeom.intersection(tmpGeom)
                         length += distArea.measure(outGeom)
@@ -63,10 +63,9 @@ class Union(GeoAlgorithm):
         writer = self.getOutputFromName(Union.OUTPUT).getVectorWriter(fields,
                 vproviderA.geometryType(), vproviderA.crs())
         inFeatA = QgsFeature()
-        inFeatB = QgsFeature()
         outFeat = QgsFeature()
-        indexA = vector.spatialindex(vlayerB)
-        indexB = vector.spatialindex(vlayerA)
+        indexA = vector.indexedlayer(vlayerB)
+        indexB = vector.indexedlayer(vlayerA)
 
         count = 0
         nElement = 0
@@ -93,10 +92,8 @@ class Union(GeoAlgorithm):
             else:
                 for id in intersects:
                     count += 1
-                    request = QgsFeatureRequest().setFilterFid(id)
-                    inFeatB = vlayerB.getFeatures(request).next()
-                    atMapB = inFeatB.attributes()
-                    tmpGeom = QgsGeometry(inFeatB.geometry())
+                    atMapB = indexA.attributeValues(id)
+                    tmpGeom = indexA.geometry(id)
 
                     if geom.intersects(tmpGeom):
                         found = True
@@ -183,10 +180,8 @@ class Union(GeoAlgorithm):
                             'Feature exception while computing union')
             else:
                 for id in intersects:
-                    request = QgsFeatureRequest().setFilterFid(id)
-                    inFeatB = vlayerA.getFeatures(request).next()
-                    atMapB = inFeatB.attributes()
-                    tmpGeom = QgsGeometry(inFeatB.geometry())
+                    atMapB = indexB.attributeValues(id)
+                    tmpGeom = indexB.geometry(id)
                     try:
                         if diff_geom.intersects(tmpGeom):
                             add = True
@@ -76,7 +76,7 @@ class VoronoiPolygons(GeoAlgorithm):
         ptDict = {}
         ptNdx = -1
 
-        features = vector.features(layer)
+        features = vector.features(layer, attributes=[])
         for inFeat in features:
             geom = QgsGeometry(inFeat.geometry())
             point = geom.asPoint()
@@ -14,6 +14,7 @@
    (at your option) any later version.
 """
 
+from itertools import islice
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from qgis.core import *
@@ -29,6 +30,7 @@ from processing.parameters.ParameterVector import ParameterVector
 from processing.parameters.ParameterCrs import ParameterCrs
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import dataobjects, vector
+from processing.tools.kdtree import PointIndex
 
 
 class mmqgisx_delete_columns_algorithm(GeoAlgorithm):
@@ -84,6 +86,7 @@ class mmqgisx_delete_columns_algorithm(GeoAlgorithm):
 class mmqgisx_delete_duplicate_geometries_algorithm(GeoAlgorithm):
 
     LAYERNAME = 'LAYERNAME'
+    TOLERANCE = 'TOLERANCE'
     SAVENAME = 'SAVENAME'
 
     def defineCharacteristics(self):
@@ -92,26 +95,36 @@ class mmqgisx_delete_duplicate_geometries_algorithm(GeoAlgorithm):
 
         self.addParameter(ParameterVector(self.LAYERNAME, 'Input layer',
                           [ParameterVector.VECTOR_TYPE_ANY]))
+        self.addParameter(ParameterNumber(self.TOLERANCE,
+                          'Coordinate tolerance (0 for exact comparison)',
+                          0.0, None, 0.0))
+        self.addedParameters = [self.TOLERANCE]
         self.addOutput(OutputVector(self.SAVENAME, 'Output'))
 
     def processAlgorithm(self, progress):
         layer = dataobjects.getObjectFromUri(
                 self.getParameterValue(self.LAYERNAME))
+        tolerance = self.getParameterValue(self.TOLERANCE)
         output = self.getOutputFromName(self.SAVENAME)
         fields = layer.pendingFields()
         outfile = output.getVectorWriter(fields, layer.wkbType(), layer.crs())
+
+        # Features are written as they are read, keeping the first one
+        # with each geometry
         features = vector.features(layer)
         featurecount = len(features)
         i = 0
-        cleaned = {}
-        for feature in features:
-            cleaned[feature.geometry().exportToWkt()] = feature
-            progress.setPercentage(float(i) / featurecount * 50)
-            i += 1
-        i = 0
-        for feature in cleaned.values():
-            progress.setPercentage(float(i) / featurecount * 50 + 50)
-            outfile.addFeature(feature)
+        try:
+            for (feature, first) in vector.duplicateGeometries(features,
+                    tolerance):
+                if first is None:
+                    outfile.addFeature(feature)
+                progress.setPercentage(float(i) / featurecount * 100)
+                i += 1
+        except ValueError, e:
+            raise GeoAlgorithmExecutionException(unicode(e))
+
+        del outfile
 
 
 class mmqgisx_geometry_convert_algorithm(GeoAlgorithm):
@@ -766,6 +779,13 @@ class mmqgisx_hub_distance_algorithm(GeoAlgorithm):
     UNITS = 'UNITS'
     SAVENAME = 'SAVENAME'
 
+    # Number of source features processed at once
+    BLOCK_SIZE = 10000
+
+    # Number of hubs nearest in geocentric coordinates whose distance
+    # on the ellipsoid is measured
+    ELLIPSOIDAL_CANDIDATES = 4
+
     def defineCharacteristics(self):
         self.name = 'Distance to nearest hub'
         self.group = 'Vector analysis tools'
@@ -820,61 +840,92 @@ class mmqgisx_hub_distance_algorithm(GeoAlgorithm):
         output = self.getOutputFromName(self.SAVENAME)
         out = output.getVectorWriter(outfields, outputtype, layersource.crs())
 
+        # Distances in meters are measured on the WGS84 ellipsoid. Hub
+        # coordinates are assumed to be in the CRS of the source layer
+        ellipsoidal = units != 'Layer Units'
+        transform = None
+        if ellipsoidal:
+            if not layersource.crs().isValid():
+                raise GeoAlgorithmExecutionException(
+                        'Source layer has no valid CRS. Distances can only '
+                        'be measured in layer units')
+            transform = QgsCoordinateTransform(layersource.crs(),
+                    QgsCoordinateReferenceSystem('EPSG:4326'))
+
         # Create array of hubs in memory
         hubs = []
-        features = vector.features(layerdest)
+        hubpoints = []
+        features = vector.features(layerdest, attributes=[nameindex])
         for feature in features:
-            hubs.append(mmqgisx_hub(feature.geometry().boundingBox().center(),
-                        unicode(feature.attributes()[nameindex])))
+            hub = mmqgisx_hub(feature.geometry().boundingBox().center(),
+                              unicode(feature.attributes()[nameindex]))
+            hubs.append(hub)
+            point = hub.point
+            if transform is not None:
+                point = transform.transform(point)
+            hubpoints.append((point.x(), point.y()))
+
+        if not hubs:
+            raise GeoAlgorithmExecutionException(
+                    'No hubs found in destination layer')
+
+        # The nearest hubs are found using a KD-tree. On the ellipsoid,
+        # a few candidates are measured, and the nearest one is used
+        index = PointIndex(hubpoints, ellipsoidal)
+        candidates = 1
+        if ellipsoidal:
+            candidates = self.ELLIPSOIDAL_CANDIDATES
 
-        # Scan source points, find nearest hub, and write to output file
+        # Scan source points in blocks, find nearest hub, and write to
+        # output file
         writecount = 0
         features = vector.features(layersource)
         featureCount = len(features)
-        for feature in features:
-            source = feature.geometry().boundingBox().center()
-            distance = QgsDistanceArea()
-            distance.setSourceCrs(layersource.crs().srsid())
-            distance.setEllipsoidalMode(True)
-
-            closest = hubs[0]
-            hubdist = distance.measureLine(source, closest.point)
-
-            for hub in hubs:
-                thisdist = distance.measureLine(source, hub.point)
-                if thisdist < hubdist:
-                    closest = hub
-                    hubdist = thisdist
-
-            attributes = feature.attributes()
-            attributes.append(closest.name)
-            if units == 'Feet':
-                hubdist = hubdist * 3.2808399
-            elif units == 'Miles':
-                hubdist = hubdist * 0.000621371192
-            elif units == 'Kilometers':
-                hubdist = hubdist / 1000
-            elif units != 'Meters':
-                hubdist = sqrt(pow(source.x() - closest.point.x(), 2.0)
-                               + pow(source.y() - closest.point.y(), 2.0))
-            attributes.append(hubdist)
-
-            outfeature = QgsFeature()
-            outfeature.setAttributes(attributes)
-
-            if outputtype == QGis.WKBPoint:
-                geometry = QgsGeometry()
-                outfeature.setGeometry(geometry.fromPoint(source))
-            else:
-                polyline = []
-                polyline.append(source)
-                polyline.append(closest.point)
-                geometry = QgsGeometry()
-                outfeature.setGeometry(geometry.fromPolyline(polyline))
+        iterator = iter(features)
+        while True:
+            block = list(islice(iterator, self.BLOCK_SIZE))
+            if not block:
+                break
+
+            sources = [feature.geometry().boundingBox().center()
+                       for feature in block]
+            points = sources
+            if transform is not None:
+                points = [transform.transform(point) for point in sources]
+            (distances, indices) = index.query([(point.x(), point.y())
+                    for point in points], candidates)
+
+            outfeatures = []
+            for (feature, source, hubdist, hubindex) in zip(block, sources,
+                    distances[:, 0].tolist(), indices[:, 0].tolist()):
+                closest = hubs[hubindex]
+                attributes = feature.attributes()
+                attributes.append(closest.name)
+                if units == 'Feet':
+                    hubdist = hubdist * 3.2808399
+                elif units == 'Miles':
+                    hubdist = hubdist * 0.000621371192
+                elif units == 'Kilometers':
+                    hubdist = hubdist / 1000
+                attributes.append(hubdist)
+
+                outfeature = QgsFeature()
+                outfeature.setAttributes(attributes)
+
+                if outputtype == QGis.WKBPoint:
+                    geometry = QgsGeometry()
+                    outfeature.setGeometry(geometry.fromPoint(source))
+                else:
+                    polyline = []
+                    polyline.append(source)
+                    polyline.append(closest.point)
+                    geometry = QgsGeometry()
+                    outfeature.setGeometry(geometry.fromPolyline(polyline))
+                outfeatures.append(outfeature)
 
-            out.addFeature(outfeature)
+            out.addFeatures(outfeatures)
 
-            writecount += 1
+            writecount += len(block)
             progress.setPercentage(float(writecount) / featureCount * 100)
 
         del out
@@ -925,37 +976,37 @@ class mmqgisx_hub_lines_algorithm(GeoAlgorithm):
         out = output.getVectorWriter(outfields, QGis.WKBLineString,
                                      spokelayer.crs())
 
+        # Index hub points by id, keeping the first hub with each id
+        hubs = {}
+        for hubpoint in vector.features(hublayer, attributes=[hubindex]):
+            hubid = unicode(hubpoint.attributes()[hubindex])
+            if hubid not in hubs:
+                hubs[hubid] = hubpoint.geometry().boundingBox().center()
+
         # Scan spoke points
         linecount = 0
         spokepoints = vector.features(spokelayer)
         i = 0
         for spokepoint in spokepoints:
             i += 1
-            spokex = spokepoint.geometry().boundingBox().center().x()
-            spokey = spokepoint.geometry().boundingBox().center().y()
-            spokeid = unicode(spokepoint.attributes()[spokeindex])
             progress.setPercentage(float(i) / len(spokepoints) * 100)
 
-            # Scan hub points to find first matching hub
-            hubpoints = vector.features(hublayer)
-            for hubpoint in hubpoints:
-                hubid = unicode(hubpoint.attributes()[hubindex])
-                if hubid == spokeid:
-                    hubx = hubpoint.geometry().boundingBox().center().x()
-                    huby = hubpoint.geometry().boundingBox().center().y()
+            # Find the matching hub
+            spokeid = unicode(spokepoint.attributes()[spokeindex])
+            if spokeid not in hubs:
+                continue
 
-                    # Write line to the output file
-                    outfeature = QgsFeature()
-                    outfeature.setAttributes(spokepoint.attributes())
+            # Write line to the output file
+            outfeature = QgsFeature()
+            outfeature.setAttributes(spokepoint.attributes())
 
-                    polyline = []
-                    polyline.append(QgsPoint(spokex, spokey))
-                    polyline.append(QgsPoint(hubx, huby))
-                    geometry = QgsGeometry()
-                    outfeature.setGeometry(geometry.fromPolyline(polyline))
-                    out.addFeature(outfeature)
-                    linecount = linecount + 1
-                    break
+            polyline = []
+            polyline.append(spokepoint.geometry().boundingBox().center())
+            polyline.append(hubs[spokeid])
+            geometry = QgsGeometry()
+            outfeature.setGeometry(geometry.fromPolyline(polyline))
+            out.addFeature(outfeature)
+            linecount = linecount + 1
 
         del out
 
@@ -1094,7 +1145,8 @@ class mmqgisx_select_algorithm(GeoAlgorithm):
         comparison = self.comparisons[self.getParameterValue(self.COMPARISON)]
         comparisonvalue = self.getParameterValue(self.COMPARISONVALUE)
 
-        selected = select(layer, attribute, comparison, comparisonvalue, progress)
+        selected = set(select(layer, attribute, comparison, comparisonvalue,
+                              progress))
 
         layer.setSelectedFeatures(selected)
         self.setOutputValue(self.RESULT, filename)
@@ -1222,7 +1274,8 @@ def select(layer, attribute, comparison, comparisonvalue, progress):
 
     readcount = 0
     selected = []
-    features = vector.features(layer)
+    features = vector.features(layer, attributes=[selectindex],
+                               geometry=False)
     totalcount = len(features)
     for feature in features:
         aValue = feature[selectindex]
@@ -95,6 +95,7 @@ class CommanderWindow(QtGui.QDialog):
         self.prepareGui()
 
     def fillCombo(self):
+        Processing.loadLazyProviders()
         self.combo.clear()
 
         # Add algorithms
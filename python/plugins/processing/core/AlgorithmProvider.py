@@ -122,3 +122,17 @@ class AlgorithmProvider:
 
     def supportsNonFileBasedOutput(self):
         return False
+
+    def supportsParallelExecution(self):
+        """Returns True if the external applications called by the
+        algorithms of this provider can be run in worker threads, while
+        the rest of each algorithm runs in the GUI thread, as explained
+        in GeoAlgorithm.startExecution().
+
+        This is the case for providers that just call an external
+        application and do not share any state (files, environment)
+        between executions. Algorithms that need the result of an
+        application in processAlgorithm() can opt out by overriding
+        GeoAlgorithm.supportsParallelExecution(). The default is False.
+        """
+        return False
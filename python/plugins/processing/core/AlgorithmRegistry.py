@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    AlgorithmRegistry.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+from processing.gui.AlgorithmClassification import AlgorithmDecorator
+
+
+class TextIndex:
+    """An index of strings that finds those containing a given text,
+    ignoring case.
+
+    Each string is split in trigrams. Candidates for a search are the
+    strings that contain all the trigrams of the searched text, and
+    only those are compared with the text.
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.trigrams = {}
+
+    @staticmethod
+    def getTrigrams(text):
+        return set(text[i:i + 3] for i in xrange(len(text) - 2))
+
+    def add(self, key, text):
+        self.remove(key)
+        text = text.lower()
+        self.texts[key] = text
+        for trigram in self.getTrigrams(text):
+            self.trigrams.setdefault(trigram, set()).add(key)
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for trigram in self.getTrigrams(text):
+            keys = self.trigrams[trigram]
+            keys.discard(key)
+            if not keys:
+                del self.trigrams[trigram]
+
+    def search(self, text):
+        """Returns the set of keys of the strings that contain the
+        given text.
+        """
+        text = text.lower()
+        trigrams = self.getTrigrams(text)
+        if not trigrams:
+            candidates = self.texts.keys()
+        else:
+            candidates = None
+            for trigram in sorted(trigrams,
+                                  key=lambda t: len(self.trigrams.get(t,
+                                  ()))):
+                keys = self.trigrams.get(trigram)
+                if not keys:
+                    return set()
+                if candidates is None:
+                    candidates = set(keys)
+                else:
+                    candidates &= keys
+        return set(key for key in candidates if text in self.texts[key])
+
+
+class AlgorithmRegistry:
+    """Indexes of the algorithms of all providers.
+
+    Algorithms can be found by command line name or by name without
+    traversing the algorithms of all providers, and searched by any
+    part of their names. Indexes are updated provider by provider,
+    so when a provider changes only its algorithms are indexed again.
+    """
+
+    def __init__(self):
+        self.providers = {}
+        self.commandLineNames = {}
+        self.names = {}
+        self.nameIndex = TextIndex()
+        self.decoratedNameIndex = TextIndex()
+
+    def setProviderAlgs(self, providerName, algs):
+        """Replaces the algorithms of a provider. algs is a dict with
+        command line names as keys, like the ones in Processing.algs.
+        """
+        self.removeProvider(providerName)
+        self.providers[providerName] = algs
+        for (cmdName, alg) in algs.items():
+            if cmdName not in self.commandLineNames:
+                self.indexAlgorithm(cmdName, alg)
+            self.names.setdefault(alg.name, []).append(alg)
+
+    def removeProvider(self, providerName):
+        algs = self.providers.pop(providerName, {})
+        for (cmdName, alg) in algs.items():
+            sameName = self.names.get(alg.name, [])
+            if alg in sameName:
+                sameName.remove(alg)
+                if not sameName:
+                    del self.names[alg.name]
+            if self.commandLineNames.get(cmdName) is not alg:
+                continue
+            del self.commandLineNames[cmdName]
+            self.nameIndex.remove(cmdName)
+            self.decoratedNameIndex.remove(cmdName)
+            # Another provider might have an algorithm with the same
+            # command line name
+            for other in self.providers.values():
+                if cmdName in other:
+                    self.indexAlgorithm(cmdName, other[cmdName])
+                    break
+
+    def indexAlgorithm(self, cmdName, alg):
+        self.commandLineNames[cmdName] = alg
+        self.nameIndex.add(cmdName, alg.name)
+        (group, subgroup, name) = AlgorithmDecorator.getGroupsAndName(alg)
+        self.decoratedNameIndex.add(cmdName, name)
+
+    def getAlgorithm(self, cmdName):
+        return self.commandLineNames.get(cmdName)
+
+    def getAlgorithmFromFullName(self, name):
+        algs = self.names.get(name)
+        if algs:
+            return algs[0]
+        return None
+
+    def getProviderAlgs(self, providerName):
+        return self.providers.get(providerName, {})
+
+    def search(self, text, decorated=False):
+        """Returns the set of algorithms whose name contains the given
+        text, ignoring case.
+
+        If decorated is True, the names from the algorithm
+        classification are used instead of the original ones.
+        """
+        if decorated:
+            index = self.decoratedNameIndex
+        else:
+            index = self.nameIndex
+        return set(self.commandLineNames[cmdName] for cmdName in
+                   index.search(text))
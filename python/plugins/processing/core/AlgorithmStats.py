@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    AlgorithmStats.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import sys
+import time
+import sqlite3
+import pstats
+import cProfile
+import threading
+import StringIO
+import Queue
+from contextlib import contextmanager
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.tools.system import userFolder, tempFolder
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class ExecutionStats:
+
+    def __init__(self, algorithm, started=None):
+        self.id = None
+        self.algorithm = algorithm
+        self.started = started or time.time()
+
+        # Time spent by the whole execution, in seconds
+        self.wallTime = 0.0
+        self.cpuTime = 0.0
+        self.startCpu = 0.0
+
+        # List of (phase name, wall time, cpu time) tuples
+        self.phases = []
+
+        self.featuresRead = 0
+        self.featuresWritten = 0
+        self.tempBytes = 0
+        self.peakMemory = None
+        self.failed = False
+        self.profile = None
+
+        # True once it has been passed to AlgorithmStats.save()
+        self.saved = False
+
+    def getPhaseTime(self, name):
+        return sum(wall for (phase, wall, cpu) in self.phases
+                   if phase == name)
+
+
+class AlgorithmStats:
+    """Time spent by algorithms in each phase of their execution,
+    along with the number of features they read and wrote, the size of
+    the temporary outputs they created, and the peak memory used.
+
+    Statistics are collected by GeoAlgorithm.execute() and
+    Postprocessing, and stored in a SQLite database in the user
+    folder, so runs of an algorithm can be compared with
+    processing.algstats().
+
+    CPU time and peak memory are those of the whole QGIS process, so
+    they are not accurate when several algorithms run in parallel.
+    Features read and written are added to all the executions running
+    in the thread, so the counts of a model include those of the
+    algorithms in it.
+
+    If the PROFILE_ALGORITHMS setting is enabled, processAlgorithm()
+    is run under cProfile and the most expensive functions are stored
+    along with the statistics.
+
+    Statistics are written by a background StatsWriter thread, so
+    saving them does not slow down the execution of algorithms.
+    """
+
+    # Executions older than this number are removed from the database
+    MAX_EXECUTIONS = 10000
+
+    # Number of functions stored when profiling
+    PROFILE_LINES = 40
+
+    lock = threading.Lock()
+    local = threading.local()
+    writer = None
+
+    @staticmethod
+    def databaseFilename():
+        return os.path.join(userFolder(), 'processing_stats.sqlite')
+
+    @staticmethod
+    def getCpuTime():
+        (user, system) = os.times()[:2]
+        return user + system
+
+    @staticmethod
+    def getPeakMemory():
+        """Returns the maximum resident set size of the process so far,
+        in bytes, or None if it is not available in this system.
+        """
+        if resource is None:
+            return None
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            return rss
+        return rss * 1024
+
+    @staticmethod
+    def getExecutionStack():
+        if not hasattr(AlgorithmStats.local, 'stack'):
+            AlgorithmStats.local.stack = []
+        return AlgorithmStats.local.stack
+
+    @staticmethod
+    def startExecution(alg):
+        """Call this method when an algorithm starts running. Returns
+        the ExecutionStats object where its statistics are collected.
+        """
+        stats = ExecutionStats(alg.commandLineName())
+        stats.startCpu = AlgorithmStats.getCpuTime()
+        AlgorithmStats.getExecutionStack().append(stats)
+        return stats
+
+    @staticmethod
+    def suspendExecution(stats):
+        """Stops adding features read and written in the thread to an
+        execution, until resumeExecution() is called.
+        """
+        stack = AlgorithmStats.getExecutionStack()
+        if stats in stack:
+            stack.remove(stats)
+
+    @staticmethod
+    def resumeExecution(stats):
+        stack = AlgorithmStats.getExecutionStack()
+        if stats not in stack:
+            stack.append(stats)
+
+    @staticmethod
+    def finishExecution(alg, stats):
+        stack = AlgorithmStats.getExecutionStack()
+        if stats in stack:
+            stack.remove(stats)
+        stats.wallTime = time.time() - stats.started
+        stats.cpuTime = AlgorithmStats.getCpuTime() - stats.startCpu
+        stats.peakMemory = AlgorithmStats.getPeakMemory()
+        stats.tempBytes = AlgorithmStats.getTempOutputsSize(alg)
+        AlgorithmStats.save(stats)
+
+    @staticmethod
+    @contextmanager
+    def phase(name, stats=None, profile=False):
+        """Measures the time spent in the block it wraps:
+
+            with AlgorithmStats.phase('processAlgorithm'):
+                self.processAlgorithm(progress)
+
+        The time is added to the execution running in the thread, or
+        to the given ExecutionStats object, which is saved again if
+        it has already been stored.
+        """
+        if stats is None:
+            stack = AlgorithmStats.getExecutionStack()
+            if stack:
+                stats = stack[-1]
+        profiler = None
+        if profile and ProcessingConfig.getSetting(
+                ProcessingConfig.PROFILE_ALGORITHMS):
+            profiler = cProfile.Profile()
+        startWall = time.time()
+        startCpu = AlgorithmStats.getCpuTime()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.time() - startWall
+            cpu = AlgorithmStats.getCpuTime() - startCpu
+            if stats is not None:
+                stats.phases.append((name, wall, cpu))
+                if profiler is not None:
+                    stats.profile = AlgorithmStats.formatProfile(profiler)
+                if stats.saved:
+                    AlgorithmStats.save(stats)
+
+    @staticmethod
+    def formatProfile(profiler):
+        s = StringIO.StringIO()
+        stats = pstats.Stats(profiler, stream=s)
+        stats.sort_stats('cumulative').print_stats(
+                AlgorithmStats.PROFILE_LINES)
+        return s.getvalue()
+
+    @staticmethod
+    def addFeaturesRead(count):
+        for stats in AlgorithmStats.getExecutionStack():
+            stats.featuresRead += count
+
+    @staticmethod
+    def addFeaturesWritten(count):
+        for stats in AlgorithmStats.getExecutionStack():
+            stats.featuresWritten += count
+
+    @staticmethod
+    def getTempOutputsSize(alg):
+        """Returns the size of the files of the outputs of an algorithm
+        that are in the temporary folder, including those with the
+        same name and a different extension, like the .dbf file of a
+        shapefile.
+        """
+        folder = os.path.normcase(os.path.abspath(tempFolder()))
+        size = 0
+        for out in alg.outputs:
+            value = out.value
+            if not isinstance(value, basestring) or not value:
+                continue
+            path = os.path.normcase(os.path.abspath(value))
+            if not path.startswith(folder) or not os.path.isfile(path):
+                continue
+            dirname = os.path.dirname(path)
+            prefix = os.path.splitext(os.path.basename(path))[0] + '.'
+            try:
+                for f in os.listdir(dirname):
+                    if os.path.normcase(f).startswith(prefix):
+                        size += os.path.getsize(os.path.join(dirname, f))
+            except OSError:
+                pass
+        return size
+
+    @staticmethod
+    def openDatabase():
+        db = sqlite3.connect(AlgorithmStats.databaseFilename())
+        db.execute('CREATE TABLE IF NOT EXISTS executions (id INTEGER '
+                   'PRIMARY KEY, algorithm TEXT, started REAL, wall REAL, '
+                   'cpu REAL, featuresread INTEGER, featureswritten '
+                   'INTEGER, tempbytes INTEGER, peakmemory INTEGER, '
+                   'failed INTEGER, profile TEXT)')
+        db.execute('CREATE INDEX IF NOT EXISTS executions_algorithm ON '
+                   'executions (algorithm, id)')
+        db.execute('CREATE TABLE IF NOT EXISTS phases (execution INTEGER, '
+                   'position INTEGER, name TEXT, wall REAL, cpu REAL)')
+        db.execute('CREATE INDEX IF NOT EXISTS phases_execution ON phases '
+                   '(execution)')
+        return db
+
+    @staticmethod
+    def getWriter():
+        with AlgorithmStats.lock:
+            if AlgorithmStats.writer is None \
+                    or not AlgorithmStats.writer.is_alive():
+                AlgorithmStats.writer = StatsWriter()
+                AlgorithmStats.writer.start()
+            return AlgorithmStats.writer
+
+    @staticmethod
+    def save(stats):
+        """Queues the statistics of an execution to be written. If
+        they have already been saved, they are updated.
+        """
+        stats.saved = True
+        AlgorithmStats.getWriter().add(stats)
+
+    @staticmethod
+    def flush():
+        """Waits until all the queued statistics have been written.
+        """
+        writer = AlgorithmStats.writer
+        if writer is not None:
+            writer.flush()
+
+    @staticmethod
+    def stop():
+        writer = AlgorithmStats.writer
+        if writer is not None:
+            writer.stop()
+            AlgorithmStats.writer = None
+
+    @staticmethod
+    def getExecutions(algorithm=None, limit=10):
+        """Returns the last executions of an algorithm, or of all of
+        them if algorithm is None, as a list of ExecutionStats objects,
+        the most recent first.
+        """
+        executions = []
+        AlgorithmStats.flush()
+        if not os.path.isfile(AlgorithmStats.databaseFilename()):
+            return executions
+        with AlgorithmStats.lock:
+            db = sqlite3.connect(AlgorithmStats.databaseFilename())
+            try:
+                sql = 'SELECT id, algorithm, started, wall, cpu, ' \
+                      'featuresread, featureswritten, tempbytes, ' \
+                      'peakmemory, failed, profile FROM executions'
+                args = []
+                if algorithm is not None:
+                    sql += ' WHERE algorithm = ?'
+                    args.append(algorithm)
+                sql += ' ORDER BY id DESC LIMIT ?'
+                args.append(limit)
+                for row in db.execute(sql, args).fetchall():
+                    stats = ExecutionStats(row[1], row[2])
+                    stats.id = row[0]
+                    (stats.wallTime, stats.cpuTime, stats.featuresRead,
+                     stats.featuresWritten, stats.tempBytes,
+                     stats.peakMemory) = row[3:9]
+                    stats.failed = bool(row[9])
+                    stats.profile = row[10]
+                    stats.phases = [tuple(phase) for phase in db.execute(
+                            'SELECT name, wall, cpu FROM phases WHERE '
+                            'execution = ? ORDER BY position',
+                            (stats.id, )).fetchall()]
+                    executions.append(stats)
+            except sqlite3.Error:
+                pass
+            finally:
+                db.close()
+        return executions
+
+    @staticmethod
+    def getSummary():
+        """Returns a list of (algorithm, executions, mean time, min
+        time, max time) tuples for all the algorithms executed, the
+        slowest first.
+        """
+        AlgorithmStats.flush()
+        if not os.path.isfile(AlgorithmStats.databaseFilename()):
+            return []
+        with AlgorithmStats.lock:
+            db = sqlite3.connect(AlgorithmStats.databaseFilename())
+            try:
+                return db.execute('SELECT algorithm, COUNT(*), AVG(wall), '
+                                  'MIN(wall), MAX(wall) FROM executions '
+                                  'WHERE failed = 0 GROUP BY algorithm '
+                                  'ORDER BY AVG(wall) DESC').fetchall()
+            except sqlite3.Error:
+                return []
+            finally:
+                db.close()
+
+    @staticmethod
+    def clear():
+        AlgorithmStats.getWriter().add(None)
+        AlgorithmStats.flush()
+
+
+class StatsWriter(threading.Thread):
+    """Writes the statistics of executions to the database, using a
+    single connection.
+
+    Statistics are queued until they are written, at most every
+    FLUSH_INTERVAL seconds, all of them in a single transaction. An
+    execution queued several times is written once. Queuing None
+    removes all the statistics written so far.
+
+    As with the processing log, errors while writing are ignored, and
+    statistics are dropped instead of blocking if the thread is not
+    running.
+    """
+
+    FLUSH_INTERVAL = 1
+
+    def __init__(self):
+        threading.Thread.__init__(self, name='AlgorithmStats')
+        self.daemon = True
+        self.queue = Queue.Queue()
+        self.db = None
+
+    def add(self, stats):
+        if self.is_alive():
+            self.queue.put(stats)
+
+    def flush(self):
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks and self.is_alive():
+                self.queue.all_tasks_done.wait(self.FLUSH_INTERVAL)
+
+    def stop(self):
+        if self.is_alive():
+            self.queue.put('STOP')
+            self.join()
+
+    def run(self):
+        try:
+            self.db = AlgorithmStats.openDatabase()
+        except sqlite3.Error:
+            self.db = None
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.queue.get(True, self.FLUSH_INTERVAL))
+                while True:
+                    batch.append(self.queue.get_nowait())
+            except Queue.Empty:
+                pass
+            running = 'STOP' not in batch
+            try:
+                self.write([stats for stats in batch if stats != 'STOP'])
+            except Exception:
+                try:
+                    self.db.rollback()
+                except Exception:
+                    pass
+            finally:
+                for i in xrange(len(batch)):
+                    self.queue.task_done()
+        if self.db is not None:
+            self.db.close()
+
+    def write(self, batch):
+        if self.db is None or not batch:
+            return
+        pending = []
+        queued = set()
+        for stats in batch:
+            if stats is None:
+                self.writeAll(pending)
+                pending = []
+                queued = set()
+                self.db.execute('DELETE FROM executions')
+                self.db.execute('DELETE FROM phases')
+            elif id(stats) not in queued:
+                queued.add(id(stats))
+                pending.append(stats)
+        self.writeAll(pending)
+        self.db.commit()
+
+    def writeAll(self, batch):
+        for stats in batch:
+            values = (stats.algorithm, stats.started, stats.wallTime,
+                      stats.cpuTime, stats.featuresRead,
+                      stats.featuresWritten, stats.tempBytes,
+                      stats.peakMemory, int(stats.failed), stats.profile)
+            if stats.id is None:
+                cursor = self.db.execute('INSERT INTO executions '
+                        '(algorithm, started, wall, cpu, featuresread, '
+                        'featureswritten, tempbytes, peakmemory, failed, '
+                        'profile) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        values)
+                stats.id = cursor.lastrowid
+                oldest = stats.id - AlgorithmStats.MAX_EXECUTIONS
+                self.db.execute('DELETE FROM executions WHERE id <= ?',
+                                (oldest, ))
+                self.db.execute('DELETE FROM phases WHERE execution <= ?',
+                                (oldest, ))
+            else:
+                self.db.execute('UPDATE executions SET algorithm = ?, '
+                                'started = ?, wall = ?, cpu = ?, '
+                                'featuresread = ?, featureswritten = ?, '
+                                'tempbytes = ?, peakmemory = ?, '
+                                'failed = ?, profile = ? WHERE id = ?',
+                                values + (stats.id, ))
+                self.db.execute('DELETE FROM phases WHERE execution = ?',
+                                (stats.id, ))
+            self.db.executemany('INSERT INTO phases VALUES (?, ?, ?, ?, ?)',
+                                [(stats.id, i, name, wall, cpu) for (i,
+                                (name, wall, cpu)) in
+                                enumerate(list(stats.phases))])
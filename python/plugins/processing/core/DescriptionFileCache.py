@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    DescriptionFileCache.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import sys
+import inspect
+import cPickle
+from processing.core.ProcessingLog import ProcessingLog
+from processing.tools.system import userFolder
+
+
+class DescriptionFileCache:
+    """A cache of algorithms created from description files.
+
+    Providers that create their algorithms by parsing a folder of
+    description files can use this class to store the resulting
+    algorithms in the user folder. On the next start, algorithms whose
+    description file has not changed are restored from the cache
+    without parsing the file again.
+
+    The cache is discarded if the description folder, the cache format,
+    the version of the plugin or any of the provider settings passed
+    when creating it change. An algorithm is also parsed again if the
+    module of its class, or of any of its base classes, has been
+    modified since it was cached.
+
+    Usage:
+
+        cache = DescriptionFileCache('saga', folder, [saga208])
+        for descriptionFile in os.listdir(folder):
+            alg = cache.getAlgorithm(descriptionFile, SagaAlgorithm)
+        cache.save()
+    """
+
+    VERSION = 2
+
+    def __init__(self, providerName, folder, settings=None):
+        self.folder = folder
+        self.filename = os.path.join(userFolder(), 'cache',
+                                     providerName + '.cache')
+        self.key = (self.VERSION, pluginVersion(), os.path.abspath(folder),
+                    settings)
+        self.classKeys = {}
+        self.entries = {}
+        self.used = {}
+        self.modified = False
+        try:
+            with open(self.filename, 'rb') as f:
+                (key, entries) = cPickle.load(f)
+            if key == self.key:
+                self.entries = entries
+        except Exception:
+            # The cache does not exist or cannot be read. It will be
+            # created again when saved.
+            pass
+
+    def getAlgorithm(self, descriptionFile, algClass):
+        """Returns the algorithm for the given description file, which
+        is created with algClass(path) if it is not in the cache.
+        """
+        path = os.path.join(self.folder, descriptionFile)
+        stat = os.stat(path)
+        fileKey = (stat.st_mtime, stat.st_size, self.getClassKey(algClass))
+        entry = self.entries.get(descriptionFile)
+        if entry is not None and entry[0] == fileKey:
+            try:
+                alg = cPickle.loads(entry[1])
+                self.used[descriptionFile] = entry
+                return alg
+            except Exception:
+                pass
+
+        alg = algClass(path)
+        try:
+            entry = (fileKey, cPickle.dumps(alg, 2))
+            self.used[descriptionFile] = entry
+            self.modified = True
+        except Exception:
+            pass
+        return alg
+
+    def getClassKey(self, algClass):
+        """Returns the modification times of the source files of the
+        given class and its base classes.
+        """
+        if algClass not in self.classKeys:
+            key = []
+            for cls in inspect.getmro(algClass):
+                module = sys.modules.get(cls.__module__)
+                filename = getattr(module, '__file__', None)
+                if filename is None:
+                    continue
+                if filename.endswith(('.pyc', '.pyo')):
+                    filename = filename[:-1]
+                try:
+                    key.append(os.path.getmtime(filename))
+                except OSError:
+                    key.append(None)
+            self.classKeys[algClass] = tuple(key)
+        return self.classKeys[algClass]
+
+    def save(self):
+        """Stores the algorithms returned since the cache was created,
+        removing those that were not requested.
+        """
+        if not self.modified and len(self.used) == len(self.entries):
+            return
+        folder = os.path.dirname(self.filename)
+        try:
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            tmpFilename = self.filename + '.tmp'
+            with open(tmpFilename, 'wb') as f:
+                cPickle.dump((self.key, self.used), f, 2)
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(tmpFilename, self.filename)
+        except (IOError, OSError), e:
+            ProcessingLog.addToLog(ProcessingLog.LOG_WARNING,
+                                   'Could not save algorithm cache: '
+                                   + unicode(e))
+        self.entries = self.used
+        self.used = {}
+        self.modified = False
+
+
+def pluginVersion():
+    """Returns the version of the plugin in its metadata.txt file, or
+    None if it cannot be read.
+    """
+    filename = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                            'metadata.txt')
+    try:
+        with open(filename) as f:
+            for line in f:
+                if line.startswith('version='):
+                    return line[len('version='):].strip()
+    except IOError:
+        pass
+    return None
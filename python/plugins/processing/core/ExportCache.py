@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    ExportCache.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from processing.core.ProcessingConfig import ProcessingConfig
+
+
+class ExportCacheEntry:
+
+    def __init__(self, key, source, filename):
+        self.key = key
+        self.source = source
+        self.filename = filename
+        self.folder = os.path.dirname(filename)
+        self.size = 0
+        for f in os.listdir(self.folder):
+            self.size += os.path.getsize(os.path.join(self.folder, f))
+
+        # Number of running algorithms using the exported file
+        self.users = 0
+
+
+class ExportCache:
+    """Files created by dataobjects.exportVectorLayer() and
+    dataobjects.exportTable(), so a layer is not exported again if it
+    has not changed since the last time it was exported.
+
+    Exports are identified by a hash of the source of the layer, its
+    subset string, CRS, fields and selected features, and a marker of
+    the state of its data: the modification time and size of its files
+    for file based layers, and the feature count and extent for the
+    rest, which are also discarded when edits to the layer are saved.
+    Layers with unsaved edits are never cached.
+
+    Each export is in its own folder in the temporary folder. When
+    the total size of the exports exceeds the EXPORT_CACHE_SIZE
+    setting, the least recently used ones are deleted, except those
+    used by algorithms that are still running.
+    """
+
+    # Least recently used exports first
+    entries = OrderedDict()
+    lock = threading.RLock()
+    local = threading.local()
+
+    # Folders that could not be deleted, as they were still open
+    pendingRemoval = []
+
+    # Ids of layers whose edits discard their exports when saved
+    watchedLayers = set()
+
+    @staticmethod
+    def getKey(layer, exportType, selection=None):
+        """Returns the key of the export of a layer, or None if it
+        should not be cached.
+        """
+        if ExportCache.maxSize() <= 0:
+            return None
+        if layer.isEditable() and layer.isModified():
+            return None
+        marker = ExportCache.getModificationMarker(layer)
+        fields = [(unicode(f.name()), f.type()) for f in
+                  layer.pendingFields()]
+        parts = [exportType, unicode(layer.source()),
+                 unicode(layer.subsetString()), layer.crs().authid(),
+                 repr(fields), repr(marker), repr(selection)]
+        return hashlib.sha1(u'\0'.join(parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def getModificationMarker(layer):
+        source = unicode(layer.source())
+        path = source.split('|')[0]
+        if os.path.isfile(path):
+            files = [path]
+            if path.lower().endswith('.shp'):
+                files.append(path[:-4] + '.dbf')
+            marker = []
+            for f in files:
+                if os.path.isfile(f):
+                    stat = os.stat(f)
+                    marker.append((stat.st_mtime, stat.st_size))
+            return marker
+
+        if layer.id() not in ExportCache.watchedLayers:
+            ExportCache.watchedLayers.add(layer.id())
+            layer.editingStopped.connect(
+                    lambda: ExportCache.removeSource(source))
+        provider = layer.dataProvider()
+        return (provider.featureCount(), provider.extent().toString())
+
+    @staticmethod
+    def maxSize():
+        try:
+            size = float(ProcessingConfig.getSetting(
+                    ProcessingConfig.EXPORT_CACHE_SIZE))
+        except (TypeError, ValueError):
+            return 0
+        return size * 1024 * 1024
+
+    @staticmethod
+    def getExport(key):
+        """Returns the filename of the export with the given key, or
+        None if there is no such export.
+        """
+        if key is None:
+            return None
+        with ExportCache.lock:
+            entry = ExportCache.entries.get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(entry.filename):
+                del ExportCache.entries[key]
+                return None
+            del ExportCache.entries[key]
+            ExportCache.entries[key] = entry
+            ExportCache.use(entry)
+            return entry.filename
+
+    @staticmethod
+    def addExport(key, layer, filename):
+        """Adds the file where a layer has been exported, which must be
+        in a folder of its own, to the cache.
+        """
+        if key is None:
+            return
+        with ExportCache.lock:
+            entry = ExportCacheEntry(key, unicode(layer.source()), filename)
+            ExportCache.entries[key] = entry
+            ExportCache.use(entry)
+            ExportCache.evict()
+
+    @staticmethod
+    def removeSource(source):
+        with ExportCache.lock:
+            for entry in ExportCache.entries.values():
+                if entry.source == source:
+                    del ExportCache.entries[entry.key]
+                    ExportCache.removeFolder(entry.folder)
+
+    @staticmethod
+    def evict():
+        with ExportCache.lock:
+            for folder in list(ExportCache.pendingRemoval):
+                ExportCache.pendingRemoval.remove(folder)
+                ExportCache.removeFolder(folder)
+            maxSize = ExportCache.maxSize()
+            size = sum(entry.size for entry in ExportCache.entries.values())
+            for entry in ExportCache.entries.values():
+                if size <= maxSize:
+                    break
+                if entry.users > 0:
+                    continue
+                del ExportCache.entries[entry.key]
+                ExportCache.removeFolder(entry.folder)
+                size -= entry.size
+
+    @staticmethod
+    def removeFolder(folder):
+        try:
+            shutil.rmtree(folder)
+        except OSError:
+            # Files still open by another application cannot be
+            # deleted in some systems. Try again later.
+            if os.path.exists(folder):
+                ExportCache.pendingRemoval.append(folder)
+
+    @staticmethod
+    def use(entry):
+        if getattr(ExportCache.local, 'depth', 0) > 0:
+            entry.users += 1
+            ExportCache.local.used.append(entry)
+
+    @staticmethod
+    def startExecution():
+        """Call this method when an algorithm starts running. Exports
+        used until finishExecution() is called are not deleted.
+        """
+        if getattr(ExportCache.local, 'depth', 0) == 0:
+            ExportCache.local.depth = 0
+            ExportCache.local.used = []
+        ExportCache.local.depth += 1
+
+    @staticmethod
+    def finishExecution():
+        ExportCache.local.depth -= 1
+        if ExportCache.local.depth == 0:
+            with ExportCache.lock:
+                for entry in ExportCache.local.used:
+                    entry.users -= 1
+            ExportCache.local.used = []
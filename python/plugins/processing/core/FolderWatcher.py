@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    FolderWatcher.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+from PyQt4.QtCore import *
+
+
+class FolderWatcher(QObject):
+    """Watches a set of folders and the files in them with a given
+    extension, calling a function when any of them changes.
+
+    Changes are usually notified several times while a file is being
+    written, so the function is only called once no further change has
+    been notified for DELAY milliseconds.
+    """
+
+    DELAY = 500
+
+    def __init__(self, extension, callback):
+        QObject.__init__(self)
+        self.extension = extension
+        self.callback = callback
+        self.folders = []
+        self.watcher = QFileSystemWatcher()
+        self.watcher.directoryChanged.connect(self.pathChanged)
+        self.watcher.fileChanged.connect(self.pathChanged)
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DELAY)
+        self.timer.timeout.connect(self.timeout)
+
+    def setFolders(self, folders):
+        self.folders = [folder for folder in folders
+                        if os.path.isdir(folder)]
+        self.updatePaths()
+
+    def updatePaths(self):
+        # Files are removed from the watcher when they are deleted or
+        # replaced (which many editors do when saving), so the list of
+        # watched paths is created again after every change
+        paths = list(self.folders)
+        for folder in self.folders:
+            for filename in os.listdir(folder):
+                if filename.endswith(self.extension):
+                    paths.append(os.path.join(folder, filename))
+        watched = self.watcher.directories() + self.watcher.files()
+        if watched:
+            self.watcher.removePaths(watched)
+        if paths:
+            self.watcher.addPaths(paths)
+
+    def stop(self):
+        self.timer.stop()
+        self.folders = []
+        self.updatePaths()
+
+    def pathChanged(self, path):
+        self.timer.start()
+
+    def timeout(self):
+        self.updatePaths()
+        self.callback()
@@ -34,6 +34,9 @@ from qgis.core import *
 
 from processing.core.ProcessingLog import ProcessingLog
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.ExportCache import ExportCache
+from processing.core.AlgorithmStats import AlgorithmStats
+from processing.core.ProcessRunner import ProcessRunner
 from processing.core.GeoAlgorithmExecutionException import \
         GeoAlgorithmExecutionException
 from processing.parameters.Parameter import Parameter
@@ -88,6 +91,14 @@ class GeoAlgorithm:
         # when running as part of a model
         self.model = None
 
+        # Statistics of the last execution, an ExecutionStats object
+        self.executionStats = None
+
+        # Names of the parameters added after the algorithm was first
+        # released. Scripts and models created before that do not give
+        # them a value, so they take their default ones
+        self.addedParameters = []
+
         self.defineCharacteristics()
 
     def getCopy(self):
@@ -193,32 +204,118 @@ class GeoAlgorithm:
         Raises a GeoAlgorithmExecutionException in case anything goe
         wrong.
         """
+        self.startExecution(progress, model)
+        self.finishExecution(progress)
+
+    def startExecution(self, progress, model=None, deferProcesses=False):
+        """Runs the first part of the execution of the algorithm, up
+        to processAlgorithm(). finishExecution() has to be called
+        afterwards to complete it.
+
+        If deferProcesses is True, the external applications called by
+        processAlgorithm() are not run, and the list of their runners
+        is returned. They must be run by runDeferredProcesses() before
+        calling finishExecution(). That is the only part of the
+        execution that can be run outside the GUI thread.
+        """
         self.model = model
+        self.executionStats = AlgorithmStats.startExecution(self)
+        ExportCache.startExecution()
+        try:
+            with AlgorithmStats.phase('setOutputCRS'):
+                self.setOutputCRS()
+            with AlgorithmStats.phase('resolveTemporaryOutputs'):
+                self.resolveTemporaryOutputs()
+                self.checkOutputFileExtensions()
+            with AlgorithmStats.phase('runPreExecutionScript'):
+                self.runPreExecutionScript(progress)
+            with AlgorithmStats.phase('processAlgorithm', profile=True):
+                with ProcessRunner.deferred(deferProcesses) as runners:
+                    try:
+                        self.processAlgorithm(progress)
+                    finally:
+                        # Features and records buffered by the writers
+                        # must be in the output files before they are
+                        # used
+                        for out in self.outputs:
+                            out.closeWriter()
+        except Exception, e:
+            error = self.executionError(e)
+            self.endExecution()
+            raise error
+        if deferProcesses:
+            # Features read by other algorithms started before this one
+            # finishes should not be added to its statistics
+            AlgorithmStats.suspendExecution(self.executionStats)
+        return runners
+
+    def runDeferredProcesses(self, runners):
+        """Runs, in order, the external applications deferred by
+        startExecution(). It can be called from a worker thread.
+        """
+        with AlgorithmStats.phase('processAlgorithm', self.executionStats):
+            for runner in runners:
+                runner.runNow()
+
+    def finishExecution(self, progress, error=None):
+        """Completes the execution started by startExecution(). If an
+        error was raised while running the deferred applications, it
+        should be passed, so it is handled as any other error in the
+        execution.
+        """
+        AlgorithmStats.resumeExecution(self.executionStats)
         try:
-            self.setOutputCRS()
-            self.resolveTemporaryOutputs()
-            self.checkOutputFileExtensions()
-            self.runPreExecutionScript(progress)
-            self.processAlgorithm(progress)
-            self.convertUnsupportedFormats(progress)
-            self.runPostExecutionScript(progress)
-        except GeoAlgorithmExecutionException, gaee:
-            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, gaee.msg)
-            raise gaee
+            if error is not None:
+                raise error
+            with AlgorithmStats.phase('convertUnsupportedFormats'):
+                self.convertUnsupportedFormats(progress)
+            with AlgorithmStats.phase('runPostExecutionScript'):
+                self.runPostExecutionScript(progress)
         except Exception, e:
-            # If something goes wrong and is not caught in the
-            # algorithm, we catch it here and wrap it
-            lines = ['Uncaught error while executing algorithm']
-            errstring = traceback.format_exc()
-            newline = errstring.find('\n')
-            if newline != -1:
-                lines.append(errstring[:newline])
-            else:
-                lines.append(errstring)
-            lines.append(errstring.replace('\n', '|'))
-            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, lines)
-            raise GeoAlgorithmExecutionException(str(e)
-                    + '\nSee log for more details')
+            raise self.executionError(e)
+        finally:
+            self.endExecution()
+
+    def endExecution(self):
+        ExportCache.finishExecution()
+        AlgorithmStats.finishExecution(self, self.executionStats)
+
+    def executionError(self, e):
+        """Logs an error raised while executing the algorithm, and
+        returns the GeoAlgorithmExecutionException to raise. It must
+        be called from the except block that caught the error.
+        """
+        self.executionStats.failed = True
+        if isinstance(e, GeoAlgorithmExecutionException):
+            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, e.msg)
+            return e
+
+        # If something goes wrong and is not caught in the
+        # algorithm, we catch it here and wrap it
+        lines = ['Uncaught error while executing algorithm']
+        errstring = traceback.format_exc()
+        newline = errstring.find('\n')
+        if newline != -1:
+            lines.append(errstring[:newline])
+        else:
+            lines.append(errstring)
+        lines.append(errstring.replace('\n', '|'))
+        ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, lines)
+        return GeoAlgorithmExecutionException(str(e)
+                + '\nSee log for more details')
+
+    def supportsParallelExecution(self):
+        """Returns True if this algorithm can be run along with others,
+        deferring the external applications it calls, as explained in
+        startExecution().
+
+        processAlgorithm() must not use the results of those
+        applications, since they are not available until it has
+        returned. By default, this depends on the provider of the
+        algorithm.
+        """
+        return self.provider is not None \
+            and self.provider.supportsParallelExecution()
 
     def runPostExecutionScript(self, progress):
         scriptFile = ProcessingConfig.getSetting(
@@ -279,10 +376,11 @@ class GeoAlgorithm:
                 if out.compatible is not None:
                     layer = dataobjects.getObjectFromUri(out.compatible)
                     provider = layer.dataProvider()
-                    writer = out.getTableWriter(provider.fields())
-                    features = vector.features(layer)
-                    for feature in features:
-                        writer.addRecord(feature)
+                    writer = out.getTableWriter(provider.fields().toList())
+                    features = vector.features(layer, geometry=False)
+                    writer.addRecords(feature.attributes() for feature in
+                                      features)
+                    writer.close()
             progress.setPercentage(100 * i / float(len(self.outputs)))
 
     def getFormatShortNameFromFilename(self, filename):
@@ -334,17 +432,17 @@ class GeoAlgorithm:
                 setTempOutput(out, self)
 
     def setOutputCRS(self):
-        layers = dataobjects.getAllLayers()
         for param in self.parameters:
             if isinstance(param, (ParameterRaster, ParameterVector,
                           ParameterMultipleInput)):
                 if param.value:
                     inputlayers = param.value.split(';')
                     for inputlayer in inputlayers:
-                        for layer in layers:
-                            if layer.source() == inputlayer:
-                                self.crs = layer.crs()
-                                return
+                        layer = dataobjects.getObjectFromUri(inputlayer,
+                                                             False)
+                        if layer is not None:
+                            self.crs = layer.crs()
+                            return
                         if isinstance(param, ParameterRaster) \
                                 or isinstance(param, ParameterMultipleInput) \
                                 and param.datatype \
@@ -367,20 +465,19 @@ class GeoAlgorithm:
         returns True. False otherwise.
         """
         crs = None
-        layers = dataobjects.getAllLayers()
         for param in self.parameters:
             if isinstance(param, (ParameterRaster, ParameterVector,
                           ParameterMultipleInput)):
                 if param.value:
                     inputlayers = param.value.split(';')
                     for inputlayer in inputlayers:
-                        for layer in layers:
-                            if layer.source() == inputlayer:
-                                if crs is None:
-                                    crs = layer.crs()
-                                else:
-                                    if crs != layer.crs():
-                                        return False
+                        layer = dataobjects.getObjectFromUri(inputlayer,
+                                                             False)
+                        if layer is not None:
+                            if crs is None:
+                                crs = layer.crs()
+                            elif crs != layer.crs():
+                                return False
         return True
 
     def addOutput(self, output):
@@ -403,6 +500,23 @@ class GeoAlgorithm:
             if out.name == outputName:
                 out.setValue(value)
 
+    def getParametersForValues(self, params, numValues):
+        """Returns the parameters, among those passed (in the order in
+        which they are defined), that a list of numValues values set by
+        position is meant for.
+
+        That list might have been created before the parameters in
+        addedParameters were added, and then they are left out. Returns
+        None if numValues does not match the parameters.
+        """
+        if numValues == len(params):
+            return params
+        previous = [param for param in params if param.name not in
+                    self.addedParameters]
+        if numValues == len(previous):
+            return previous
+        return None
+
     def getVisibleOutputsCount(self):
         """Returns the number of non-hidden outputs.
         """
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    LazyProvider.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import importlib
+from PyQt4 import QtGui
+from processing.core.AlgorithmProvider import AlgorithmProvider
+
+
+class LazyProvider(AlgorithmProvider):
+    """Stands in for a provider that has not been imported yet.
+
+    It only knows the name, description and icon of the provider, and
+    whether it is active by default, which is enough to add its
+    activation setting and show it in the toolbox. The module of the
+    real provider is imported, and the provider created, by
+    createProvider(). Processing does that the first time one of its
+    algorithms is needed.
+
+    It never has algorithms, actions or context menu actions.
+    """
+
+    def __init__(self, name, module, className, description, icon,
+                 activate=True):
+        AlgorithmProvider.__init__(self)
+        self.name = name
+        self.module = module
+        self.className = className
+        self.description = description
+        self.icon = icon
+        self.activate = activate
+        self.algs = []
+
+    def getName(self):
+        return self.name
+
+    def getDescription(self):
+        return self.description
+
+    def getIcon(self):
+        if self.icon.startswith(':'):
+            return QtGui.QIcon(self.icon)
+        return QtGui.QIcon(os.path.join(os.path.dirname(__file__), '..',
+                           self.icon))
+
+    def loadAlgorithms(self):
+        self.algs = []
+
+    def createProvider(self):
+        module = importlib.import_module(self.module)
+        return getattr(module, self.className)()
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    ProcessRunner.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import re
+import time
+import signal
+import threading
+import subprocess
+import Queue
+from contextlib import contextmanager
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+from processing.tools.system import isWindows
+
+
+class ProcessRunner:
+    """Runs an external application, passing each line of its output
+    to a function as soon as it is written.
+
+    The number of external applications running at the same time is
+    limited by the MAX_PROCESSES setting. When algorithms run in
+    several threads, those that would exceed it wait until another
+    application finishes.
+
+    The application is killed, and a GeoAlgorithmExecutionException
+    raised, if it runs for longer than the timeout, or if it is
+    canceled, either by calling cancel() or cancelAll(), or by setting
+    the canceled attribute of the progress object to True.
+
+    Usage:
+
+        def handleLine(line):
+            progress.setConsoleInfo(line)
+
+        loglines = ProcessRunner(command, progress, handleLine).run()
+
+    Inside a deferred() block, run() does not start the application.
+    The runner is added to the list of deferred runners instead, to be
+    run later, possibly from another thread, by calling runNow(). The
+    list of lines returned by run() is filled at that point, so whatever
+    has to be done with the output once the application has finished,
+    like adding it to the log, should be done in a function passed as
+    finishedHandler. It is called with the list of lines, right after
+    the application finishes successfully.
+    """
+
+    # How often cancellation and the timeout are checked, in seconds
+    POLL_INTERVAL = 0.1
+
+    LINE_SEPARATORS = re.compile('\r\n|\r|\n')
+
+    # Number of applications running, and the condition to wait for a
+    # free slot
+    activeProcesses = 0
+    slotCondition = threading.Condition()
+
+    runners = set()
+    runnersLock = threading.Lock()
+
+    local = threading.local()
+
+    def __init__(self, command, progress=None, lineHandler=None,
+                 timeout=None, shell=True, finishedHandler=None):
+        self.command = command
+        self.progress = progress
+        self.lineHandler = lineHandler
+        self.finishedHandler = finishedHandler
+        if timeout is None:
+            try:
+                timeout = float(ProcessingConfig.getSetting(
+                        ProcessingConfig.PROCESS_TIMEOUT))
+            except (TypeError, ValueError):
+                timeout = 0
+        self.timeout = timeout
+        self.shell = shell
+        self.proc = None
+        self.canceled = False
+        self.lines = []
+
+    @staticmethod
+    def maxProcesses():
+        try:
+            return max(1, int(float(ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_PROCESSES))))
+        except (TypeError, ValueError):
+            return 1
+
+    @staticmethod
+    def cancelAll():
+        """Kills all the applications being run.
+        """
+        with ProcessRunner.runnersLock:
+            runners = list(ProcessRunner.runners)
+        for runner in runners:
+            runner.cancel()
+
+    @staticmethod
+    @contextmanager
+    def deferred(defer=True):
+        """Defers the applications run in the current thread inside the
+        block, and yields the list where their runners are added:
+
+            with ProcessRunner.deferred() as runners:
+                alg.processAlgorithm(progress)
+            for runner in runners:
+                runner.runNow()
+
+        If defer is False, applications are run as usual, even if an
+        outer block is deferring them.
+        """
+        previous = getattr(ProcessRunner.local, 'deferred', None)
+        runners = []
+        ProcessRunner.local.deferred = runners if defer else None
+        try:
+            yield runners
+        finally:
+            ProcessRunner.local.deferred = previous
+
+    @staticmethod
+    def isDeferring():
+        return getattr(ProcessRunner.local, 'deferred', None) is not None
+
+    def cancel(self):
+        self.canceled = True
+
+    def isCanceled(self):
+        return self.canceled or getattr(self.progress, 'canceled', False)
+
+    def acquireSlot(self):
+        with ProcessRunner.slotCondition:
+            while ProcessRunner.activeProcesses \
+                    >= ProcessRunner.maxProcesses():
+                if self.isCanceled():
+                    raise GeoAlgorithmExecutionException(
+                            'Execution canceled')
+                ProcessRunner.slotCondition.wait(self.POLL_INTERVAL)
+            ProcessRunner.activeProcesses += 1
+
+    def releaseSlot(self):
+        with ProcessRunner.slotCondition:
+            ProcessRunner.activeProcesses -= 1
+            ProcessRunner.slotCondition.notify()
+
+    def run(self):
+        """Runs the application and waits for it to finish, unless
+        applications are being deferred.
+
+        Returns the list of lines it wrote to its standard output and
+        error.
+        """
+        if ProcessRunner.isDeferring():
+            ProcessRunner.local.deferred.append(self)
+            return self.lines
+        return self.runNow()
+
+    def runNow(self):
+        self.acquireSlot()
+        with ProcessRunner.runnersLock:
+            ProcessRunner.runners.add(self)
+        try:
+            lines = self.execute()
+        finally:
+            with ProcessRunner.runnersLock:
+                ProcessRunner.runners.discard(self)
+            self.releaseSlot()
+        if self.finishedHandler is not None:
+            self.finishedHandler(lines)
+        return lines
+
+    def execute(self):
+        if isWindows():
+            # Processes started with shell=True are killed along with
+            # their children using taskkill
+            preexec = None
+        else:
+            # A new process group, so the shell and all the processes
+            # it starts can be killed together
+            preexec = os.setsid
+        self.proc = subprocess.Popen(
+            self.command,
+            shell=self.shell,
+            stdout=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            preexec_fn=preexec,
+            )
+
+        chunks = Queue.Queue()
+        reader = threading.Thread(target=self.read,
+                                  args=(self.proc.stdout, chunks))
+        reader.daemon = True
+        reader.start()
+
+        lines = self.lines
+        pending = ''
+        start = time.time()
+        finished = False
+        while not finished:
+            try:
+                chunk = chunks.get(True, self.POLL_INTERVAL)
+            except Queue.Empty:
+                chunk = ''
+            if chunk is None:
+                finished = True
+                chunk = ''
+            data = pending + chunk
+            carry = ''
+            if data.endswith('\r') and not finished:
+                # It might be followed by a line feed in the next chunk
+                (data, carry) = (data[:-1], '\r')
+            tokens = self.LINE_SEPARATORS.split(data)
+            pending = tokens.pop() + carry
+            if finished and pending:
+                tokens.append(pending)
+            for line in tokens:
+                lines.append(line)
+                if self.lineHandler is not None:
+                    self.lineHandler(line)
+            if finished:
+                break
+            if self.isCanceled():
+                self.kill()
+                raise GeoAlgorithmExecutionException('Execution canceled')
+            if self.timeout > 0 and time.time() - start > self.timeout:
+                self.kill()
+                raise GeoAlgorithmExecutionException(
+                        'Execution timed out after %g seconds'
+                        % self.timeout)
+        self.proc.wait()
+        return lines
+
+    def read(self, stream, chunks):
+        # Whatever is available is read, instead of waiting for a line
+        # break, since some applications write their progress using
+        # carriage returns
+        fd = stream.fileno()
+        while True:
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                break
+            chunks.put(chunk)
+        chunks.put(None)
+
+    def kill(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        try:
+            if isWindows():
+                subprocess.call(['taskkill', '/F', '/T', '/PID',
+                                str(self.proc.pid)])
+            else:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.proc.wait()
@@ -32,6 +32,7 @@ from qgis.core import *
 import processing
 from processing import interface
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.AlgorithmRegistry import AlgorithmRegistry
 from processing.core.GeoAlgorithm import GeoAlgorithm
 from processing.core.ProcessingLog import ProcessingLog
 from processing.core.SilentProgress import SilentProgress
@@ -47,17 +48,9 @@ from processing.modeler.ModelerAlgorithmProvider import \
 from processing.modeler.ModelerOnlyAlgorithmProvider import \
         ModelerOnlyAlgorithmProvider
 from processing.algs.QGISAlgorithmProvider import QGISAlgorithmProvider
-from processing.grass.GrassAlgorithmProvider import GrassAlgorithmProvider
-from processing.lidar.LidarToolsAlgorithmProvider import \
-        LidarToolsAlgorithmProvider
-from processing.gdal.GdalOgrAlgorithmProvider import GdalOgrAlgorithmProvider
-from processing.otb.OTBAlgorithmProvider import OTBAlgorithmProvider
-from processing.r.RAlgorithmProvider import RAlgorithmProvider
-from processing.saga.SagaAlgorithmProvider import SagaAlgorithmProvider
 from processing.script.ScriptAlgorithmProvider import ScriptAlgorithmProvider
-from processing.taudem.TauDEMAlgorithmProvider import TauDEMAlgorithmProvider
-from processing.admintools.AdminToolsAlgorithmProvider import \
-        AdminToolsAlgorithmProvider
+from processing.core.LazyProvider import LazyProvider
+from processing.core.FolderWatcher import FolderWatcher
 from processing.tools import dataobjects
 
 
@@ -70,6 +63,9 @@ class Processing:
     # and values are list with all algorithms from that provider
     algs = {}
 
+    # Indexes of the algorithms in algs, to find them by name
+    registry = AlgorithmRegistry()
+
     # Same structure as algs
     actions = {}
 
@@ -78,6 +74,39 @@ class Processing:
 
     modeler = ModelerAlgorithmProvider()
 
+    # Watchers of the folders of the script and model providers, by
+    # provider name
+    watchers = {}
+
+    # Providers that are only imported when they are first needed. Each
+    # of them is described by its name, the module and class of the
+    # provider, its description and icon, and whether it is active by
+    # default.
+    lazyProviders = [
+        ('gdalogr', 'processing.gdal.GdalOgrAlgorithmProvider',
+         'GdalOgrAlgorithmProvider', 'GDAL/OGR', 'gdal/icons/gdalicon.png',
+         True),
+        ('lidartools', 'processing.lidar.LidarToolsAlgorithmProvider',
+         'LidarToolsAlgorithmProvider', 'Tools for LiDAR data',
+         'images/tool.png', False),
+        ('otb', 'processing.otb.OTBAlgorithmProvider',
+         'OTBAlgorithmProvider', 'Orfeo Toolbox (Image analysis)',
+         'images/otb.png', True),
+        ('r', 'processing.r.RAlgorithmProvider', 'RAlgorithmProvider',
+         'R scripts', ':/processing/images/r.png', False),
+        ('saga', 'processing.saga.SagaAlgorithmProvider',
+         'SagaAlgorithmProvider', 'SAGA', 'images/saga.png', True),
+        ('grass', 'processing.grass.GrassAlgorithmProvider',
+         'GrassAlgorithmProvider', 'GRASS commands', 'images/grass.png',
+         True),
+        ('taudem', 'processing.taudem.TauDEMAlgorithmProvider',
+         'TauDEMAlgorithmProvider', 'TauDEM (hydrologic analysis)',
+         'images/taudem.png', False),
+        ('gspg', 'processing.admintools.AdminToolsAlgorithmProvider',
+         'AdminToolsAlgorithmProvider', 'GeoServer/PostGIS tools',
+         'images/database.png', True),
+        ]
+
     @staticmethod
     def addProvider(provider, updateList=False):
         """Use this method to add algorithms from external providers.
@@ -118,6 +147,73 @@ class Processing:
             # before I found out how to properly avoid that.
             pass
 
+    @staticmethod
+    def loadProvider(name, notify=True):
+        """Imports and creates a provider that was added as a lazy
+        one, replacing it in the list of providers.
+
+        Returns the new provider, or None if there is no lazy provider
+        with the given name or it could not be created.
+        """
+        for (i, lazy) in enumerate(Processing.providers):
+            if isinstance(lazy, LazyProvider) and lazy.getName() == name:
+                break
+        else:
+            return None
+
+        settingName = 'ACTIVATE_' + name.upper().replace(' ', '_')
+        active = ProcessingConfig.getSetting(settingName)
+        try:
+            provider = lazy.createProvider()
+            provider.initializeSettings()
+        except:
+            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
+                                   'Could not load provider:'
+                                   + lazy.getDescription() + '\n'
+                                   + unicode(sys.exc_info()[1]))
+            lazy.unload()
+            Processing.providers.remove(lazy)
+            return None
+        Processing.providers[i] = provider
+        ProcessingConfig.loadSettings()
+        if active is not None:
+            ProcessingConfig.settings[settingName].value = active
+
+        provider.loadAlgorithms()
+        Processing.setProviderAlgs(provider)
+        Processing.actions[name] = list(provider.actions)
+        Processing.contextMenuActions.extend(provider.contextMenuActions)
+        Providers.providers[name] = provider
+        if notify:
+            Processing.fireAlgsListHasChanged()
+        return provider
+
+    @staticmethod
+    def loadLazyProviders(activeOnly=True):
+        """Loads all the providers that have not been loaded yet, or
+        only the active ones if activeOnly is True.
+
+        Returns True if any provider was loaded, in which case
+        listeners have already been notified.
+        """
+        loaded = False
+        for provider in list(Processing.providers):
+            if not isinstance(provider, LazyProvider):
+                continue
+            if activeOnly and not Processing.isProviderActive(provider):
+                continue
+            if Processing.loadProvider(provider.getName(), False) \
+                    is not None:
+                loaded = True
+        if loaded:
+            Processing.fireAlgsListHasChanged()
+        return loaded
+
+    @staticmethod
+    def isProviderActive(provider):
+        name = 'ACTIVATE_' + provider.getName().upper().replace(' ', '_')
+        return bool(ProcessingConfig.getSetting(name))
+
     @staticmethod
     def getProviderFromName(name):
         """Returns the provider with the given name.
@@ -140,15 +236,9 @@ class Processing:
         # Add the basic providers
         Processing.addProvider(QGISAlgorithmProvider())
         Processing.addProvider(ModelerOnlyAlgorithmProvider())
-        Processing.addProvider(GdalOgrAlgorithmProvider())
-        Processing.addProvider(LidarToolsAlgorithmProvider())
-        Processing.addProvider(OTBAlgorithmProvider())
-        Processing.addProvider(RAlgorithmProvider())
-        Processing.addProvider(SagaAlgorithmProvider())
-        Processing.addProvider(GrassAlgorithmProvider())
         Processing.addProvider(ScriptAlgorithmProvider())
-        Processing.addProvider(TauDEMAlgorithmProvider())
-        Processing.addProvider(AdminToolsAlgorithmProvider())
+        for description in Processing.lazyProviders:
+            Processing.addProvider(LazyProvider(*description))
         Processing.modeler.initializeSettings()
 
         # And initialize
@@ -158,6 +248,25 @@ class Processing:
         ProcessingConfig.loadSettings()
         RenderingStyles.loadStyles()
         Processing.loadFromProviders()
+        Processing.watchFolders()
+
+    @staticmethod
+    def watchFolders():
+        """Starts watching the folders of scripts and models, so
+        changes made outside of QGIS are loaded.
+        """
+        for (name, extension) in [('script', 'py'), ('model', 'model')]:
+            if name not in Processing.watchers:
+                Processing.watchers[name] = FolderWatcher(extension,
+                        lambda name=name: Processing.updateProviderAlgs(name))
+            provider = Processing.getProviderFromName(name)
+            Processing.watchers[name].setFolders(provider.getFolders())
+
+    @staticmethod
+    def stopWatchingFolders():
+        for watcher in Processing.watchers.values():
+            watcher.stop()
+        Processing.watchers = {}
 
     @staticmethod
     def updateAlgsList():
@@ -166,6 +275,7 @@ class Processing:
         algorithm providers.
         """
         Processing.loadFromProviders()
+        Processing.watchFolders()
         Processing.fireAlgsListHasChanged()
 
     @staticmethod
@@ -193,44 +303,101 @@ class Processing:
         for listener in Processing.listeners:
             listener.algsListHasChanged()
 
+    @staticmethod
+    def fireAlgsHaveChanged(changes):
+        """Notifies listeners of the algorithms added, removed and
+        modified in some providers.
+
+        changes is a list of (providerName, added, removed, modified)
+        tuples, like the ones returned by setProviderAlgs(). Listeners
+        that implement an algsHaveChanged() method get each change with
+        algorithms in it. The rest get algsListHasChanged() called if
+        there is any change.
+        """
+        changes = [change for change in changes
+                   if change[1] or change[2] or change[3]]
+        if not changes:
+            return
+        for listener in Processing.listeners:
+            if hasattr(listener, 'algsHaveChanged'):
+                for change in changes:
+                    listener.algsHaveChanged(*change)
+            else:
+                listener.algsListHasChanged()
+
+    @staticmethod
+    def updateProviderAlgs(providerName):
+        """Call this method when the algorithms of a single provider
+        have changed, instead of updateAlgsList().
+
+        Only the algorithms of that provider and models are loaded
+        again, since models can contain algorithms from any provider.
+        Listeners are only notified of the algorithms that have changed.
+        """
+        provider = Processing.getProviderFromName(providerName)
+        if isinstance(provider, LazyProvider):
+            Processing.loadProvider(providerName)
+            return
+        changes = []
+        if provider is not Processing.modeler:
+            provider.loadAlgorithms()
+            changes.append(Processing.setProviderAlgs(provider))
+        changes.append(Processing.loadModels())
+        if providerName in Processing.watchers:
+            # The folder might have been changed in the settings
+            Processing.watchers[providerName].setFolders(
+                    provider.getFolders())
+        Processing.fireAlgsHaveChanged(changes)
+
+    @staticmethod
+    def setProviderAlgs(provider):
+        """Sets the algorithms of a provider from its list of
+        algorithms.
+
+        Returns a (providerName, added, removed, modified) tuple with
+        the lists of algorithms that were not in the provider, are no
+        longer in it, and have been replaced by a different object.
+        """
+        algs = {}
+        for alg in provider.algs:
+            algs[alg.commandLineName()] = alg
+        previous = Processing.algs.get(provider.getName(), {})
+        Processing.algs[provider.getName()] = algs
+        Processing.registry.setProviderAlgs(provider.getName(), algs)
+
+        added = [alg for (name, alg) in algs.items() if name not in previous]
+        removed = [alg for (name, alg) in previous.items()
+                   if name not in algs]
+        modified = [alg for (name, alg) in algs.items()
+                    if name in previous and previous[name] is not alg]
+        return (provider.getName(), added, removed, modified)
+
     @staticmethod
     def loadAlgorithms():
         Processing.algs = {}
+        Processing.registry = AlgorithmRegistry()
         Processing.updateProviders()
         for provider in Processing.providers:
-            providerAlgs = provider.algs
-            algs = {}
-            for alg in providerAlgs:
-                algs[alg.commandLineName()] = alg
-            Processing.algs[provider.getName()] = algs
+            if not isinstance(provider, LazyProvider):
+                Processing.setProviderAlgs(provider)
+        Processing.loadModels()
+        provs = {}
+        for provider in Processing.providers:
+            provs[provider.getName()] = provider
+        provs[Processing.modeler.getName()] = Processing.modeler
+        Providers.providers = provs
 
+    @staticmethod
+    def loadModels():
         # This is a special provider, since it depends on others.
         # TODO: Fix circular imports, so this provider can be
         # incorporated as a normal one.
+        # Models containing other models are loaded after them by the
+        # provider, so a single pass is enough.
         provider = Processing.modeler
         provider.setAlgsList(Processing.algs)
         provider.loadAlgorithms()
-        providerAlgs = provider.algs
-        algs = {}
-        for alg in providerAlgs:
-            algs[alg.commandLineName()] = alg
-        Processing.algs[provider.getName()] = algs
-
-        # And we do it again, in case there are models containing
-        # models.
-        # TODO: Improve this
-        provider.setAlgsList(Processing.algs)
-        provider.loadAlgorithms()
-        providerAlgs = provider.algs
-        algs = {}
-        for alg in providerAlgs:
-            algs[alg.commandLineName()] = alg
-        Processing.algs[provider.getName()] = algs
-        provs = {}
-        for provider in Processing.providers:
-            provs[provider.getName()] = provider
-        provs[Processing.modeler.getName()] = Processing.modeler
-        Providers.providers = provs
+        return Processing.setProviderAlgs(provider)
 
     @staticmethod
     def loadActions():
@@ -262,18 +429,23 @@ class Processing:
 
     @staticmethod
     def getAlgorithm(name):
-        for provider in Processing.algs.values():
-            if name in provider:
-                return provider[name]
-        return None
+        alg = Processing.registry.getAlgorithm(name)
+        if alg is None and ':' in name:
+            # It might belong to a provider that is not loaded yet
+            if Processing.loadProvider(name[:name.find(':')]) is not None:
+                alg = Processing.registry.getAlgorithm(name)
+        return alg
 
     @staticmethod
     def getAlgorithmFromFullName(name):
-        for provider in Processing.algs.values():
-            for alg in provider.values():
-                if alg.name == name:
-                    return alg
-        return None
+        return Processing.registry.getAlgorithmFromFullName(name)
+
+    @staticmethod
+    def searchAlgorithms(text, decorated=False):
+        """Returns the set of algorithms whose name contains the given
+        text, ignoring case.
+        """
+        return Processing.registry.search(text, decorated)
 
     @staticmethod
     def getObject(uri):
@@ -295,13 +467,16 @@ class Processing:
         if alg is None:
             print 'Error: Algorithm not found\n'
             return
-        if len(args) != alg.getVisibleParametersCount() \
-                    + alg.getVisibleOutputsCount():
+        params = alg.getParametersForValues([param for param in
+                alg.parameters if not param.hidden], len(args)
+                - alg.getVisibleOutputsCount())
+        if params is None:
             print 'Error: Wrong number of parameters'
             processing.alghelp(algOrName)
             return
 
         alg = alg.getCopy()
+        params = [alg.getParameterFromName(param.name) for param in params]
         if isinstance(args, dict):
             # Set params by name
             for (name, value) in args.items():
@@ -315,12 +490,15 @@ class Processing:
         else:
             i = 0
             for param in alg.parameters:
-                if not param.hidden:
+                if param in params:
                     if not param.setValue(args[i]):
                         print 'Error: Wrong parameter value: ' \
                             + unicode(args[i])
                         return
                     i = i + 1
+                elif not param.hidden:
+                    # Added after the call was written
+                    param.setValue(None)
 
             for output in alg.outputs:
                 if not output.hidden:
@@ -26,6 +26,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os.path
+import multiprocessing
 from PyQt4 import QtGui
 from processing.tools.system import *
 
@@ -47,6 +48,12 @@ class ProcessingConfig:
     POST_EXECUTION_SCRIPT = 'POST_EXECUTION_SCRIPT'
     SHOW_CRS_DEF = 'SHOW_CRS_DEF'
     WARN_UNMATCHING_CRS = 'WARN_UNMATCHING_CRS'
+    MAX_THREADS = 'MAX_THREADS'
+    FEATURE_CACHE_SIZE = 'FEATURE_CACHE_SIZE'
+    EXPORT_CACHE_SIZE = 'EXPORT_CACHE_SIZE'
+    MAX_PROCESSES = 'MAX_PROCESSES'
+    PROCESS_TIMEOUT = 'PROCESS_TIMEOUT'
+    PROFILE_ALGORITHMS = 'PROFILE_ALGORITHMS'
 
     settings = {}
     settingIcons = {}
@@ -79,6 +86,31 @@ class ProcessingConfig:
         ProcessingConfig.addSetting(Setting('General',
                 ProcessingConfig.WARN_UNMATCHING_CRS,
                 "Warn before executing if layer CRS's do not match", True))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.MAX_THREADS,
+                'Max. number of parallel executions in batch processes, '
+                'iterations and models',
+                multiprocessing.cpu_count()))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.FEATURE_CACHE_SIZE,
+                'Max. memory used to cache features (MB, 0 for no limit)',
+                512))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.EXPORT_CACHE_SIZE,
+                'Max. disk space used to cache exported layers (MB, 0 to '
+                'disable)', 1024))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.MAX_PROCESSES,
+                'Max. number of external applications running at the same '
+                'time', multiprocessing.cpu_count()))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.PROCESS_TIMEOUT,
+                'Timeout for external applications (seconds, 0 for no '
+                'timeout)', 0))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.PROFILE_ALGORITHMS,
+                'Profile algorithms when running them (slower, see '
+                'processing.algstats())', False))
         ProcessingConfig.addSetting(Setting('General',
                 ProcessingConfig.RASTER_STYLE,
                 'Style for raster layers', ''))
@@ -27,8 +27,13 @@ __revision__ = '$Format:%H$'
 
 import os
 import re
+import time
 import codecs
+import atexit
+import sqlite3
 import datetime
+import threading
+import Queue
 from PyQt4 import QtGui
 from processing.tools.system import *
 from processing.core.ProcessingConfig import ProcessingConfig
@@ -43,24 +48,41 @@ class ProcessingLog:
     DATE_FORMAT = u'%a %b %d %Y %H:%M:%S'.encode('utf-8')
     recentAlgs = []
 
+    # The writer thread, started by startLogging()
+    writer = None
+
     @staticmethod
     def startLogging():
-        if os.path.isfile(ProcessingLog.logFilename()):
-            logfile = codecs.open(ProcessingLog.logFilename(), 'a',
-                                  encoding='utf-8')
-        else:
-            logfile = codecs.open(ProcessingLog.logFilename(), 'w',
-                                  encoding='utf-8')
-        logfile.write('Started logging at '
-                + datetime.datetime.now().strftime(
-                        ProcessingLog.DATE_FORMAT).decode('utf-8') + '\n')
-        logfile.close()
+        text = 'Started logging at ' + datetime.datetime.now().strftime(
+                ProcessingLog.DATE_FORMAT).decode('utf-8')
+        ProcessingLog.getWriter().add(None, time.time(), text)
+
+    @staticmethod
+    def getWriter():
+        if ProcessingLog.writer is None \
+                or not ProcessingLog.writer.is_alive():
+            # A new writer is started if the previous one has died
+            ProcessingLog.writer = LogWriter(ProcessingLog.logFilename(),
+                                             ProcessingLog.databaseFilename())
+            ProcessingLog.writer.start()
+            atexit.register(ProcessingLog.stopLogging)
+        return ProcessingLog.writer
+
+    @staticmethod
+    def stopLogging():
+        if ProcessingLog.writer is not None:
+            ProcessingLog.writer.stop()
+            ProcessingLog.writer = None
 
     @staticmethod
     def logFilename():
         batchfile = userFolder() + os.sep + 'processing.log'
         return batchfile
 
+    @staticmethod
+    def databaseFilename():
+        return os.path.join(userFolder(), 'processing_log.sqlite')
+
     @staticmethod
     def addToLog(msgtype, msg):
         try:
@@ -73,52 +95,72 @@ class ProcessingLog:
                 text = a
             else:
                 text = msg.replace('\n', '|')
-            line = msgtype + '|' + datetime.datetime.now().strftime(
-                    ProcessingLog.DATE_FORMAT).decode('utf-8') + '|' \
-                    + text + '\n'
-            logfile = codecs.open(ProcessingLog.logFilename(), 'a',
-                                  encoding='utf-8')
-            logfile.write(line)
-            logfile.close()
+            writer = ProcessingLog.getWriter()
+            writer.add(msgtype, time.time(), text)
             if msgtype == ProcessingLog.LOG_ALGORITHM:
                 algname = text[len('Processing.runalg("'):]
                 algname = algname[:algname.index('"')]
                 if algname not in ProcessingLog.recentAlgs:
                     ProcessingLog.recentAlgs.append(algname)
                     recentAlgsString = ';'.join(ProcessingLog.recentAlgs[-6:])
-                    ProcessingConfig.setSettingValue(
-                            ProcessingConfig.RECENT_ALGORITHMS,
-                            recentAlgsString)
+
+                    # The settings are saved by the writer thread
+                    setting = ProcessingConfig.settings.get(
+                            ProcessingConfig.RECENT_ALGORITHMS)
+                    if setting is not None:
+                        setting.value = recentAlgsString
+                        writer.saveSettings = True
         except:
             pass
 
     @staticmethod
-    def getLogEntries():
-        entries = {}
-        errors = []
-        algorithms = []
-        warnings = []
-        info = []
-        lines = tail(ProcessingLog.logFilename())
-        for line in lines:
-            line = line.strip('\n').strip()
-            tokens = line.split('|')
-            text = ''
-            for i in range(2, len(tokens)):
-                text += tokens[i] + '|'
-            if line.startswith(ProcessingLog.LOG_ERROR):
-                errors.append(LogEntry(tokens[1], text))
-            elif line.startswith(ProcessingLog.LOG_ALGORITHM):
-                algorithms.append(LogEntry(tokens[1], tokens[2]))
-            elif line.startswith(ProcessingLog.LOG_WARNING):
-                warnings.append(LogEntry(tokens[1], text))
-            elif line.startswith(ProcessingLog.LOG_INFO):
-                info.append(LogEntry(tokens[1], text))
-
-        entries[ProcessingLog.LOG_ERROR] = errors
-        entries[ProcessingLog.LOG_ALGORITHM] = algorithms
-        entries[ProcessingLog.LOG_INFO] = info
-        entries[ProcessingLog.LOG_WARNING] = warnings
+    def flush():
+        """Waits until all the messages added have been written.
+        """
+        if ProcessingLog.writer is not None:
+            ProcessingLog.writer.flush()
+
+    @staticmethod
+    def getLogEntries(types=None, start=None, end=None, limit=200):
+        """Returns the last entries of the log, as a dict with message
+        types as keys and lists of LogEntry as values.
+
+        Only the given types are returned, or all of them if types is
+        None. start and end are datetime objects limiting the dates of
+        the entries. At most limit entries of each type are returned.
+        """
+        if types is None:
+            types = [ProcessingLog.LOG_ERROR, ProcessingLog.LOG_ALGORITHM,
+                     ProcessingLog.LOG_INFO, ProcessingLog.LOG_WARNING]
+        entries = dict((msgtype, []) for msgtype in types)
+        ProcessingLog.flush()
+        if not os.path.isfile(ProcessingLog.databaseFilename()):
+            return entries
+
+        conditions = 'type = ?'
+        args = []
+        if start is not None:
+            conditions += ' AND timestamp >= ?'
+            args.append(time.mktime(start.timetuple()))
+        if end is not None:
+            conditions += ' AND timestamp <= ?'
+            args.append(time.mktime(end.timetuple()))
+        db = sqlite3.connect(ProcessingLog.databaseFilename())
+        try:
+            for msgtype in types:
+                rows = db.execute('SELECT timestamp, text FROM log WHERE '
+                                  + conditions
+                                  + ' ORDER BY id DESC LIMIT ?',
+                                  [msgtype] + args + [limit]).fetchall()
+                for (timestamp, text) in reversed(rows):
+                    date = datetime.datetime.fromtimestamp(timestamp)
+                    entries[msgtype].append(LogEntry(date.strftime(
+                            ProcessingLog.DATE_FORMAT).decode('utf-8'),
+                            text))
+        except sqlite3.Error:
+            pass
+        finally:
+            db.close()
         return entries
 
     @staticmethod
@@ -133,7 +175,9 @@ class ProcessingLog:
 
     @staticmethod
     def clearLog():
-        os.unlink(ProcessingLog.logFilename())
+        ProcessingLog.flush()
+        if ProcessingLog.writer is not None:
+            ProcessingLog.writer.clear()
         ProcessingLog.startLogging()
 
 
@@ -143,6 +187,236 @@ class LogEntry:
         self.date = date
         self.text = text
 
+
+class LogWriter(threading.Thread):
+    """A thread that writes log messages, so adding them does not have
+    to wait for them to be written.
+
+    Messages are written in batches to a text file, which is rotated
+    when it gets bigger than MAX_FILE_SIZE, and to an SQLite database
+    that keeps the last MAX_ENTRIES messages and can be queried by
+    type and date.
+
+    Messages are queued until they are written, at most every
+    FLUSH_INTERVAL seconds. If there are more than MAX_QUEUED messages
+    waiting, adding a message blocks until they have been written.
+    Errors while writing are ignored, so the queue is always drained,
+    and if the thread is not running, messages are dropped instead of
+    blocking.
+    """
+
+    FLUSH_INTERVAL = 1
+    MAX_QUEUED = 10000
+    MAX_FILE_SIZE = 10 * 1024 * 1024
+    MAX_FILE_BACKUPS = 3
+    MAX_ENTRIES = 100000
+
+    def __init__(self, filename, dbFilename):
+        threading.Thread.__init__(self, name='ProcessingLog')
+        self.daemon = True
+        self.filename = filename
+        self.dbFilename = dbFilename
+        self.queue = Queue.Queue(self.MAX_QUEUED)
+        self.saveSettings = False
+        self.logfile = None
+        self.db = None
+
+    def add(self, msgtype, timestamp, text):
+        while self.is_alive():
+            try:
+                self.queue.put((msgtype, timestamp, text), True,
+                               self.FLUSH_INTERVAL)
+                return
+            except Queue.Full:
+                pass
+
+    def flush(self):
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks and self.is_alive():
+                self.queue.all_tasks_done.wait(self.FLUSH_INTERVAL)
+
+    def clear(self):
+        self.add('CLEAR', None, None)
+        self.flush()
+
+    def stop(self):
+        self.add('STOP', None, None)
+        self.join()
+
+    def run(self):
+        try:
+            self.openDatabase()
+        except Exception:
+            self.db = None
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.queue.get(True, self.FLUSH_INTERVAL))
+                while len(batch) < self.MAX_QUEUED:
+                    batch.append(self.queue.get_nowait())
+            except Queue.Empty:
+                pass
+            running = 'STOP' not in [message[0] for message in batch]
+            try:
+                self.process(batch)
+            except Exception:
+                # The messages are lost, but the queue keeps being
+                # drained, so adding messages never blocks forever
+                pass
+            finally:
+                for i in xrange(len(batch)):
+                    self.queue.task_done()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def process(self, batch):
+        messages = []
+        for (msgtype, timestamp, text) in batch:
+            if msgtype == 'STOP':
+                pass
+            elif msgtype == 'CLEAR':
+                self.write(messages)
+                messages = []
+                try:
+                    self.removeAll()
+                except Exception:
+                    pass
+            else:
+                messages.append((msgtype, timestamp, text))
+        self.write(messages)
+
+    def openDatabase(self):
+        try:
+            exists = os.path.isfile(self.dbFilename)
+            self.db = sqlite3.connect(self.dbFilename)
+            self.db.execute('CREATE TABLE IF NOT EXISTS log (id INTEGER '
+                            'PRIMARY KEY, type TEXT, timestamp REAL, '
+                            'text TEXT)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS log_type ON log '
+                            '(type, timestamp)')
+            self.db.commit()
+        except sqlite3.Error:
+            self.db = None
+            return
+        if not exists:
+            # A text log that cannot be read is just not imported
+            try:
+                self.importLogFile()
+            except Exception:
+                pass
+
+    def importLogFile(self):
+        """Adds the last messages of an existing text log, written
+        before messages were stored in the database.
+        """
+        if not os.path.isfile(self.filename):
+            return
+        messages = []
+        for line in tail(self.filename, 1000):
+            tokens = line.strip('\n').strip().split('|')
+            if len(tokens) < 3 or tokens[0] not in (ProcessingLog.LOG_ERROR,
+                    ProcessingLog.LOG_ALGORITHM, ProcessingLog.LOG_INFO,
+                    ProcessingLog.LOG_WARNING):
+                continue
+            try:
+                date = datetime.datetime.strptime(tokens[1].encode('utf-8'),
+                        ProcessingLog.DATE_FORMAT)
+                timestamp = time.mktime(date.timetuple())
+            except ValueError:
+                timestamp = 0
+            messages.append((tokens[0], timestamp, '|'.join(tokens[2:])))
+        self.db.executemany('INSERT INTO log (type, timestamp, text) '
+                            'VALUES (?, ?, ?)', messages)
+        self.db.commit()
+
+    def write(self, messages):
+        if messages:
+            # As when adding messages, it is better to miss some of
+            # them than to stop writing the rest
+            try:
+                self.writeFile(messages)
+            except Exception:
+                pass
+            try:
+                self.writeDatabase(messages)
+            except Exception:
+                pass
+        if self.saveSettings:
+            self.saveSettings = False
+            try:
+                ProcessingConfig.saveSettings()
+            except Exception:
+                pass
+
+    def writeFile(self, messages):
+        if self.logfile is None:
+            self.logfile = codecs.open(self.filename, 'a', encoding='utf-8')
+        for (msgtype, timestamp, text) in messages:
+            if msgtype is None:
+                self.logfile.write(text + '\n')
+            else:
+                date = datetime.datetime.fromtimestamp(timestamp)
+                self.logfile.write(msgtype + '|' + date.strftime(
+                        ProcessingLog.DATE_FORMAT).decode('utf-8') + '|'
+                        + text + '\n')
+        self.logfile.flush()
+        if self.logfile.tell() > self.MAX_FILE_SIZE:
+            self.rotate()
+
+    def rotate(self):
+        self.logfile.close()
+        self.logfile = None
+        for i in xrange(self.MAX_FILE_BACKUPS - 1, 0, -1):
+            backup = self.filename + '.' + str(i)
+            if os.path.exists(backup):
+                newBackup = self.filename + '.' + str(i + 1)
+                if os.path.exists(newBackup):
+                    os.remove(newBackup)
+                os.rename(backup, newBackup)
+        backup = self.filename + '.1'
+        if os.path.exists(backup):
+            os.remove(backup)
+        os.rename(self.filename, backup)
+
+    def writeDatabase(self, messages):
+        if self.db is None:
+            return
+        messages = [message for message in messages if message[0]
+                    is not None]
+        self.db.executemany('INSERT INTO log (type, timestamp, text) '
+                            'VALUES (?, ?, ?)', messages)
+        self.db.execute('DELETE FROM log WHERE id <= (SELECT MAX(id) FROM '
+                        'log) - ?', (self.MAX_ENTRIES, ))
+        self.db.commit()
+
+    def removeAll(self):
+        if self.logfile is not None:
+            self.logfile.close()
+            self.logfile = None
+        try:
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+        except OSError:
+            pass
+        if self.db is not None:
+            try:
+                self.db.execute('DELETE FROM log')
+                self.db.commit()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        if self.logfile is not None:
+            self.logfile.close()
+            self.logfile = None
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
 """
 ***************************************************************************
     This code has been take from pytailer
@@ -25,49 +25,194 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+from collections import OrderedDict
 import numpy
 from osgeo import gdal
+from osgeo import gdal_array
 from osgeo import osr
 from PyQt4.QtCore import *
 from qgis.core import *
+from processing.gdal.GdalUtils import GdalUtils
 
 
 class RasterWriter:
+    """Writes a raster file, tile by tile.
+
+    The GDAL dataset is created when the writer is created. Values set
+    with setValue() are stored in a cache of tiles, and tiles that are
+    not used for a while are written to disk, so the output can be
+    larger than the available memory. Whole arrays can be written at
+    once with setBlock().
+
+    The format is taken from the file extension, and can be any of the
+    formats in GdalUtils.getSupportedRasters().
+
+    Cells that are not set are no-data. The no-data value depends on
+    the data type, as returned by nodataValue().
+    """
 
     NODATA = -99999.0
 
+    TILE_SIZE = 256
+    MAX_CACHED_TILES = 64
+
+    # Tiles evicted from the cache and used again are written more than
+    # once. That is done in place in an uncompressed file, while a
+    # compressed one would grow with each new version of the tile
+    GTIFF_OPTIONS = ['TILED=YES', 'BIGTIFF=IF_SAFER']
+
     def __init__(self, fileName, minx, miny, maxx, maxy, cellsize,
-                 nbands, crs):
+                 nbands, crs, dataType=gdal.GDT_Float32, options=None):
         self.fileName = fileName
         self.nx = int((maxx - minx) / float(cellsize))
         self.ny = int((maxy - miny) / float(cellsize))
         self.nbands = nbands
-        self.matrix = numpy.ones(shape=(self.ny, self.nx), dtype=numpy.float32)
-        self.matrix[:] = self.NODATA
         self.cellsize = cellsize
         self.crs = crs
         self.minx = minx
         self.maxy = maxy
+        self.dtype = gdal_array.GDALTypeCodeToNumericTypeCode(dataType)
+        self.nodata = self.nodataValue(dataType)
+
+        format = GdalUtils.getFormatShortNameFromFilename(fileName)
+        if options is None:
+            options = self.GTIFF_OPTIONS if format == 'GTiff' else []
+        driver = gdal.GetDriverByName(format)
+        self.dataset = driver.Create(fileName, self.nx, self.ny, nbands,
+                                     dataType, options)
+        self.dataset.SetProjection(str(crs.toWkt()))
+        self.dataset.SetGeoTransform([minx, cellsize, 0, maxy, 0,
+                                     -cellsize])
+        for i in xrange(nbands):
+            self.dataset.GetRasterBand(i + 1).SetNoDataValue(self.nodata)
+
+        self.tiles = OrderedDict()
+        self.written = set()
+
+    @staticmethod
+    def nodataValue(dataType):
+        """Returns the no-data value for the given GDAL data type.
+
+        That is NODATA for floating point types. It does not fit in
+        integer types, so the lowest value is used for signed ones, and
+        the highest one for unsigned ones.
+        """
+        dtype = numpy.dtype(gdal_array.GDALTypeCodeToNumericTypeCode(
+                dataType))
+        if dtype.kind == 'i':
+            return int(numpy.iinfo(dtype).min)
+        elif dtype.kind == 'u':
+            return int(numpy.iinfo(dtype).max)
+        return RasterWriter.NODATA
 
     def setValue(self, value, x, y, band=0):
-        try:
-            self.matrix[y, x] = value
-        except IndexError:
-            pass
+        if not self.contains(x, y, band):
+            return
+        (tile, dirty) = self.getTile(band, x / self.TILE_SIZE, y
+                                     / self.TILE_SIZE)
+        tile[y % self.TILE_SIZE, x % self.TILE_SIZE] = value
+        dirty[0] = True
 
     def getValue(self, x, y, band=0):
-        try:
-            return self.matrix[y, x]
-        except IndexError:
-            return self.NODATA
+        if not self.contains(x, y, band):
+            return self.nodata
+        (tile, dirty) = self.getTile(band, x / self.TILE_SIZE, y
+                                     / self.TILE_SIZE)
+        return tile[y % self.TILE_SIZE, x % self.TILE_SIZE]
+
+    def setBlock(self, array, x=0, y=0, band=0):
+        """Writes a 2D array with its upper left corner at cell (x, y).
+
+        The part of the array in each tile is written directly to the
+        dataset, unless the tile is in the cache, in which case it is
+        copied to it.
+        """
+        array = numpy.asarray(array, self.dtype)
+        (height, width) = array.shape
+        rasterBand = self.dataset.GetRasterBand(band + 1)
+        xTiles = xrange(x / self.TILE_SIZE, (x + width - 1) / self.TILE_SIZE
+                        + 1)
+        yTiles = xrange(y / self.TILE_SIZE, (y + height - 1)
+                        / self.TILE_SIZE + 1)
+        for tileY in yTiles:
+            for tileX in xTiles:
+                key = (band, tileX, tileY)
+                (tileHeight, tileWidth) = self.tileShape(tileX, tileY)
+                left = tileX * self.TILE_SIZE
+                top = tileY * self.TILE_SIZE
+
+                # Cells of the tile covered by the array
+                (x0, x1) = (max(x, left), min(x + width, left + tileWidth))
+                (y0, y1) = (max(y, top), min(y + height, top + tileHeight))
+                part = array[y0 - y:y1 - y, x0 - x:x1 - x]
+                if key in self.tiles:
+                    (tile, dirty) = self.tiles[key]
+                    tile[y0 - top:y1 - top, x0 - left:x1 - left] = part
+                    dirty[0] = True
+                elif key in self.written \
+                        or part.shape == (tileHeight, tileWidth):
+                    rasterBand.WriteArray(part, x0, y0)
+                    self.written.add(key)
+                else:
+                    # Cells of the tile outside the array must be
+                    # no-data
+                    tile = self.emptyTile(key)
+                    tile[y0 - top:y1 - top, x0 - left:x1 - left] = part
+                    self.writeTile(key, tile, [True])
+
+    def contains(self, x, y, band):
+        return 0 <= x < self.nx and 0 <= y < self.ny \
+            and 0 <= band < self.nbands
+
+    def tileShape(self, tileX, tileY):
+        return (min(self.TILE_SIZE, self.ny - tileY * self.TILE_SIZE),
+                min(self.TILE_SIZE, self.nx - tileX * self.TILE_SIZE))
+
+    def emptyTile(self, key):
+        tile = numpy.empty(self.tileShape(key[1], key[2]), self.dtype)
+        tile.fill(self.nodata)
+        return tile
+
+    def getTile(self, band, tileX, tileY):
+        key = (band, tileX, tileY)
+        if key in self.tiles:
+            # Move the tile to the end, as the most recently used one
+            entry = self.tiles.pop(key)
+        else:
+            if key in self.written:
+                (height, width) = self.tileShape(tileX, tileY)
+                tile = self.dataset.GetRasterBand(band + 1).ReadAsArray(
+                        tileX * self.TILE_SIZE, tileY * self.TILE_SIZE,
+                        width, height)
+            else:
+                tile = self.emptyTile(key)
+            entry = (tile, [False])
+            if len(self.tiles) >= self.MAX_CACHED_TILES:
+                (oldKey, oldEntry) = self.tiles.popitem(last=False)
+                self.writeTile(oldKey, *oldEntry)
+        self.tiles[key] = entry
+        return entry
+
+    def writeTile(self, key, tile, dirty):
+        if not dirty[0] and key in self.written:
+            return
+        (band, tileX, tileY) = key
+        self.dataset.GetRasterBand(band + 1).WriteArray(tile, tileX
+                * self.TILE_SIZE, tileY * self.TILE_SIZE)
+        self.written.add(key)
 
     def close(self):
-        format = 'GTiff'
-        driver = gdal.GetDriverByName(format)
-        dst_ds = driver.Create(self.fileName, self.nx, self.ny, 1,
-                               gdal.GDT_Float32)
-        dst_ds.SetProjection(str(self.crs.toWkt()))
-        dst_ds.SetGeoTransform([self.minx, self.cellsize, 0,
-                                self.maxy, self.cellsize, 0])
-        dst_ds.GetRasterBand(1).WriteArray(self.matrix)
-        dst_ds = None
+        for (key, entry) in self.tiles.items():
+            self.writeTile(key, *entry)
+        self.tiles.clear()
+        # Tiles that were never set are filled with no-data
+        for band in xrange(self.nbands):
+            for tileY in xrange((self.ny + self.TILE_SIZE - 1)
+                                / self.TILE_SIZE):
+                for tileX in xrange((self.nx + self.TILE_SIZE - 1)
+                                    / self.TILE_SIZE):
+                    key = (band, tileX, tileY)
+                    if key not in self.written:
+                        self.writeTile(key, self.emptyTile(key), [True])
+        self.dataset.FlushCache()
+        self.dataset = None
@@ -25,15 +25,42 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import os
 import csv
 import codecs
 import cStringIO
+import sqlite3
 
 
 class TableWriter:
+    """Writes records to a table file.
+
+    The file is kept open while records are added, so the writer should
+    be closed when all records have been written, either by calling
+    close() or by using it in a with statement. It is also closed when
+    the writer is deleted.
+
+    Tables are written as CSV files, unless the file name has the
+    .sqlite extension. In that case, a SQLite database is created with
+    a single table, which is much faster to write and read when there
+    are millions of records.
+    """
+
+    BUFFER_SIZE = 1024 * 1024
+
+    # Number of records inserted in each SQLite transaction
+    SQLITE_BATCH_SIZE = 10000
 
     def __init__(self, fileName, encoding, fields):
         self.fileName = fileName
+        self.csvFile = None
+        self.db = None
+        fields = [(f.name() if hasattr(f, 'name') else f) for f in fields]
+
+        if self.fileName.lower().endswith('.sqlite'):
+            self.createDatabase(fields)
+            return
+
         if not self.fileName.lower().endswith('csv'):
             self.fileName += '.csv'
 
@@ -41,21 +68,88 @@ class TableWriter:
         if self.encoding is None or encoding == 'System':
             self.encoding = 'utf-8'
 
-        with open(self.fileName, 'wb') as csvFile:
-            self.writer = UnicodeWriter(csvFile, encoding=self.encoding)
-            if len(fields) != 0:
-                self.writer.writerow(fields)
+        self.csvFile = open(self.fileName, 'wb', self.BUFFER_SIZE)
+        self.writer = UnicodeWriter(self.csvFile, encoding=self.encoding)
+        if len(fields) != 0:
+            self.writer.writerow(fields)
+
+    def createDatabase(self, fields):
+        if os.path.exists(self.fileName):
+            os.remove(self.fileName)
+        self.db = sqlite3.connect(self.fileName)
+        self.db.execute('PRAGMA synchronous=OFF')
+        self.pending = []
+        self.numFields = len(fields)
+        self.insert = None
+        if fields:
+            self.createTable(fields)
+
+    def createTable(self, fields):
+        columns = ['"%s"' % unicode(f).replace('"', '""') for f in fields]
+        self.db.execute('CREATE TABLE data (%s)' % ', '.join(columns))
+        self.insert = 'INSERT INTO data VALUES (%s)' % ', '.join(['?']
+                * len(fields))
+        self.numFields = len(fields)
 
     def addRecord(self, values):
-        with open(self.fileName, 'ab') as csvFile:
-            self.writer = UnicodeWriter(csvFile, encoding=self.encoding)
+        if self.db is not None:
+            if self.insert is None:
+                # No field names were given, so the first record is used
+                self.createTable(values)
+                return
+            self.pending.append(self.sqlValues(values))
+            if len(self.pending) >= self.SQLITE_BATCH_SIZE:
+                self.flush()
+        else:
             self.writer.writerow(values)
 
     def addRecords(self, records):
-        with open(self.fileName, 'ab') as csvFile:
-            self.writer = UnicodeWriter(csvFile, encoding=self.encoding)
+        if self.db is not None:
+            records = iter(records)
+            if self.insert is None:
+                for values in records:
+                    self.createTable(values)
+                    break
+            self.pending.extend(self.sqlValues(values) for values in
+                                records)
+            if len(self.pending) >= self.SQLITE_BATCH_SIZE:
+                self.flush()
+        else:
             self.writer.writerows(records)
 
+    def sqlValues(self, values):
+        values = list(values)[:self.numFields]
+        values.extend([None] * (self.numFields - len(values)))
+        return [(v if isinstance(v, (int, long, float, unicode, str))
+                or v is None else unicode(v)) for v in values]
+
+    def flush(self):
+        if self.db is not None:
+            if self.pending:
+                self.db.executemany(self.insert, self.pending)
+                self.db.commit()
+                self.pending = []
+        elif self.csvFile is not None:
+            self.csvFile.flush()
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+        elif self.csvFile is not None:
+            self.csvFile.close()
+            self.csvFile = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
 
 class UnicodeWriter:
 
@@ -69,7 +163,7 @@ class UnicodeWriter:
         row = map(unicode, row)
         try:
             self.writer.writerow([s.encode('utf-8') for s in row])
-        except:
+        except UnicodeError:
             self.writer.writerow(row)
         data = self.queue.getvalue()
         data = data.decode('utf-8')
@@ -78,5 +172,19 @@ class UnicodeWriter:
         self.queue.truncate(0)
 
     def writerows(self, rows):
-        for row in rows:
-            self.writerow(row)
+        # The rows are encoded and written all at once, which is much
+        # faster than doing it for each row
+        rows = [map(unicode, row) for row in rows]
+        try:
+            self.writer.writerows([[s.encode('utf-8') for s in row]
+                                  for row in rows])
+        except UnicodeError:
+            self.queue.truncate(0)
+            for row in rows:
+                self.writerow(row)
+            return
+        data = self.queue.getvalue()
+        data = data.decode('utf-8')
+        data = self.encoder.encode(data)
+        self.stream.write(data)
+        self.queue.truncate(0)
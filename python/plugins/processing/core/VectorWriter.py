@@ -25,14 +25,46 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import os
+import time
 from PyQt4.QtCore import *
 from qgis.core import *
+from processing.core.AlgorithmStats import AlgorithmStats
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+
+try:
+    from osgeo import ogr, osr
+    ogrAvailable = True
+except:
+    ogrAvailable = False
 
 
 class VectorWriter:
+    """Writes features to a memory layer or a file.
+
+    Features written to memory layers and to database formats such as
+    SpatiaLite and GeoPackage are buffered and written in batches. For
+    database formats, each batch is written inside a transaction.
+    Features are copied when added, so the same QgsFeature object can
+    be modified and added again.
+
+    Buffered features are written when the writer is closed or
+    deleted. The writers returned by OutputVector.getVectorWriter() are
+    also closed once the algorithm has finished adding features.
+    """
 
     MEMORY_LAYER_PREFIX = 'memory:'
 
+    BATCH_SIZE = 1000
+
+    # OGR drivers for which features are written inside transactions
+    TRANSACTION_DRIVERS = {
+        'SQLite': [],
+        'SpatiaLite': ['SPATIALITE=YES'],
+        'GPKG': [],
+        }
+
     TYPE_MAP = {
         QGis.WKBPoint: 'Point',
         QGis.WKBLineString: 'LineString',
@@ -43,11 +75,18 @@ class VectorWriter:
         }
 
     def __init__(self, fileName, encoding, fields, geometryType,
-                 crs, options=None):
+                 crs, options=None, batchSize=None):
         self.fileName = fileName
         self.isMemory = False
         self.memLayer = None
         self.writer = None
+        self.ogrWriter = None
+        self.buffer = []
+        self.batchSize = batchSize or self.BATCH_SIZE
+        self.featuresWritten = 0
+        self.featuresReported = 0
+        self.writeTime = 0.0
+        self.startTime = time.time()
 
         if encoding is None:
             settings = QSettings()
@@ -79,15 +118,172 @@ class VectorWriter:
                 extension = 'shp'
                 self.filename = self.filename + 'shp'
 
-            qgsfields = QgsFields()
-            for field in fields:
-                qgsfields.append(field)
+            driverName = OGRCodes[extension]
+            if ogrAvailable and driverName in self.TRANSACTION_DRIVERS:
+                self.ogrWriter = OgrTransactionWriter(self.fileName,
+                        encoding, fields, geometryType, crs, driverName,
+                        self.TRANSACTION_DRIVERS[driverName])
+            else:
+                qgsfields = QgsFields()
+                for field in fields:
+                    qgsfields.append(field)
 
-            self.writer = QgsVectorFileWriter(self.fileName, encoding,
-                qgsfields, geometryType, crs, OGRCodes[extension])
+                self.writer = QgsVectorFileWriter(self.fileName, encoding,
+                    qgsfields, geometryType, crs, driverName)
 
     def addFeature(self, feature):
-        if self.isMemory:
-            self.writer.addFeatures([feature])
+        if self.isMemory or self.ogrWriter is not None:
+            self.buffer.append(QgsFeature(feature))
+            if len(self.buffer) >= self.batchSize:
+                self.flush()
         else:
+            t = time.time()
             self.writer.addFeature(feature)
+            self.writeTime += time.time() - t
+            self.featuresWritten += 1
+
+    def addFeatures(self, features):
+        """Adds all the features in an iterable."""
+        for feature in features:
+            self.addFeature(feature)
+
+    def flush(self):
+        """Writes the buffered features."""
+        if not self.buffer:
+            return
+        t = time.time()
+        if self.ogrWriter is not None:
+            self.ogrWriter.addFeatures(self.buffer)
+        else:
+            self.writer.addFeatures(self.buffer)
+        self.writeTime += time.time() - t
+        self.featuresWritten += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        """Writes the buffered features and closes the output file.
+        Nothing should be added after calling this.
+        """
+        self.flush()
+        if self.ogrWriter is not None:
+            self.ogrWriter.close()
+            self.ogrWriter = None
+        if not self.isMemory:
+            self.writer = None
+        AlgorithmStats.addFeaturesWritten(self.featuresWritten
+                                          - self.featuresReported)
+        self.featuresReported = self.featuresWritten
+
+    def stats(self):
+        """Returns a tuple with the number of features written, the
+        seconds spent writing them, and the number of features written
+        per second since the writer was created.
+        """
+        elapsed = time.time() - self.startTime
+        if elapsed > 0:
+            rate = self.featuresWritten / elapsed
+        else:
+            rate = 0.0
+        return (self.featuresWritten, self.writeTime, rate)
+
+    def __del__(self):
+        self.close()
+
+
+class OgrTransactionWriter:
+    """Writes features to a new OGR layer, adding each group of
+    features inside a single transaction.
+
+    An existing file with the same name is replaced. Text is always
+    stored as UTF-8 in the formats it is used for, so byte strings are
+    decoded using the given encoding before being written.
+    """
+
+    def __init__(self, fileName, encoding, fields, geometryType, crs,
+                 driverName, options):
+        self.encoding = encoding
+        if self.encoding is None or encoding == 'System':
+            self.encoding = 'utf-8'
+        if driverName == 'SpatiaLite':
+            driverName = 'SQLite'
+        driver = ogr.GetDriverByName(str(driverName))
+        encodedName = fileName.encode('utf-8')
+        if os.path.exists(fileName):
+            if driver.DeleteDataSource(encodedName) != 0 \
+                    and os.path.isfile(fileName):
+                os.remove(fileName)
+        self.dataSource = driver.CreateDataSource(encodedName, options)
+        if self.dataSource is None:
+            raise GeoAlgorithmExecutionException(
+                    'Could not create output file: ' + fileName)
+        srs = None
+        if crs.isValid():
+            srs = osr.SpatialReference()
+            srs.ImportFromWkt(str(crs.toWkt()))
+        name = os.path.splitext(os.path.basename(fileName))[0]
+        self.layer = self.dataSource.CreateLayer(name.encode('utf-8'), srs,
+                int(geometryType))
+        if self.layer is None:
+            raise GeoAlgorithmExecutionException(
+                    'Could not create output layer in file: ' + fileName)
+        fieldTypes = {
+            QVariant.Int: ogr.OFTInteger,
+            QVariant.LongLong: ogr.OFTInteger,
+            QVariant.Double: ogr.OFTReal,
+            QVariant.Date: ogr.OFTDate,
+            QVariant.Time: ogr.OFTTime,
+            QVariant.DateTime: ogr.OFTDateTime,
+            }
+        for field in fields:
+            fieldType = fieldTypes.get(field.type(), ogr.OFTString)
+            fieldDefn = ogr.FieldDefn(self.encode(field.name()), fieldType)
+            if fieldType in (ogr.OFTString, ogr.OFTReal):
+                fieldDefn.SetWidth(field.length())
+                fieldDefn.SetPrecision(field.precision())
+            self.layer.CreateField(fieldDefn)
+        self.defn = self.layer.GetLayerDefn()
+
+    def addFeatures(self, features):
+        self.layer.StartTransaction()
+        for feature in features:
+            ogrFeature = ogr.Feature(self.defn)
+            geom = feature.geometry()
+            if geom is not None:
+                ogrFeature.SetGeometry(ogr.CreateGeometryFromWkb(
+                        geom.asWkb()))
+            for (i, value) in enumerate(feature.attributes()):
+                if value is None or isinstance(value, QPyNullVariant):
+                    continue
+                if isinstance(value, (QDate, QTime, QDateTime)):
+                    # Year, month, day, hour, minute, second and time
+                    # zone flag (unknown)
+                    ogrFeature.SetField(i, *self.dateTimeValues(value))
+                    continue
+                if isinstance(value, basestring):
+                    value = self.encode(value)
+                ogrFeature.SetField(i, value)
+            self.layer.CreateFeature(ogrFeature)
+        self.layer.CommitTransaction()
+
+    def dateTimeValues(self, value):
+        if isinstance(value, QDateTime):
+            (date, time) = (value.date(), value.time())
+        elif isinstance(value, QDate):
+            (date, time) = (value, None)
+        else:
+            (date, time) = (None, value)
+        values = [0] * 7
+        if date is not None:
+            values[0:3] = [date.year(), date.month(), date.day()]
+        if time is not None:
+            values[3:6] = [time.hour(), time.minute(), time.second()]
+        return values
+
+    def encode(self, value):
+        if isinstance(value, str):
+            value = value.decode(self.encoding, 'replace')
+        return unicode(value).encode('utf-8')
+
+    def close(self):
+        self.layer = None
+        self.dataSource = None
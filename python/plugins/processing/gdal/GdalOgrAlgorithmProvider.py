@@ -138,3 +138,6 @@ class GdalOgrAlgorithmProvider(AlgorithmProvider):
 
     def getSupportedOutputRasterLayerExtensions(self):
         return GdalUtils.getSupportedRasterExtensions()
+
+    def supportsParallelExecution(self):
+        return True
@@ -26,9 +26,9 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import subprocess
 from PyQt4.QtCore import *
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 
 try:
     from osgeo import gdal
@@ -49,21 +49,15 @@ class GdalUtils:
         if not path.lower() in envval.lower().split(os.pathsep):
             envval += '%s%s' % (os.pathsep, path)
             os.putenv('PATH', envval)
-        loglines = []
-        loglines.append('GDAL execution console output')
         fused_command = ''.join(['%s ' % c for c in commands])
-        proc = subprocess.Popen(
-            fused_command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=False,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            loglines.append(line)
-        ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
-        GdalUtils.consoleOutput = loglines
+
+        def finished(lines):
+            loglines = ['GDAL execution console output'] + lines
+            ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+            GdalUtils.consoleOutput = loglines
+
+        ProcessRunner(fused_command, progress,
+                      finishedHandler=finished).run()
 
     @staticmethod
     def getConsoleOutput():
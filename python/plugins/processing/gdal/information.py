@@ -48,6 +48,10 @@ class information(GeoAlgorithm):
     def commandLineName(self):
         return "gdalorg:rasterinfo"
 
+    def supportsParallelExecution(self):
+        # The output is created from the console output of gdalinfo
+        return False
+
     def defineCharacteristics(self):
         self.name = 'Information'
         self.group = '[GDAL] Miscellaneous'
@@ -33,6 +33,7 @@ from PyQt4.QtGui import *
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from processing.core.AlgorithmProvider import AlgorithmProvider
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.DescriptionFileCache import DescriptionFileCache
 from processing.grass.GrassUtils import GrassUtils
 from processing.grass.GrassAlgorithm import GrassAlgorithm
 from processing.tools.system import *
@@ -71,10 +72,11 @@ class GrassAlgorithmProvider(AlgorithmProvider):
     def createAlgsList(self):
         self.preloadedAlgs = []
         folder = GrassUtils.grassDescriptionPath()
+        cache = DescriptionFileCache(self.getName(), folder)
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('txt'):
                 try:
-                    alg = GrassAlgorithm(os.path.join(folder, descriptionFile))
+                    alg = cache.getAlgorithm(descriptionFile, GrassAlgorithm)
                     if alg.name.strip() != '':
                         self.preloadedAlgs.append(alg)
                     else:
@@ -85,6 +87,7 @@ class GrassAlgorithmProvider(AlgorithmProvider):
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                             'Could not open GRASS algorithm: '
                             + descriptionFile)
+        cache.save()
         self.preloadedAlgs.append(nviz())
 
     def _loadAlgorithms(self):
@@ -28,11 +28,11 @@ __revision__ = '$Format:%H$'
 import stat
 import shutil
 import traceback
-import subprocess
 from qgis.core import QgsApplication
 from PyQt4.QtCore import *
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.tools.system import *
 from processing.tests.TestData import points
 
@@ -265,17 +265,10 @@ class GrassUtils:
     def executeGrass(commands, progress, outputCommands=None):
         loglines = []
         loglines.append('GRASS execution console output')
-        grassOutDone = False
-        command = GrassUtils.prepareGrassExecution(commands)
-        proc = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            ).stdout
-        for line in iter(proc.readline, ''):
+        # A list, so it can be modified from handleLine()
+        grassOutDone = [False]
+
+        def handleLine(line):
             if 'GRASS_INFO_PERCENT' in line:
                 try:
                     progress.setPercentage(int(line[len('GRASS_INFO_PERCENT')
@@ -284,36 +277,22 @@ class GrassUtils:
                     pass
             else:
                 if 'r.out' in line or 'v.out' in line:
-                    grassOutDone = True
+                    grassOutDone[0] = True
                 loglines.append(line)
                 progress.setConsoleInfo(line)
 
+        command = GrassUtils.prepareGrassExecution(commands)
+        ProcessRunner(command, progress, handleLine).run()
+
         # Some GRASS scripts, like r.mapcalculator or r.fillnulls, call
         # other GRASS scripts during execution. This may override any
         # commands that are still to be executed by the subprocess, which
         # are usually the output ones. If that is the case runs the output
         # commands again.
 
-        if not grassOutDone and outputCommands:
+        if not grassOutDone[0] and outputCommands:
             command = GrassUtils.prepareGrassExecution(outputCommands)
-            proc = subprocess.Popen(
-                command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                ).stdout
-            for line in iter(proc.readline, ''):
-                if 'GRASS_INFO_PERCENT' in line:
-                    try:
-                        progress.setPercentage(int(
-                            line[len('GRASS_INFO_PERCENT') + 2:]))
-                    except:
-                        pass
-                else:
-                    loglines.append(line)
-                    progress.setConsoleInfo(line)
+            ProcessRunner(command, progress, handleLine).run()
 
         if ProcessingConfig.getSetting(GrassUtils.GRASS_LOG_CONSOLE):
             ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
@@ -32,6 +32,7 @@ from PyQt4 import QtCore, QtGui, QtWebKit
 
 from processing.core.ProcessingLog import ProcessingLog
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.ProcessRunner import ProcessRunner
 from processing.core.WrongHelpFileException import WrongHelpFileException
 from processing.gui.Postprocessing import Postprocessing
 from processing.gui.UnthreadedAlgorithmExecutor import \
@@ -67,6 +68,7 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
         QtGui.QDialog.__init__(self, None, QtCore.Qt.WindowSystemMenuHint
                                | QtCore.Qt.WindowTitleHint)
         self.executed = False
+        self.canceled = False
         self.mainWidget = mainWidget
         self.alg = alg
         self.resize(650, 450)
@@ -222,6 +224,7 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
             self.runButton.setEnabled(False)
             self.buttonBox.button(
                     QtGui.QDialogButtonBox.Close).setEnabled(False)
+            self.canceled = False
             buttons = self.paramTable.iterateButtons
             self.iterateParam = None
 
@@ -308,6 +311,11 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
 
     def cancel(self):
         self.setInfo('<b>Algorithm %s canceled</b>' % self.alg.name)
+
+        # Parallel iterations stop, and the external applications
+        # being run are killed
+        self.canceled = True
+        ProcessRunner.cancelAll()
         try:
             self.algEx.algExecuted.disconnect()
             self.algEx.terminate()
@@ -28,7 +28,9 @@ __revision__ = '$Format:%H$'
 from PyQt4 import QtCore, QtGui
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingResults import ProcessingResults
+from processing.core.SilentProgress import SilentProgress
 from processing.gui.Postprocessing import Postprocessing
 from processing.gui.FileSelectionPanel import FileSelectionPanel
 from processing.gui.BatchInputSelectionPanel import BatchInputSelectionPanel
@@ -39,6 +41,8 @@ from processing.gui.FixedTablePanel import FixedTablePanel
 from processing.gui.BatchOutputSelectionPanel import BatchOutputSelectionPanel
 from processing.gui.UnthreadedAlgorithmExecutor import \
         UnthreadedAlgorithmExecutor
+from processing.gui.ParallelAlgorithmExecutor import \
+        ParallelAlgorithmExecutor
 from processing.parameters.ParameterFile import ParameterFile
 from processing.parameters.ParameterRaster import ParameterRaster
 from processing.parameters.ParameterTable import ParameterTable
@@ -59,6 +63,7 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
 
     def __init__(self, alg):
         self.algs = None
+        self.executor = None
         self.showAdvanced = False
         self.table = QtGui.QTableWidget(None)
         AlgorithmExecutionDialog.__init__(self, alg, self.table)
@@ -193,6 +198,16 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
         QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
         self.table.setEnabled(False)
         self.tabWidget.setCurrentIndex(1)
+        try:
+            numThreads = int(ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_THREADS))
+        except (TypeError, ValueError):
+            numThreads = 1
+        if numThreads > 1 and len(self.algs) > 1 \
+                and self.alg.supportsParallelExecution():
+            self.runParallel(numThreads)
+            return
+
         self.progress.setMaximum(len(self.algs))
         for (i, alg) in enumerate(self.algs):
             self.setBaseText('Processing algorithm ' + str(i + 1) + '/'
@@ -207,6 +222,38 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
 
         self.finishAll()
 
+    def runParallel(self, numThreads):
+        self.progress.setMaximum(100)
+        self.setBaseText('Processing ' + str(len(self.algs))
+                         + ' algorithms in ' + str(numThreads)
+                         + ' parallel threads...')
+        self.progressLabel.setText(self.baseText)
+        self.buttonBox.button(QtGui.QDialogButtonBox.Cancel).setEnabled(True)
+        self.executor = ParallelAlgorithmExecutor(len(self.algs),
+                numThreads, self.algs.__getitem__)
+
+        def algFinished(i, ok):
+            if ok and self.load[i]:
+                Postprocessing.handleAlgorithmResults(self.algs[i],
+                        SilentProgress(), False)
+
+        failed = self.executor.runalgs(self, algFinished)
+        canceled = self.executor.canceled
+        self.executor = None
+        self.buttonBox.button(QtGui.QDialogButtonBox.Cancel).setEnabled(False)
+        if canceled:
+            QApplication.restoreOverrideCursor()
+            return
+        if failed:
+            QApplication.restoreOverrideCursor()
+            self.table.setEnabled(True)
+            QMessageBox.warning(self, 'Batch processing',
+                    'The following rows could not be processed: '
+                    + ', '.join(str(i + 1) for i in failed)
+                    + '\nSee the log tab for more information')
+            return
+        self.finishAll()
+
     def loadHTMLResults(self, alg, i):
         for out in alg.outputs:
             if out.hidden or not out.open:
@@ -216,7 +263,11 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
                         + ']', out.value)
 
     def cancel(self):
+        # The external applications being run are killed, either by the
+        # executor or because this dialog is their progress object
         self.canceled = True
+        if self.executor is not None:
+            self.executor.cancel()
         self.table.setEnabled(True)
 
     def createSummaryTable(self):
@@ -344,6 +395,8 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
 
     def setText(self, text):
         self.progressLabel.setText(self.baseText + '   --- [' + text + ']')
+        if self.executor is not None:
+            self.setInfo(text)
 
     def setBaseText(self, text):
         self.baseText = text
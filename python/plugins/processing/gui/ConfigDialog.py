@@ -31,6 +31,7 @@ from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.Processing import Processing
 
 from processing.ui.ui_DlgConfig import Ui_DlgConfig
 
@@ -43,6 +44,10 @@ class ConfigDialog(QDialog, Ui_DlgConfig):
         QDialog.__init__(self)
         self.setupUi(self)
         self.toolbox = toolbox
+
+        # Settings of providers are only added when they are loaded
+        Processing.loadLazyProviders(False)
+
         self.groupIcon = QIcon()
         self.groupIcon.addPixmap(self.style().standardPixmap(
                 QStyle.SP_DirClosedIcon), QIcon.Normal, QIcon.Off)
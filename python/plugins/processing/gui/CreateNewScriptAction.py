@@ -55,4 +55,7 @@ class CreateNewScriptAction(ToolboxAction):
             dlg = ScriptEditorDialog(ScriptEditorDialog.SCRIPT_R, None)
         dlg.exec_()
         if dlg.update:
-            self.toolbox.updateTree()
+            if self.scriptType == self.SCRIPT_PYTHON:
+                self.toolbox.updateProvider('script')
+            else:
+                self.toolbox.updateProvider('r')
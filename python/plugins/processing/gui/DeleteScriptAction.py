@@ -57,4 +57,4 @@ class DeleteScriptAction(ContextAction):
                 QMessageBox.No)
         if reply == QMessageBox.Yes:
             os.remove(self.alg.descriptionFile)
-            self.toolbox.updateTree()
+            self.toolbox.updateProvider(self.alg.provider.getName())
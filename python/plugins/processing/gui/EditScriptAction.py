@@ -51,4 +51,4 @@ class EditScriptAction(ContextAction):
         dlg.show()
         dlg.exec_()
         if dlg.update:
-            self.toolbox.updateTree()
+            self.toolbox.updateProvider(self.alg.provider.getName())
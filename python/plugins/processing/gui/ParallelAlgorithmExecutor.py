@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    ParallelAlgorithmExecutor.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import threading
+import Queue
+from PyQt4.QtGui import *
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+
+
+class BufferedProgress:
+    """A progress object to be used by an algorithm running in a worker
+    thread.
+
+    Messages are not shown when received, but stored until the GUI
+    thread collects them and passes them to the real progress object.
+    Setting its canceled attribute to True kills the external
+    applications run with it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = []
+        self.percentage = 0
+        self.errorMsg = None
+        self.canceled = False
+
+    def addMessage(self, method, msg):
+        with self.lock:
+            self.messages.append((method, msg))
+
+    def takeMessages(self):
+        with self.lock:
+            messages = self.messages
+            self.messages = []
+        return messages
+
+    def forwardMessages(self, progress, prefix=''):
+        """Passes all stored messages to the given progress object.
+        This should only be called from the GUI thread.
+        """
+        for (method, msg) in self.takeMessages():
+            getattr(progress, method)(prefix + msg)
+
+    def error(self, msg):
+        self.errorMsg = msg
+
+    def setText(self, text):
+        self.addMessage('setText', text)
+
+    def setPercentage(self, i):
+        self.percentage = i
+
+    def setInfo(self, msg):
+        self.addMessage('setInfo', msg)
+
+    def setCommand(self, cmd):
+        self.addMessage('setCommand', cmd)
+
+    def setDebugInfo(self, msg):
+        self.addMessage('setDebugInfo', msg)
+
+    def setConsoleInfo(self, msg):
+        self.addMessage('setConsoleInfo', msg)
+
+    def close(self):
+        pass
+
+
+class ParallelAlgorithmExecutor:
+    """Executes a number of algorithms, running the external
+    applications they call in a pool of worker threads.
+
+    Algorithms are obtained by calling createAlg(i) in the GUI thread,
+    just before the i-th one is started, so they do not need to exist
+    beforehand.
+
+    The QGIS API is not thread-safe, so everything else is done in the
+    GUI thread. When a worker is free, an algorithm is started there
+    with its applications deferred, as explained in
+    GeoAlgorithm.startExecution(). A worker runs those applications,
+    and the algorithm is finished back in the GUI thread. Only
+    algorithms whose supportsParallelExecution() method returns True
+    should be run this way.
+
+    Algorithms are independent, and a failure in one of them does not
+    stop the others. Results are reported back in the order of their
+    positions, always from the GUI thread.
+    """
+
+    # Maximum number of algorithms started and not reported yet, per
+    # thread. Those finishing before earlier ones are kept until they
+    # can be reported, so this limits how many exist at the same time
+    MAX_STARTED_PER_THREAD = 4
+
+    def __init__(self, numAlgs, numThreads, createAlg):
+        self.createAlg = createAlg
+        self.algs = [None] * numAlgs
+        self.numThreads = max(1, min(numThreads, numAlgs))
+        self.progresses = [None] * numAlgs
+        self.results = [None] * numAlgs
+        self.pending = Queue.Queue()
+        self.finished = Queue.Queue()
+        self.canceled = False
+
+    def cancel(self):
+        """Stops starting new algorithms, and kills the external
+        applications of those already running, which fail.
+        """
+        self.canceled = True
+        for progress in self.progresses:
+            if progress is not None:
+                progress.canceled = True
+
+    def worker(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            (i, runners) = job
+            try:
+                self.algs[i].runDeferredProcesses(runners)
+                self.finished.put((i, None))
+            except Exception, e:
+                self.finished.put((i, e))
+
+    def startAlgorithm(self, i):
+        """Starts an algorithm in the GUI thread. Returns True if it
+        has deferred applications to be run by a worker.
+        """
+        self.progresses[i] = BufferedProgress()
+        try:
+            self.algs[i] = self.createAlg(i)
+            runners = self.algs[i].startExecution(self.progresses[i],
+                    deferProcesses=True)
+        except Exception, e:
+            self.setFailed(i, e)
+            return False
+        if runners:
+            self.pending.put((i, runners))
+            return True
+        self.finishAlgorithm(i, None)
+        return False
+
+    def finishAlgorithm(self, i, error):
+        try:
+            self.algs[i].finishExecution(self.progresses[i], error)
+            self.results[i] = True
+        except Exception, e:
+            self.setFailed(i, e)
+
+    def setFailed(self, i, e):
+        if isinstance(e, GeoAlgorithmExecutionException):
+            msg = e.msg
+        elif self.algs[i] is not None:
+            msg = 'Uncaught error executing ' + str(self.algs[i].name) \
+                + '\nSee log for more information'
+        else:
+            msg = 'Could not create the algorithm: ' + str(e)
+        self.progresses[i].error(msg)
+        self.results[i] = False
+
+    def runalgs(self, progress, algFinished):
+        """Runs all algorithms and blocks until they are finished,
+        keeping the GUI responsive.
+
+        Messages from each algorithm are forwarded to the passed
+        dialog, prefixed with the position of the algorithm. Setting
+        the canceled attribute of the dialog to True has the same
+        effect as calling cancel().
+        The algFinished(i, ok) function is called once for each
+        algorithm that was executed, in the order of their positions.
+
+        Returns the list of positions of algorithms that failed.
+        """
+        threads = []
+        for n in range(self.numThreads):
+            thread = threading.Thread(target=self.worker,
+                                      name='processing_%i' % n)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        failed = []
+        nextAlg = 0
+        nextStarted = 0
+        running = 0
+        try:
+            while nextAlg < len(self.algs):
+                while not self.canceled and running < self.numThreads \
+                        and nextStarted < len(self.algs) \
+                        and nextStarted - nextAlg < self.numThreads \
+                        * self.MAX_STARTED_PER_THREAD:
+                    if self.startAlgorithm(nextStarted):
+                        running += 1
+                    nextStarted += 1
+                    QApplication.processEvents()
+                try:
+                    (i, error) = self.finished.get(timeout=0.1)
+                    running -= 1
+                    self.finishAlgorithm(i, error)
+                except Queue.Empty:
+                    pass
+                self.forwardMessages(progress, nextAlg, nextStarted)
+                while nextAlg < len(self.algs) \
+                        and self.results[nextAlg] is not None:
+                    if not self.results[nextAlg]:
+                        failed.append(nextAlg)
+                        progress.setInfo('Algorithm %i: %s'
+                                         % (nextAlg + 1,
+                                         self.progresses[nextAlg].errorMsg),
+                                         True)
+                    algFinished(nextAlg, self.results[nextAlg])
+                    self.progresses[nextAlg] = None
+                    nextAlg += 1
+                QApplication.processEvents()
+                if getattr(progress, 'canceled', False) \
+                        and not self.canceled:
+                    self.cancel()
+                if self.canceled and running == 0:
+                    break
+        finally:
+            for thread in threads:
+                self.pending.put(None)
+
+        return failed
+
+    def forwardMessages(self, progress, first, last):
+        """Forwards the messages of the algorithms that have been
+        started and not reported yet, from first to last.
+        """
+        total = 100 * first
+        for i in xrange(first, last):
+            self.progresses[i].forwardMessages(progress, '[%i] ' % (i + 1))
+            if self.results[i] is None:
+                total += self.progresses[i].percentage
+            else:
+                total += 100
+        progress.setPercentage(total / len(self.algs))
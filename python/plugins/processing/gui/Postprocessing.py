@@ -29,6 +29,7 @@ import os
 from PyQt4.QtGui import *
 from qgis.core import *
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.AlgorithmStats import AlgorithmStats
 from processing.gui.ResultsDialog import ResultsDialog
 from processing.gui.RenderingStyles import RenderingStyles
 from processing.gui.CouldNotLoadResultsDialog import CouldNotLoadResultsDialog
@@ -48,30 +49,33 @@ class Postprocessing:
         htmlResults = False
         progress.setText('Loading resulting layers')
         i = 0
-        for out in alg.outputs:
-            progress.setPercentage(100 * i / float(len(alg.outputs)))
-            if out.hidden or not out.open:
-                continue
-            if isinstance(out, (OutputRaster, OutputVector, OutputTable)):
-                try:
-                    if out.value.startswith('memory:'):
-                        layer = out.memoryLayer
-                        QgsMapLayerRegistry.instance().addMapLayers([layer])
-                    else:
-                        if ProcessingConfig.getSetting(
-                                ProcessingConfig.USE_FILENAME_AS_LAYER_NAME):
-                            name = os.path.basename(out.value)
+        with AlgorithmStats.phase('handleAlgorithmResults',
+                                  alg.executionStats):
+            for out in alg.outputs:
+                progress.setPercentage(100 * i / float(len(alg.outputs)))
+                if out.hidden or not out.open:
+                    continue
+                if isinstance(out, (OutputRaster, OutputVector, OutputTable)):
+                    try:
+                        if out.value.startswith('memory:'):
+                            layer = out.memoryLayer
+                            QgsMapLayerRegistry.instance().addMapLayers(
+                                    [layer])
                         else:
-                            name = out.description
-                        dataobjects.load(out.value, name, alg.crs,
-                                RenderingStyles.getStyle(alg.commandLineName(),
-                                out.name))
-                except Exception, e:
-                    wrongLayers.append(out)
-            elif isinstance(out, OutputHTML):
-                ProcessingResults.addResult(out.description, out.value)
-                htmlResults = True
-            i += 1
+                            if ProcessingConfig.getSetting(ProcessingConfig
+                                    .USE_FILENAME_AS_LAYER_NAME):
+                                name = os.path.basename(out.value)
+                            else:
+                                name = out.description
+                            dataobjects.load(out.value, name, alg.crs,
+                                    RenderingStyles.getStyle(
+                                    alg.commandLineName(), out.name))
+                    except Exception, e:
+                        wrongLayers.append(out)
+                elif isinstance(out, OutputHTML):
+                    ProcessingResults.addResult(out.description, out.value)
+                    htmlResults = True
+                i += 1
         if wrongLayers:
             QApplication.restoreOverrideCursor()
             dlg = CouldNotLoadResultsDialog(wrongLayers, alg)
@@ -32,6 +32,7 @@ from processing.core.Processing import Processing
 from processing.core.ProcessingLog import ProcessingLog
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.GeoAlgorithm import GeoAlgorithm
+from processing.core.LazyProvider import LazyProvider
 from processing.gui.MissingDependencyDialog import MissingDependencyDialog
 from processing.gui.AlgorithmClassification import AlgorithmDecorator
 from processing.gui.ParametersDialog import ParametersDialog
@@ -68,6 +69,11 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
         self.algorithmTree.customContextMenuRequested.connect(
                 self.showPopupMenu)
         self.algorithmTree.doubleClicked.connect(self.executeAlgorithm)
+        self.algorithmTree.itemExpanded.connect(self.itemExpanded)
+
+        # Top level items of providers, when the tree is filled using
+        # providers and not filtered
+        self.providerItems = {}
 
         if hasattr(self.searchBox, 'setPlaceholderText'):
             self.searchBox.setPlaceholderText(self.tr('Search...'))
@@ -88,9 +94,83 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
     def algsListHasChanged(self):
         self.fillTree()
 
+    def algsHaveChanged(self, providerName, added, removed, modified):
+        """Updates the items of the algorithms that have changed in a
+        provider, without filling the whole tree again.
+        """
+        providerItem = self.providerItems.get(providerName)
+        if providerItem is None:
+            self.fillTree()
+            return
+
+        changed = set(alg.commandLineName() for alg in removed + modified)
+        groups = {}
+        for i in reversed(xrange(providerItem.childCount())):
+            groupItem = providerItem.child(i)
+            groups[unicode(groupItem.text(0))] = groupItem
+            for j in reversed(xrange(groupItem.childCount())):
+                algItem = groupItem.child(j)
+                if isinstance(algItem, TreeAlgorithmItem) \
+                        and algItem.alg.commandLineName() in changed:
+                    groupItem.removeChild(algItem)
+
+        for alg in added + modified:
+            if not alg.showInToolbox:
+                continue
+            if alg.group in groups:
+                groupItem = groups[alg.group]
+            else:
+                groupItem = QTreeWidgetItem()
+                groupItem.setText(0, alg.group)
+                groupItem.setToolTip(0, alg.group)
+                providerItem.addChild(groupItem)
+                groups[alg.group] = groupItem
+            groupItem.addChild(TreeAlgorithmItem(alg))
+
+        count = 0
+        for groupItem in groups.values():
+            if groupItem.childCount() == 0:
+                providerItem.removeChild(groupItem)
+                continue
+            count += len([groupItem.child(j) for j in
+                         xrange(groupItem.childCount()) if
+                         isinstance(groupItem.child(j), TreeAlgorithmItem)])
+        if providerItem.childCount() == 0:
+            index = self.algorithmTree.indexOfTopLevelItem(providerItem)
+            self.algorithmTree.takeTopLevelItem(index)
+            del self.providerItems[providerName]
+            return
+        self.setProviderItemText(providerItem, providerName, count)
+        providerItem.sortChildren(0, Qt.AscendingOrder)
+
+    def setProviderItemText(self, providerItem, providerName, count):
+        providerItem.setText(0, Processing.getProviderFromName(
+                providerName).getDescription()
+                + ' [' + str(count) + ' geoalgorithms]')
+        providerItem.setToolTip(0, providerItem.text(0))
+
     def updateTree(self):
         Processing.updateAlgsList()
 
+    def itemExpanded(self, item):
+        if isinstance(item, TreeLazyProviderItem):
+            # The tree is filled again when the provider is loaded, so
+            # that should not happen while handling the expansion
+            name = item.provider.getName()
+            QTimer.singleShot(0, lambda: self.loadProvider(name))
+
+    def loadProvider(self, name):
+        provider = Processing.loadProvider(name)
+        if provider is None:
+            return
+        for i in xrange(self.algorithmTree.topLevelItemCount()):
+            item = self.algorithmTree.topLevelItem(i)
+            if unicode(item.text(0)).startswith(provider.getDescription()):
+                item.setExpanded(True)
+
+    def updateProvider(self, providerName):
+        Processing.updateProviderAlgs(providerName)
+
     def showPopupMenu(self, point):
         item = self.algorithmTree.itemAt(point)
         if isinstance(item, TreeAlgorithmItem):
@@ -174,8 +254,15 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
             action.execute()
 
     def fillTree(self):
+        self.providerItems = {}
         settings = QSettings()
         useCategories = settings.value(self.USE_CATEGORIES, type=bool)
+        if useCategories or unicode(self.searchBox.text()) != '':
+            # All algorithms are needed to fill the tree. If a provider
+            # is loaded, listeners (this toolbox included) are notified
+            # and the tree is filled again.
+            if Processing.loadLazyProviders():
+                return
         if useCategories:
             self.fillTreeUsingCategories()
         else:
@@ -214,6 +301,8 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
         providersToExclude = ['model', 'script']
         self.algorithmTree.clear()
         text = unicode(self.searchBox.text())
+        found = Processing.searchAlgorithms(text)
+        foundDecorated = Processing.searchAlgorithms(text, True)
         groups = {}
         for providerName in Processing.algs.keys():
             provider = Processing.algs[providerName]
@@ -234,7 +323,7 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
                     AlgorithmDecorator.getGroupsAndName(alg)
                 if altgroup is None:
                     continue
-                if text == '' or text.lower() in altname.lower():
+                if text == '' or alg in foundDecorated:
                     if altgroup not in groups:
                         groups[altgroup] = {}
                     group = groups[altgroup]
@@ -281,7 +370,7 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
             for alg in algs:
                 if not alg.showInToolbox:
                     continue
-                if text == '' or text.lower() in alg.name.lower():
+                if text == '' or alg in found:
                     if alg.group in groups:
                         groupItem = groups[alg.group]
                     else:
@@ -321,6 +410,7 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
     def fillTreeUsingProviders(self):
         self.algorithmTree.clear()
         text = unicode(self.searchBox.text())
+        found = Processing.searchAlgorithms(text)
         for providerName in Processing.algs.keys():
             groups = {}
             count = 0
@@ -334,7 +424,7 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
             for alg in algs:
                 if not alg.showInToolbox:
                     continue
-                if text == '' or text.lower() in alg.name.lower():
+                if text == '' or alg in found:
                     if alg.group in groups:
                         groupItem = groups[alg.group]
                     else:
@@ -360,19 +450,27 @@ class ProcessingToolbox(QDockWidget, Ui_ProcessingToolbox):
 
             if len(groups) > 0:
                 providerItem = QTreeWidgetItem()
-                providerItem.setText(0, Processing.getProviderFromName(
-                        providerName).getDescription()
-                        + ' [' + str(count) + ' geoalgorithms]')
+                self.setProviderItemText(providerItem, providerName, count)
                 providerItem.setIcon(0, Processing.getProviderFromName(
                         providerName).getIcon())
-                providerItem.setToolTip(0, providerItem.text(0))
                 for groupItem in groups.values():
                     providerItem.addChild(groupItem)
                 self.algorithmTree.addTopLevelItem(providerItem)
                 providerItem.setExpanded(text != '')
+                if text == '':
+                    self.providerItems[providerName] = providerItem
                 for groupItem in groups.values():
                     groupItem.setExpanded(text != '')
 
+        # Providers not loaded yet are shown without their algorithms,
+        # which are added when the provider item is expanded
+        if text == '':
+            for provider in Processing.providers:
+                if isinstance(provider, LazyProvider) \
+                        and Processing.isProviderActive(provider):
+                    self.algorithmTree.addTopLevelItem(
+                            TreeLazyProviderItem(provider))
+
 
 class TreeAlgorithmItem(QTreeWidgetItem):
 
@@ -392,6 +490,17 @@ class TreeAlgorithmItem(QTreeWidgetItem):
         self.setText(0, name)
 
 
+class TreeLazyProviderItem(QTreeWidgetItem):
+
+    def __init__(self, provider):
+        QTreeWidgetItem.__init__(self)
+        self.provider = provider
+        self.setText(0, provider.getDescription())
+        self.setIcon(0, provider.getIcon())
+        self.setToolTip(0, provider.getDescription())
+        self.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+
+
 class TreeActionItem(QTreeWidgetItem):
 
     def __init__(self, action):
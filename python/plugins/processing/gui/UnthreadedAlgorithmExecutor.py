@@ -29,10 +29,13 @@ from PyQt4.QtGui import *
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.SilentProgress import SilentProgress
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
 from processing.core.GeoAlgorithmExecutionException import \
         GeoAlgorithmExecutionException
 from processing.gui.Postprocessing import Postprocessing
+from processing.gui.ParallelAlgorithmExecutor import \
+        ParallelAlgorithmExecutor
 from processing.tools import dataobjects
 from processing.tools.system import *
 from processing.tools import vector
@@ -65,46 +68,107 @@ class UnthreadedAlgorithmExecutor:
 
     @staticmethod
     def runalgIterating(alg, paramToIter, progress):
-        # Generate all single-feature layers
-        settings = QSettings()
-        systemEncoding = settings.value('/UI/encoding', 'System')
+        """Executes the algorithm once for each feature of the layer in
+        the given parameter, using a layer with just that feature.
+
+        Single-feature layers are memory layers, created when each
+        iteration is about to run. They are only written to a file if
+        the algorithm needs one, as algorithms from external
+        applications do. Algorithms that support parallel execution
+        run their applications in several threads.
+        """
         layerfile = alg.getParameterValue(paramToIter)
-        layer = dataobjects.getObjectFromUri(layerfile, False)
-        feat = QgsFeature()
-        filelist = []
-        outputs = {}
-        provider = layer.dataProvider()
-        features = vector.features(layer)
-        for feat in features:
-            output = getTempFilename('shp')
-            filelist.append(output)
-            writer = QgsVectorFileWriter(output, systemEncoding,
-                    provider.fields(), provider.geometryType(), layer.crs())
-            writer.addFeature(feat)
-            del writer
+        layer = dataobjects.getObjectFromUri(layerfile)
+        if layer is None:
+            progress.error('Could not open layer: ' + unicode(layerfile))
+            return False
+        useSelection = ProcessingConfig.getSetting(
+                ProcessingConfig.USE_SELECTED)
+        if useSelection and layer.selectedFeatureCount() > 0:
+            fids = list(layer.selectedFeaturesIds())
+        else:
+            request = QgsFeatureRequest()
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+            request.setSubsetOfAttributes([])
+            fids = [feat.id() for feat in layer.getFeatures(request)]
+        if not fids:
+            return True
 
         # store output values to use them later as basenames for all outputs
+        outputs = {}
         for out in alg.outputs:
             outputs[out.name] = out.value
 
-        # now run all the algorithms
-        i = 1
-        for f in filelist:
-            alg.setParameterValue(paramToIter, f)
-            for out in alg.outputs:
+        def createIteration(i):
+            request = QgsFeatureRequest(fids[i])
+            feats = list(layer.getFeatures(request))
+            memLayer = vector.memoryLayer(layer, feats,
+                                          'iteration_' + str(i + 1))
+            dataobjects.registerTemporaryLayer(memLayer)
+            iterationAlg = alg.getCopy()
+            iterationAlg.setParameterValue(paramToIter,
+                                           unicode(memLayer.source()))
+            for out in iterationAlg.outputs:
                 filename = outputs[out.name]
                 if filename:
-                    filename = filename[:filename.rfind('.')] + '_' + str(i) \
-                        + filename[filename.rfind('.'):]
+                    filename = filename[:filename.rfind('.')] + '_' \
+                        + str(i + 1) + filename[filename.rfind('.'):]
                 out.value = filename
-            progress.setText('Executing iteration ' + str(i) + '/'
-                             + str(len(filelist)) + '...')
-            progress.setPercentage(i * 100 / len(filelist))
-            if UnthreadedAlgorithmExecutor.runalg(alg, SilentProgress()):
-                Postprocessing.handleAlgorithmResults(alg, SilentProgress(),
-                        False)
-                i += 1
-            else:
-                return False
+            return (iterationAlg, memLayer)
+
+        try:
+            numThreads = int(ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_THREADS))
+        except (TypeError, ValueError):
+            numThreads = 1
+        if numThreads > 1 and len(fids) > 1 \
+                and alg.supportsParallelExecution():
+            return UnthreadedAlgorithmExecutor.runIterationsInParallel(
+                    len(fids), createIteration, numThreads, progress)
+
+        for i in xrange(len(fids)):
+            (iterationAlg, memLayer) = createIteration(i)
+            progress.setText('Executing iteration ' + str(i + 1) + '/'
+                             + str(len(fids)) + '...')
+            progress.setPercentage((i + 1) * 100 / len(fids))
+            try:
+                if not UnthreadedAlgorithmExecutor.runalg(iterationAlg,
+                        SilentProgress()):
+                    return False
+                Postprocessing.handleAlgorithmResults(iterationAlg,
+                        SilentProgress(), False)
+            finally:
+                dataobjects.unregisterTemporaryLayer(memLayer)
 
         return True
+
+    @staticmethod
+    def runIterationsInParallel(numIterations, createIteration, numThreads,
+                                progress):
+        memLayers = {}
+
+        def createAlg(i):
+            (iterationAlg, memLayer) = createIteration(i)
+            memLayers[i] = memLayer
+            return iterationAlg
+
+        executor = ParallelAlgorithmExecutor(numIterations, numThreads,
+                                             createAlg)
+        progress.setText('Executing ' + str(numIterations) + ' iterations in '
+                         + str(executor.numThreads) + ' parallel threads...')
+
+        def algFinished(i, ok):
+            if i in memLayers:
+                dataobjects.unregisterTemporaryLayer(memLayers.pop(i))
+            if ok:
+                Postprocessing.handleAlgorithmResults(executor.algs[i],
+                        SilentProgress(), False)
+            # The algorithm is not needed anymore
+            executor.algs[i] = None
+
+        try:
+            failed = executor.runalgs(progress, algFinished)
+        finally:
+            for memLayer in memLayers.values():
+                dataobjects.unregisterTemporaryLayer(memLayer)
+        return not failed
@@ -26,10 +26,10 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import subprocess
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.tools.system import userFolder
 
@@ -61,16 +61,8 @@ class FusionUtils:
 
     @staticmethod
     def runFusion(commands, progress):
-        loglines = []
-        loglines.append('Fusion execution console output')
-        proc = subprocess.Popen(
-            commands,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=False,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            loglines.append(line)
-        ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+        def finished(lines):
+            loglines = ['Fusion execution console output'] + lines
+            ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+
+        ProcessRunner(commands, progress, finishedHandler=finished).run()
@@ -25,10 +25,10 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-import subprocess
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.core.ProcessingConfig import ProcessingConfig
 
 
@@ -46,17 +46,10 @@ class LAStoolsUtils:
 
     @staticmethod
     def runLAStools(commands, progress):
-        loglines = []
-        loglines.append('LAStools console output')
         commandline = ' '.join(commands)
-        proc = subprocess.Popen(
-            commandline,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=False,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            loglines.append(line)
-        ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+
+        def finished(lines):
+            loglines = ['LAStools console output'] + lines
+            ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+
+        ProcessRunner(commandline, progress, finishedHandler=finished).run()
@@ -44,4 +44,4 @@ class CreateNewModelAction(ToolboxAction):
         dlg = ModelerDialog()
         dlg.exec_()
         if dlg.update:
-            self.toolbox.updateTree()
+            self.toolbox.updateProvider('model')
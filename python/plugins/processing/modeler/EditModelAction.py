@@ -42,4 +42,4 @@ class EditModelAction(ContextAction):
         dlg = ModelerDialog(self.alg.getCopy())
         dlg.exec_()
         if dlg.update:
-            self.toolbox.updateTree()
+            self.toolbox.updateProvider('model')
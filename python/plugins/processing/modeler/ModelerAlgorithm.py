@@ -31,13 +31,17 @@ import copy
 import os.path
 import codecs
 import time
+import threading
+import Queue
 from PyQt4 import QtCore, QtGui
 from qgis.core import *
 
 from processing.core.GeoAlgorithm import GeoAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.GeoAlgorithmExecutionException import \
         GeoAlgorithmExecutionException
 from processing.gui.Help2Html import Help2Html
+from processing.gui.ParallelAlgorithmExecutor import BufferedProgress
 from processing.modeler.WrongModelException import WrongModelException
 from processing.modeler.ModelerUtils import ModelerUtils
 from processing.parameters.ParameterFactory import ParameterFactory
@@ -175,8 +179,35 @@ class ModelerAlgorithm(GeoAlgorithm):
                                     # how to solve problems when
                                     # parsing this
                                     pass
+                        # The lines of the parameters and outputs go
+                        # until the next algorithm. Parameters added to
+                        # the algorithm after the model was saved are
+                        # missing, and take their default values
+                        algLines = []
+                        line = lines.readline().strip('\n').strip('\r')
+                        while line != '' \
+                                and not line.startswith('ALGORITHM:'):
+                            algLines.append(line)
+                            line = lines.readline().strip('\n'
+                                    ).strip('\r')
+                        params = alg.getParametersForValues(alg.parameters,
+                                len(algLines) - len(alg.outputs))
+                        if params is None:
+                            raise WrongModelException('Wrong number of '
+                                    'parameters for algorithm ' + algLine)
+                        algLines = iter(algLines)
+                        parentAlg = \
+                            AlgorithmAndParameter.PARENT_MODEL_ALGORITHM
                         for param in alg.parameters:
-                            line = lines.readline().strip('\n').strip('\r')
+                            if param not in params:
+                                name = 'HARDCODEDPARAMVALUE_' + param.name \
+                                    + '_' + str(iAlg)
+                                self.paramValues[name] = \
+                                    unicode(param.default)
+                                algParams[param.name] = \
+                                    AlgorithmAndParameter(parentAlg, name)
+                                continue
+                            line = algLines.next()
                             if line == str(None):
                                 algParams[param.name] = None
                             else:
@@ -186,7 +217,7 @@ class ModelerAlgorithm(GeoAlgorithm):
                                         tokens[1])
                         outputPos = {}
                         for out in alg.outputs:
-                            line = lines.readline().strip('\n').strip('\r')
+                            line = algLines.next()
                             if str(None) != line:
                                 if '|' in line:
                                     tokens = line.split('|')
@@ -215,6 +246,9 @@ class ModelerAlgorithm(GeoAlgorithm):
                         self.algParameters.append(algParams)
                         self.dependencies.append(dependencies)
                         iAlg += 1
+
+                        # The line after them has already been read
+                        continue
                     else:
                         raise WrongModelException('Error in algorithm name: '
                                 + algLine)
@@ -584,56 +618,176 @@ class ModelerAlgorithm(GeoAlgorithm):
 
     def processAlgorithm(self, progress):
         self.producedOutputs = {}
+        toExecute = [i for i in range(len(self.algs)) if i not in
+                     self.deactivated]
+
+        # Build the dependency graph once. An algorithm is ready to be
+        # executed when all the algorithms it depends on have finished
+        pending = {}
+        dependent = {}
+        for iAlg in toExecute:
+            dependent[iAlg] = []
+        for iAlg in toExecute:
+            required = set(self.getDependsOnAlgorithms(iAlg))
+            required.discard(iAlg)
+            pending[iAlg] = required.intersection(toExecute)
+            for requiredAlg in pending[iAlg]:
+                dependent[requiredAlg].append(iAlg)
+        ready = [iAlg for iAlg in toExecute if not pending[iAlg]]
+
+        try:
+            numThreads = int(ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_THREADS))
+        except (TypeError, ValueError):
+            numThreads = 1
+
+        running = {}
+        finished = Queue.Queue()
         executed = []
-        while len(executed) < len(self.algs) - len(self.deactivated):
-            iAlg = 0
-            for alg in self.algs:
-                if iAlg not in self.deactivated and iAlg not in executed:
-                    canExecute = True
-                    required = self.getDependsOnAlgorithms(iAlg)
-                    for requiredAlg in required:
-                        if requiredAlg != iAlg and requiredAlg not in executed:
-                            canExecute = False
-                            break
-                    if canExecute:
-                        try:
-                            alg = alg.getCopy()
-                            progress.setDebugInfo('Prepare algorithm %i: %s'
-                                    % (iAlg, alg.name))
-                            self.prepareAlgorithm(alg, iAlg)
-                            progress.setText('Running ' + alg.name + ' ['
-                                    + str(iAlg + 1) + '/' + str(len(self.algs)
-                                    - len(self.deactivated)) + ']')
-                            outputs = {}
-                            progress.setDebugInfo('Parameters: '
-                                    + ', '.join([unicode(p).strip() + '='
-                                    + unicode(p.value) for p in
-                                    alg.parameters]))
-                            t0 = time.time()
-                            alg.execute(progress, self)
-                            dt = time.time() - t0
-                            for out in alg.outputs:
-                                outputs[out.name] = out.value
-                            progress.setDebugInfo('Outputs: '
-                                    + ', '.join([unicode(out).strip() + '='
-                                    + unicode(outputs[out.name]) for out in
-                                    alg.outputs]))
-                            self.producedOutputs[iAlg] = outputs
-                            executed.append(iAlg)
-                            progress.setDebugInfo(
-                                    'OK. Execution took %0.3f ms (%i outputs).'
-                                    % (dt, len(outputs)))
-                        except GeoAlgorithmExecutionException, e:
-                            progress.setDebugInfo('Failed')
-                            raise GeoAlgorithmExecutionException(
-                                    'Error executing algorithm ' + str(iAlg)
-                                    + '\n' + e.msg)
+        t0 = time.time()
+        totalTime = 0
+        while ready or running:
+            # Launch all ready algorithms. Those that can run in
+            # parallel are started here, and the external applications
+            # they call are run in a worker thread. The rest are
+            # executed here, one at a time
+            for iAlg in list(ready):
+                parallel = numThreads > 1 \
+                    and self.algs[iAlg].supportsParallelExecution()
+                if parallel and len(running) >= numThreads:
+                    continue
+                ready.remove(iAlg)
+                alg = self.prepareChildAlgorithm(iAlg, progress,
+                        len(executed) + len(running) + 1, len(toExecute))
+                if parallel:
+                    algProgress = BufferedProgress()
+                    if self.startChildAlgorithm(iAlg, alg, algProgress,
+                                                finished):
+                        running[iAlg] = algProgress
+                    else:
+                        break
                 else:
-                    pass
-
-                iAlg += 1
+                    self.executeChildAlgorithm(iAlg, alg, progress,
+                                               finished)
+                    break
+
+            while True:
+                try:
+                    (iAlg, alg, dt, error) = finished.get(timeout=0.1)
+                    break
+                except Queue.Empty:
+                    self.forwardChildMessages(running, progress)
+            if iAlg in running:
+                (dt, error) = self.finishChildAlgorithm(alg, dt, error,
+                        running[iAlg])
+                self.forwardChildMessages(running, progress)
+                del running[iAlg]
+
+            if error is not None:
+                progress.setDebugInfo('Failed')
+                # Let the algorithms already running finish before
+                # reporting the error
+                while running:
+                    (i, a, d, e) = finished.get()
+                    self.finishChildAlgorithm(a, d, e, running[i])
+                    self.forwardChildMessages(running, progress)
+                    del running[i]
+                raise GeoAlgorithmExecutionException(
+                        'Error executing algorithm ' + str(iAlg) + '\n'
+                        + error)
+
+            outputs = {}
+            for out in alg.outputs:
+                outputs[out.name] = out.value
+            progress.setDebugInfo('Outputs of algorithm %i: ' % iAlg
+                    + ', '.join([unicode(out).strip() + '='
+                    + unicode(outputs[out.name]) for out in alg.outputs]))
+            self.producedOutputs[iAlg] = outputs
+            executed.append(iAlg)
+            totalTime += dt
+            progress.setDebugInfo(
+                    'OK. Algorithm %i took %0.3f seconds (%i outputs).'
+                    % (iAlg, dt, len(outputs)))
+            for dependentAlg in dependent[iAlg]:
+                pending[dependentAlg].discard(iAlg)
+                if not pending[dependentAlg]:
+                    ready.append(dependentAlg)
+
+        if len(executed) < len(toExecute):
+            raise GeoAlgorithmExecutionException(
+                    'Could not execute all algorithms in the model.\n'
+                    'Check that there are no circular dependencies')
         progress.setDebugInfo(
-                'Model processed ok. Executed %i algorithms total' % iAlg)
+                'Model processed ok. Executed %i algorithms total in %0.3f '
+                'seconds (%0.3f seconds of algorithm execution)'
+                % (len(executed), time.time() - t0, totalTime))
+
+    def prepareChildAlgorithm(self, iAlg, progress, i, total):
+        alg = self.algs[iAlg].getCopy()
+        progress.setDebugInfo('Prepare algorithm %i: %s' % (iAlg, alg.name))
+        self.prepareAlgorithm(alg, iAlg)
+        progress.setText('Running ' + alg.name + ' [' + str(i) + '/'
+                         + str(total) + ']')
+        progress.setDebugInfo('Parameters: ' + ', '.join([unicode(p).strip()
+                              + '=' + unicode(p.value) for p in
+                              alg.parameters]))
+        return alg
+
+    def executeChildAlgorithm(self, iAlg, alg, progress, finished):
+        """Executes a single algorithm of the model and puts the result
+        in the finished queue.
+        """
+        t0 = time.time()
+        try:
+            alg.execute(progress, self)
+            finished.put((iAlg, alg, time.time() - t0, None))
+        except GeoAlgorithmExecutionException, e:
+            finished.put((iAlg, alg, time.time() - t0, e.msg))
+
+    def startChildAlgorithm(self, iAlg, alg, progress, finished):
+        """Starts an algorithm of the model, deferring the external
+        applications it calls, and runs them in a worker thread, which
+        puts the result in the finished queue. It is then completed
+        by finishChildAlgorithm().
+
+        Returns False if the algorithm could not be started, in which
+        case the error is already in the finished queue.
+        """
+        t0 = time.time()
+        try:
+            runners = alg.startExecution(progress, self, True)
+        except GeoAlgorithmExecutionException, e:
+            finished.put((iAlg, alg, time.time() - t0, e.msg))
+            return False
+
+        def runProcesses():
+            try:
+                alg.runDeferredProcesses(runners)
+                finished.put((iAlg, alg, time.time() - t0, None))
+            except Exception, e:
+                finished.put((iAlg, alg, time.time() - t0, e))
+
+        thread = threading.Thread(target=runProcesses)
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def finishChildAlgorithm(self, alg, dt, error, progress):
+        """Completes an algorithm started by startChildAlgorithm(), once
+        its applications have been run in dt seconds. Returns the
+        total time it took, and the error message if it failed.
+        """
+        t0 = time.time()
+        try:
+            alg.finishExecution(progress, error)
+            error = None
+        except GeoAlgorithmExecutionException, e:
+            error = e.msg
+        return (dt + time.time() - t0, error)
+
+    def forwardChildMessages(self, running, progress):
+        for (iAlg, algProgress) in running.items():
+            algProgress.forwardMessages(progress, '[%i] ' % iAlg)
 
     def getOutputType(self, i, outname):
         for out in self.algs[i].outputs:
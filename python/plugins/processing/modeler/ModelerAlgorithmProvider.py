@@ -26,6 +26,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os.path
+import codecs
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing.core.AlgorithmProvider import AlgorithmProvider
@@ -49,6 +50,9 @@ class ModelerAlgorithmProvider(AlgorithmProvider):
         self.contextMenuActions = [EditModelAction(), DeleteModelAction(),
                                    SaveAsPythonScriptAction()]
 
+        # Models already loaded, by filename. See loadModels()
+        self.loadedModels = {}
+
     def initializeSettings(self):
         AlgorithmProvider.initializeSettings(self)
         ProcessingConfig.addSetting(Setting(self.getDescription(),
@@ -57,6 +61,7 @@ class ModelerAlgorithmProvider(AlgorithmProvider):
 
     def setAlgsList(self, algs):
         ModelerUtils.allAlgs = algs
+        ModelerUtils.models = {}
 
     def modelsFolder(self):
         return ModelerUtils.modelsFolder()
@@ -70,25 +75,124 @@ class ModelerAlgorithmProvider(AlgorithmProvider):
     def getIcon(self):
         return QIcon(os.path.dirname(__file__) + '/../images/model.png')
 
+    def getFolders(self):
+        return [ModelerUtils.modelsFolder(),
+                os.path.join(os.path.dirname(__file__), 'models')]
+
     def _loadAlgorithms(self):
-        folder = ModelerUtils.modelsFolder()
-        self.loadFromFolder(folder)
-        folder = os.path.join(os.path.dirname(__file__), 'models')
-        self.loadFromFolder(folder)
-
-    def loadFromFolder(self, folder):
-        if not os.path.exists(folder):
-            return
-        for descriptionFile in os.listdir(folder):
-            if descriptionFile.endswith('model'):
-                try:
-                    alg = ModelerAlgorithm()
-                    fullpath = os.path.join(folder, descriptionFile)
-                    alg.openModel(fullpath)
-                    if alg.name.strip() != '':
-                        alg.provider = self
-                        self.algs.append(alg)
-                except WrongModelException, e:
-                    ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
-                            'Could not load model ' + descriptionFile + '\n'
-                            + e.msg)
+        filenames = []
+        for folder in self.getFolders():
+            if os.path.exists(folder):
+                filenames.extend(os.path.join(folder, f) for f in
+                                 os.listdir(folder) if f.endswith('model'))
+        self.loadModels(filenames)
+
+    def loadModels(self, filenames):
+        """Loads the models in the given files, reusing those that were
+        already loaded.
+
+        A model is only loaded again if its file has changed or if any
+        of the algorithms it contains is not the same object it was
+        when the model was loaded, as happens when a script or a nested
+        model is modified. Models are loaded in topological order, so
+        nested models are always loaded before the models containing
+        them.
+        """
+        loaded = {}
+        models = {}
+        for filename in filenames:
+            stat = os.stat(filename)
+            fileKey = (stat.st_mtime, stat.st_size)
+            entry = self.loadedModels.get(filename)
+            if entry is None or entry.fileKey != fileKey:
+                entry = LoadedModel(filename, fileKey)
+            loaded[filename] = entry
+            models[entry.commandLineName] = entry
+
+        # Nested models must be loaded before the models using them
+        pending = dict((entry, set(name for name in entry.references
+                       if name in models and models[name] is not entry))
+                       for entry in loaded.values())
+        dependents = {}
+        for (entry, nested) in pending.items():
+            for name in nested:
+                dependents.setdefault(models[name], []).append(entry)
+        ready = sorted((e for (e, nested) in pending.items() if not nested),
+                       key=lambda e: e.filename)
+        ordered = []
+        while ready:
+            entry = ready.pop()
+            ordered.append(entry)
+            del pending[entry]
+            for dependent in dependents.get(entry, []):
+                pending[dependent].discard(entry.commandLineName)
+                if not pending[dependent]:
+                    ready.append(dependent)
+        for entry in sorted(pending, key=lambda e: e.filename):
+            # Models in a cycle, or containing one that is
+            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
+                    'Could not load model '
+                    + os.path.basename(entry.filename)
+                    + '\nIt contains itself, or a model that does')
+            loaded.pop(entry.filename)
+
+        for entry in ordered:
+            if not entry.isUpToDate():
+                entry.load()
+            if entry.alg is not None:
+                entry.alg.provider = self
+                ModelerUtils.models[entry.commandLineName] = entry.alg
+        self.loadedModels = loaded
+        self.algs = [entry.alg for entry in loaded.values()
+                     if entry.alg is not None]
+
+
+class LoadedModel:
+    """A model file loaded by the modeler provider, with the algorithms
+    it referenced when it was loaded.
+    """
+
+    def __init__(self, filename, fileKey):
+        self.filename = filename
+        self.fileKey = fileKey
+        self.commandLineName = 'modeler:' \
+            + os.path.basename(filename)[:-6].lower()
+        self.alg = None
+        self.loaded = False
+        self.resolved = {}
+
+        # Command line names of the algorithms in the model, which can
+        # be found without creating it
+        self.references = set()
+        try:
+            lines = codecs.open(filename, 'r', encoding='utf-8')
+            for line in lines:
+                if line.startswith('ALGORITHM:'):
+                    self.references.add(
+                            line[len('ALGORITHM:'):].strip('\r\n'))
+            lines.close()
+        except IOError:
+            pass
+
+    def isUpToDate(self):
+        if not self.loaded:
+            return False
+        for (name, alg) in self.resolved.items():
+            if ModelerUtils.getAlgorithm(name) is not alg:
+                return False
+        return True
+
+    def load(self):
+        self.alg = None
+        try:
+            alg = ModelerAlgorithm()
+            alg.openModel(self.filename)
+            if alg.name.strip() != '':
+                self.alg = alg
+        except WrongModelException, e:
+            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
+                    'Could not load model '
+                    + os.path.basename(self.filename) + '\n' + e.msg)
+        self.loaded = True
+        self.resolved = dict((name, ModelerUtils.getAlgorithm(name))
+                             for name in self.references)
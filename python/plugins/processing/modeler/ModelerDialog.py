@@ -330,6 +330,10 @@ class ModelerDialog(QDialog, Ui_DlgModeler):
                 self.hasChanged = False
 
     def fillAlgorithmTree(self):
+        # Models can use algorithms from any active provider
+        from processing.core.Processing import Processing
+        Processing.loadLazyProviders()
+
         settings = QSettings()
         useCategories = settings.value(self.USE_CATEGORIES, type=bool)
         if useCategories:
@@ -35,6 +35,11 @@ class ModelerUtils:
     MODELS_FOLDER = 'MODELS_FOLDER'
     ACTIVATE_MODELS = 'ACTIVATE_MODELS'
 
+    # Models loaded by the modeler provider, by command line name.
+    # While models are being loaded, those in allAlgs are the previous
+    # ones, so models are always taken from here instead.
+    models = {}
+
     @staticmethod
     def modelsFolder():
         folder = ProcessingConfig.getSetting(ModelerUtils.MODELS_FOLDER)
@@ -46,10 +51,16 @@ class ModelerUtils:
 
     @staticmethod
     def getAlgorithm(name):
+        if name.startswith('modeler:'):
+            return ModelerUtils.models.get(name)
         for provider in ModelerUtils.allAlgs.values():
             if name in provider:
                 return provider[name]
-        return None
+
+        # The algorithm might belong to a provider that has not been
+        # loaded yet
+        from processing.core.Processing import Processing
+        return Processing.getAlgorithm(name)
 
     @staticmethod
     def getAlgorithms():
@@ -57,7 +57,7 @@ class SaveAsPythonScriptAction(ContextAction):
                 fout.close()
                 if filename.replace('\\', '/').startswith(
                         ScriptUtils.scriptsFolder().replace('\\', '/')):
-                    self.toolbox.updateTree()
+                    self.toolbox.updateProvider('script')
             except:
                 QMessageBox.warning(self, self.tr('I/O error'),
                         self.tr('Unable to save edits. Reason:\n %s')
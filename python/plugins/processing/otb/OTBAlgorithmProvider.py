@@ -30,6 +30,7 @@ from PyQt4.QtGui import *
 from processing.core.AlgorithmProvider import AlgorithmProvider
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.DescriptionFileCache import DescriptionFileCache
 from processing.otb.OTBUtils import OTBUtils
 from processing.otb.OTBAlgorithm import OTBAlgorithm
 
@@ -50,16 +51,20 @@ class OTBAlgorithmProvider(AlgorithmProvider):
     def getIcon(self):
         return QIcon(os.path.dirname(__file__) + '/../images/otb.png')
 
+    def supportsParallelExecution(self):
+        return True
+
     def _loadAlgorithms(self):
         self.algs = self.preloadedAlgs
 
     def createAlgsList(self):
         self.preloadedAlgs = []
         folder = OTBUtils.otbDescriptionPath()
+        cache = DescriptionFileCache(self.getName(), folder)
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('txt'):
                 try:
-                    alg = OTBAlgorithm(os.path.join(folder, descriptionFile))
+                    alg = cache.getAlgorithm(descriptionFile, OTBAlgorithm)
                     if alg.name.strip() != '':
                         self.preloadedAlgs.append(alg)
                     else:
@@ -69,6 +74,7 @@ class OTBAlgorithmProvider(AlgorithmProvider):
                 except Exception, e:
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                             'Could not open OTB algorithm: ' + descriptionFile)
+        cache.save()
 
     def initializeSettings(self):
         AlgorithmProvider.initializeSettings(self)
@@ -26,10 +26,10 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import subprocess
 from qgis.core import QgsApplication
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.tools.system import *
 
 
@@ -120,21 +120,22 @@ class OTBUtils:
         loglines.append('OTB execution console output')
         os.putenv('ITK_AUTOLOAD_PATH', OTBUtils.otbLibPath())
         fused_command = ''.join(['"%s" ' % c for c in commands])
-        proc = subprocess.Popen(
-            fused_command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            ).stdout
-        for line in iter(proc.readline, ''):
+
+        def handleLine(line):
             if '[*' in line:
                 idx = line.find('[*')
-                perc = int(line[idx - 4:idx - 2].strip(' '))
+                try:
+                    perc = int(line[idx - 4:idx - 2].strip(' '))
+                except ValueError:
+                    return
                 if perc != 0:
                     progress.setPercentage(perc)
             else:
                 loglines.append(line)
                 progress.setConsoleInfo(line)
-        ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+
+        def finished(lines):
+            ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+
+        ProcessRunner(fused_command, progress, handleLine,
+                      finishedHandler=finished).run()
@@ -30,6 +30,10 @@ from processing.tools.system import *
 
 class Output(object):
 
+    # The writer returned to the algorithm to create the output, if it
+    # uses one
+    writer = None
+
     def __init__(self, name='', description='', hidden=False):
         self.name = name
         self.description = description
@@ -76,5 +80,13 @@ class Output(object):
         except:
             return False
 
+    def closeWriter(self):
+        """Closes the writer used to create the output, so everything
+        added to it is written to the output file.
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
     def outputTypeName(self):
         return self.__module__.split('.')[-1]
@@ -38,7 +38,7 @@ class OutputTable(Output):
     compatible = None
 
     def getFileFilter(self, alg):
-        exts = ['csv']
+        exts = ['csv', 'sqlite']
         for i in range(len(exts)):
             exts[i] = exts[i].upper() + ' files(*.' + exts[i].lower() + ')'
         return ';;'.join(exts)
@@ -70,6 +70,9 @@ class OutputTable(Output):
         result of the algorithm. Use this to transparently handle
         output values instead of creating your own method.
 
+        The writer keeps the output file open, so it should be closed
+        once all records have been added.
+
         @param fields   a list of field titles
 
         @return writer  instance of the table writer class
@@ -79,4 +82,5 @@ class OutputTable(Output):
             settings = QSettings()
             self.encoding = settings.value('/Processing/encoding', 'System')
 
-        return TableWriter(self.value, self.encoding, fields)
+        self.writer = TableWriter(self.value, self.encoding, fields)
+        return self.writer
@@ -92,4 +92,5 @@ class OutputVector(Output):
         w = VectorWriter(self.value, self.encoding, fields, geomType,
                          crs, options)
         self.memoryLayer = w.memLayer
+        self.writer = w
         return w
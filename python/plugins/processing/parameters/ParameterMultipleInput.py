@@ -134,20 +134,19 @@ class ParameterMultipleInput(ParameterDataObject):
                 return unicode(value.dataProvider().dataSourceUri())
             else:
                 s = unicode(value)
-                layers = dataobjects.getRasterLayers()
-                for layer in layers:
-                    if layer.name() == s:
-                        return unicode(layer.dataProvider().dataSourceUri())
+                layer = dataobjects.getRasterLayerFromName(s)
+                if layer is not None:
+                    return unicode(layer.dataProvider().dataSourceUri())
                 return s
         else:
             if isinstance(value, QgsVectorLayer):
                 return unicode(value.source())
             else:
                 s = unicode(value)
-                layers = dataobjects.getVectorLayers(self.datatype)
-                for layer in layers:
-                    if layer.name() == s:
-                        return unicode(layer.source())
+                layer = dataobjects.getVectorLayerFromName(s,
+                                                           [self.datatype])
+                if layer is not None:
+                    return unicode(layer.source())
                 return s
 
     def getFileFilter(self):
@@ -80,11 +80,10 @@ class ParameterRaster(ParameterDataObject):
             return True
         else:
             self.value = unicode(obj)
-            layers = dataobjects.getRasterLayers()
-            for layer in layers:
-                if layer.name() == self.value:
-                    self.value = unicode(layer.dataProvider().dataSourceUri())
-                    return True
+            layer = dataobjects.getRasterLayerFromName(self.value)
+            if layer is not None:
+                self.value = unicode(layer.dataProvider().dataSourceUri())
+                return True
             return os.path.exists(self.value)
 
     def getFileFilter(self):
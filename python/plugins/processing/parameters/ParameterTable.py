@@ -52,12 +52,10 @@ class ParameterTable(ParameterDataObject):
             self.value = source
             return True
         else:
-            layers = dataobjects.getVectorLayers()
-            for layer in layers:
-                if layer.name() == self.value:
-                    source = unicode(layer.source())
-                    self.value = source
-                    return True
+            layer = dataobjects.getVectorLayerFromName(self.value)
+            if layer is not None:
+                self.value = unicode(layer.source())
+                return True
             val = unicode(obj)
             self.value = val
             return os.path.exists(self.value)
@@ -62,11 +62,16 @@ class ParameterVector(ParameterDataObject):
             return True
         else:
             self.value = unicode(obj)
-            layers = dataobjects.getVectorLayers(self.shapetype)
-            for layer in layers:
-                if layer.name() == self.value or layer.source() == self.value:
-                    self.value = unicode(layer.source())
-                    return True
+            layer = dataobjects.getVectorLayerFromName(self.value,
+                                                       self.shapetype)
+            if layer is None:
+                layer = dataobjects.getObjectFromUri(self.value, False)
+                if layer is not None and not dataobjects.isVectorLayer(
+                        layer, self.shapetype):
+                    layer = None
+            if layer is not None:
+                self.value = unicode(layer.source())
+                return True
             return os.path.exists(self.value)
 
     def getSafeExportedLayer(self):
@@ -34,6 +34,7 @@ from PyQt4.QtGui import *
 from PyQt4.QtCore import *
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.tools.system import *
 
 
@@ -99,15 +100,7 @@ class RUtils:
             command = 'R CMD BATCH --vanilla ' + RUtils.getRScriptFilename() \
                 + ' ' + RUtils.getConsoleOutputFilename()
 
-        proc = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            )
-        proc.wait()
+        ProcessRunner(command, progress).run()
         RUtils.createConsoleOutput()
         loglines = []
         loglines.append('R execution console output')
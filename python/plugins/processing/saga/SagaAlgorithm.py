@@ -35,6 +35,7 @@ from PyQt4.QtGui import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.core.GeoAlgorithmExecutionException import \
         GeoAlgorithmExecutionException
 from processing.parameters.ParameterTable import ParameterTable
@@ -205,6 +206,7 @@ class SagaAlgorithm(GeoAlgorithm):
                         it before running SAGA algorithms.')
         commands = list()
         self.exportedLayers = {}
+        self.pendingExports = {}
 
         self.preProcessInputs()
 
@@ -345,7 +347,7 @@ class SagaAlgorithm(GeoAlgorithm):
                 filename = out.getCompatibleFileName(self)
                 filename2 = filename + '.sgrd'
                 formatIndex = (4 if not saga208 and isWindows() else 1)
-                sessionExportedLayers[filename] = filename2
+                self.addSessionExport(filename, filename2)
                 dontExport = True
 
                 # Do not export is the output is not a final output
@@ -388,7 +390,21 @@ class SagaAlgorithm(GeoAlgorithm):
             loglines.append(line)
         if ProcessingConfig.getSetting(SagaUtils.SAGA_LOG_COMMANDS):
             ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
-        SagaUtils.executeSaga(progress)
+        pendingExports = self.pendingExports
+
+        def finished(lines):
+            sessionExportedLayers.update(pendingExports)
+
+        SagaUtils.executeSaga(progress, finished)
+
+    def addSessionExport(self, source, filename):
+        # When the batch file is deferred, other algorithms might be
+        # started before it is run, so the exported layer is only
+        # shared with them once it has been run and the layer exists
+        if ProcessRunner.isDeferring():
+            self.pendingExports[source] = filename
+        else:
+            sessionExportedLayers[source] = filename
 
     def preProcessInputs(self):
         name = self.commandLineName().replace('.', '_')[len('saga:'):]
@@ -468,7 +484,7 @@ class SagaAlgorithm(GeoAlgorithm):
             filename = 'layer'
         destFilename = getTempFilenameInTempFolder(filename + '.sgrd')
         self.exportedLayers[source] = destFilename
-        sessionExportedLayers[source] = destFilename
+        self.addSessionExport(source, destFilename)
         saga208 = ProcessingConfig.getSetting(SagaUtils.SAGA_208)
         if saga208:
             if isWindows() or isMac():
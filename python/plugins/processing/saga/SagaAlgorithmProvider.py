@@ -31,6 +31,7 @@ from PyQt4.QtGui import *
 from processing.core.AlgorithmProvider import AlgorithmProvider
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.DescriptionFileCache import DescriptionFileCache
 from processing.saga.SagaAlgorithm import SagaAlgorithm
 from processing.saga.SplitRGBBands import SplitRGBBands
 from processing.saga.SagaUtils import SagaUtils
@@ -100,6 +101,7 @@ class SagaAlgorithmProvider(AlgorithmProvider):
         self.algs = []
         saga208 = ProcessingConfig.getSetting(SagaUtils.SAGA_208)
         folder = SagaUtils.sagaDescriptionPath()
+        cache = DescriptionFileCache(self.getName(), folder, [saga208])
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('txt'):
                 if not saga208:
@@ -109,7 +111,7 @@ class SagaAlgorithmProvider(AlgorithmProvider):
                     if descriptionFile.startswith('2.1'):
                         continue
                 try:
-                    alg = SagaAlgorithm(os.path.join(folder, descriptionFile))
+                    alg = cache.getAlgorithm(descriptionFile, SagaAlgorithm)
                     if alg.name.strip() != '':
                         self.algs.append(alg)
                     else:
@@ -120,6 +122,7 @@ class SagaAlgorithmProvider(AlgorithmProvider):
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                             'Could not open SAGA algorithm: '
                             + descriptionFile + '\n' + str(e))
+        cache.save()
         self.algs.append(SplitRGBBands())
 
     def getDescription(self):
@@ -139,3 +142,6 @@ class SagaAlgorithmProvider(AlgorithmProvider):
 
     def getIcon(self):
         return QIcon(os.path.dirname(__file__) + '/../images/saga.png')
+
+    def supportsParallelExecution(self):
+        return True
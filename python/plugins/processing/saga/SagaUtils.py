@@ -27,13 +27,14 @@ __revision__ = '$Format:%H$'
 
 import os
 import stat
+import shutil
 import traceback
-import subprocess
 from PyQt4.QtCore import *
 from qgis.core import *
 
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.tools.system import *
 from processing.tests.TestData import polygons
 
@@ -113,24 +114,23 @@ class SagaUtils:
         fout.close()
 
     @staticmethod
-    def executeSaga(progress):
+    def executeSaga(progress, finishedHandler=None):
+        batchfile = SagaUtils.sagaBatchJobFilename()
+        if ProcessRunner.isDeferring():
+            # Other algorithms will write the batch file before this
+            # one is run, so a copy is run instead
+            copy = getTempFilename(os.path.splitext(batchfile)[1][1:])
+            shutil.copyfile(batchfile, copy)
+            batchfile = copy
         if isWindows():
-            command = ['cmd.exe', '/C ', SagaUtils.sagaBatchJobFilename()]
+            command = ['cmd.exe', '/C ', batchfile]
         else:
-            os.chmod(SagaUtils.sagaBatchJobFilename(), stat.S_IEXEC
-                     | stat.S_IREAD | stat.S_IWRITE)
-            command = [SagaUtils.sagaBatchJobFilename()]
+            os.chmod(batchfile, stat.S_IEXEC | stat.S_IREAD | stat.S_IWRITE)
+            command = [batchfile]
         loglines = []
         loglines.append('SAGA execution console output')
-        proc = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            ).stdout
-        for line in iter(proc.readline, ''):
+
+        def handleLine(line):
             if '%' in line:
                 s = ''.join([x for x in line if x.isdigit()])
                 try:
@@ -139,12 +139,22 @@ class SagaUtils:
                     pass
             else:
                 line = line.strip()
-                if line != '/' and line != '-' and line != '\\' and line \
-                    != '|':
+                if line != '' and line != '/' and line != '-' \
+                        and line != '\\' and line != '|':
                     loglines.append(line)
                     progress.setConsoleInfo(line)
-        if ProcessingConfig.getSetting(SagaUtils.SAGA_LOG_CONSOLE):
-            ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+
+        def finished(lines):
+            if logConsole:
+                ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
+            if finishedHandler is not None:
+                finishedHandler(lines)
+
+        # The setting is read now, since the application might be run
+        # later from a worker thread
+        logConsole = ProcessingConfig.getSetting(SagaUtils.SAGA_LOG_CONSOLE)
+        ProcessRunner(command, progress, handleLine,
+                      finishedHandler=finished).run()
 
     @staticmethod
     def checkSagaIsInstalled(ignorePreviousState=False):
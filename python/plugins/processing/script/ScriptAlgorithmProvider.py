@@ -50,6 +50,10 @@ class ScriptAlgorithmProvider(AlgorithmProvider):
             [EditScriptAction(EditScriptAction.SCRIPT_PYTHON),
              DeleteScriptAction(DeleteScriptAction.SCRIPT_PYTHON)]
 
+        # Scripts already loaded, with the modification time and size
+        # of their files, so only new or modified ones are loaded again
+        self.loadedScripts = {}
+
     def initializeSettings(self):
         AlgorithmProvider.initializeSettings(self)
         ProcessingConfig.addSetting(Setting(self.getDescription(),
@@ -70,25 +74,40 @@ class ScriptAlgorithmProvider(AlgorithmProvider):
     def getDescription(self):
         return 'Scripts'
 
+    def getFolders(self):
+        return [ScriptUtils.scriptsFolder(),
+                os.path.join(os.path.dirname(__file__), 'scripts')]
+
     def _loadAlgorithms(self):
-        folder = ScriptUtils.scriptsFolder()
-        self.loadFromFolder(folder)
-        folder = os.path.join(os.path.dirname(__file__), 'scripts')
-        self.loadFromFolder(folder)
+        loaded = {}
+        for folder in self.getFolders():
+            self.loadFromFolder(folder, loaded)
+        self.loadedScripts = loaded
 
-    def loadFromFolder(self, folder):
+    def loadFromFolder(self, folder, loaded):
         if not os.path.exists(folder):
             return
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('py'):
-                try:
-                    fullpath = os.path.join(folder, descriptionFile)
-                    alg = ScriptAlgorithm(fullpath)
-                    if alg.name.strip() != '':
-                        self.algs.append(alg)
-                except WrongScriptException, e:
-                    ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, e.msg)
-                except Exception, e:
-                    ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
-                            'Could not load script:' + descriptionFile + '\n'
-                            + unicode(e))
+                fullpath = os.path.join(folder, descriptionFile)
+                stat = os.stat(fullpath)
+                fileKey = (stat.st_mtime, stat.st_size)
+                entry = self.loadedScripts.get(fullpath)
+                if entry is None or entry[0] != fileKey:
+                    entry = (fileKey, self.loadScript(fullpath))
+                loaded[fullpath] = entry
+                if entry[1] is not None:
+                    self.algs.append(entry[1])
+
+    def loadScript(self, fullpath):
+        try:
+            alg = ScriptAlgorithm(fullpath)
+            if alg.name.strip() != '':
+                return alg
+        except WrongScriptException, e:
+            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, e.msg)
+        except Exception, e:
+            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
+                    'Could not load script:' + os.path.basename(fullpath)
+                    + '\n' + unicode(e))
+        return None
@@ -103,3 +103,4 @@ for i in xrange(len(columns[0])):
         row.append(col[i])
     writer.addRecord(row)
     row[:] = []
+writer.close()
@@ -64,6 +64,9 @@ class TauDEMAlgorithmProvider(AlgorithmProvider):
     def getIcon(self):
         return QIcon(os.path.dirname(__file__) + '/../images/taudem.png')
 
+    def supportsParallelExecution(self):
+        return True
+
     def initializeSettings(self):
         AlgorithmProvider.initializeSettings(self)
         ProcessingConfig.addSetting(Setting(self.getDescription(),
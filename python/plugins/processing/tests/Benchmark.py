@@ -0,0 +1,520 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    Benchmark.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+# Benchmarks of the algorithms in the QGIS provider.
+#
+# Runs the ftools, mmqgisx and raster algorithms on synthetic layers of
+# several sizes, and prints the time each one takes, the number of input
+# features (or cells) processed per second and the additional memory it
+# needed. Results can be saved as a baseline, and later runs compared
+# against it to find performance regressions:
+#
+#     python Benchmark.py -s 10000,100000 -b baseline.json --save-baseline
+#     python Benchmark.py -s 10000,100000 -b baseline.json
+#
+# The exit code is 1 if any algorithm is slower, or uses more memory,
+# than in the baseline by more than the given tolerance.
+#
+# The synthetic layers are generated with a fixed seed, so they are the
+# same in every run, and kept in the data folder to be reused. Each
+# algorithm runs in its own process, without a display, so memory usage
+# is measured independently and runs that exceed the timeout can be
+# killed. When an algorithm times out, it is not run at larger sizes.
+#
+# Set QGISPATH to the QGIS installation prefix if it is not found.
+
+import os
+import re
+import sys
+import json
+import math
+import random
+import argparse
+import tempfile
+
+pardir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if pardir not in sys.path:
+    sys.path.append(pardir)
+
+try:
+    from osgeo import gdal, ogr, osr
+    import numpy
+except ImportError:
+    gdal = None
+
+# Extent and CRS of the synthetic layers
+CRS = 32630
+XMIN = 500000.0
+YMIN = 4000000.0
+SIZE = 100000.0
+
+# Fields of the synthetic vector layers
+CATEGORIES = 20
+VERTICES = 8
+
+DEFAULT_SCALES = '10000,100000,1000000'
+
+# Differences below these are not considered regressions, whatever the
+# tolerance, since they are usually just noise
+MIN_TIME_DIFFERENCE = 0.1
+MIN_MEMORY_DIFFERENCE = 10 * 1024 * 1024
+
+RESULT_PREFIX = 'BENCHMARK RESULT '
+
+
+# =========================================================
+# Synthetic data
+
+def dataFilename(folder, datatype, scale, seed):
+    if datatype == 'raster':
+        extension = 'tif'
+    else:
+        extension = 'shp'
+    return os.path.join(folder, '%s_%i_%i.%s' % (datatype, scale, seed,
+                        extension))
+
+
+def getData(folder, datatype, scale, seed):
+    """Returns the filename of a synthetic layer, creating it if it
+    does not exist yet.
+
+    datatype is 'point', 'line', 'polygon' or 'raster'. Vector layers
+    have scale features, and rasters scale cells.
+    """
+    filename = dataFilename(folder, datatype, scale, seed)
+    if not os.path.exists(filename):
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        print 'Creating %s' % filename
+        if datatype == 'raster':
+            createRaster(filename, scale, seed)
+        else:
+            createVector(filename, datatype, scale, seed)
+    return filename
+
+
+def getSpatialReference():
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(CRS)
+    return srs
+
+
+def createVector(filename, datatype, scale, seed):
+    rnd = random.Random(seed)
+
+    # Features are sized so that neighbouring ones overlap a little at
+    # every scale
+    radius = 0.6 * SIZE / math.sqrt(scale)
+
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+    tmpFilename = filename[:-4] + '_tmp.shp'
+    if os.path.exists(tmpFilename):
+        driver.DeleteDataSource(tmpFilename)
+    ds = driver.CreateDataSource(tmpFilename)
+    geomTypes = {'point': ogr.wkbPoint, 'line': ogr.wkbLineString,
+                 'polygon': ogr.wkbPolygon}
+    layer = ds.CreateLayer(os.path.basename(filename)[:-4],
+                           getSpatialReference(), geomTypes[datatype])
+    layer.CreateField(ogr.FieldDefn('id', ogr.OFTInteger))
+    layer.CreateField(ogr.FieldDefn('value', ogr.OFTReal))
+    field = ogr.FieldDefn('category', ogr.OFTString)
+    field.SetWidth(10)
+    layer.CreateField(field)
+    definition = layer.GetLayerDefn()
+
+    for i in xrange(scale):
+        x = rnd.uniform(XMIN, XMIN + SIZE)
+        y = rnd.uniform(YMIN, YMIN + SIZE)
+        if datatype == 'point':
+            geom = ogr.Geometry(ogr.wkbPoint)
+            geom.AddPoint_2D(x, y)
+        elif datatype == 'line':
+            geom = ogr.Geometry(ogr.wkbLineString)
+            angle = rnd.uniform(0, 2 * math.pi)
+            for j in xrange(VERTICES):
+                geom.AddPoint_2D(x, y)
+                angle += rnd.uniform(-1, 1)
+                x += math.cos(angle) * radius / 2
+                y += math.sin(angle) * radius / 2
+        else:
+            ring = ogr.Geometry(ogr.wkbLinearRing)
+            for j in xrange(VERTICES):
+                angle = 2 * math.pi * j / VERTICES
+                r = rnd.uniform(0.5, 1) * radius
+                ring.AddPoint_2D(x + math.cos(angle) * r,
+                                 y + math.sin(angle) * r)
+            ring.CloseRings()
+            geom = ogr.Geometry(ogr.wkbPolygon)
+            geom.AddGeometry(ring)
+        feature = ogr.Feature(definition)
+        feature.SetField('id', i)
+        feature.SetField('value', rnd.gauss(100, 20))
+        feature.SetField('category', 'c%i' % rnd.randrange(CATEGORIES))
+        feature.SetGeometry(geom)
+        layer.CreateFeature(feature)
+    ds = None
+
+    # Created with a different name and renamed when finished, so an
+    # interrupted run does not leave an incomplete layer behind
+    base = tmpFilename[:-4]
+    for extension in ['shx', 'dbf', 'prj', 'shp']:
+        if os.path.exists(base + '.' + extension):
+            os.rename(base + '.' + extension,
+                      filename[:-4] + '.' + extension)
+
+
+def createRaster(filename, scale, seed):
+    size = int(math.sqrt(scale))
+    rnd = numpy.random.RandomState(seed)
+    rows = numpy.linspace(0, 100, size).reshape((size, 1))
+    data = (rows + rnd.normal(100, 20, (size, size))).astype(numpy.float32)
+    driver = gdal.GetDriverByName('GTiff')
+    tmpFilename = filename[:-4] + '_tmp.tif'
+    ds = driver.Create(tmpFilename, size, size, 1, gdal.GDT_Float32)
+    ds.SetGeoTransform((XMIN, SIZE / size, 0, YMIN + SIZE, 0, -SIZE / size))
+    ds.SetProjection(getSpatialReference().ExportToWkt())
+    band = ds.GetRasterBand(1)
+    band.SetNoDataValue(-9999)
+    band.WriteArray(data)
+    band = None
+    ds = None
+    os.rename(tmpFilename, filename)
+
+
+# =========================================================
+# Algorithms
+
+def isBenchmarked(alg):
+    """Returns True if an algorithm of the QGIS provider is one of
+    those to benchmark: ftools and mmqgisx algorithms, and those with
+    raster inputs.
+    """
+    from processing.parameters.ParameterRaster import ParameterRaster
+    from processing.parameters.ParameterVector import ParameterVector
+    from processing.parameters.ParameterTable import ParameterTable
+    from processing.parameters.ParameterMultipleInput import \
+            ParameterMultipleInput
+    module = alg.__class__.__module__
+    inputs = [p for p in alg.parameters if isinstance(p, (ParameterRaster,
+              ParameterVector, ParameterTable, ParameterMultipleInput))]
+    if not inputs:
+        return False
+    if module.startswith('processing.algs.ftools') \
+            or module.startswith('processing.algs.mmqgisx'):
+        return True
+    return any(isinstance(p, ParameterRaster) for p in inputs)
+
+
+def getAlgorithmNames(pattern=None):
+    from processing.core.Processing import Processing
+    names = []
+    for alg in Processing.algs.get('qgis', {}).values():
+        if not isBenchmarked(alg):
+            continue
+        name = alg.commandLineName()
+        if pattern is None or re.search(pattern, name):
+            names.append(name)
+    return sorted(names)
+
+
+def getParameterValues(alg, folder, scale, seed):
+    """Sets the values of the parameters of an algorithm, using
+    synthetic layers of the given scale for its inputs and the
+    default values for the rest.
+
+    Raises ValueError if the algorithm has a parameter that cannot be
+    set automatically.
+    """
+    from processing.parameters.ParameterRaster import ParameterRaster
+    from processing.parameters.ParameterVector import ParameterVector
+    from processing.parameters.ParameterTable import ParameterTable
+    from processing.parameters.ParameterTableField import ParameterTableField
+    from processing.parameters.ParameterMultipleInput import \
+            ParameterMultipleInput
+    from processing.parameters.ParameterExtent import ParameterExtent
+    from processing.parameters.ParameterFile import ParameterFile
+    from processing.parameters.ParameterFixedTable import ParameterFixedTable
+
+    shapetypes = {ParameterVector.VECTOR_TYPE_POINT: 'point',
+                  ParameterVector.VECTOR_TYPE_LINE: 'line',
+                  ParameterVector.VECTOR_TYPE_POLYGON: 'polygon',
+                  ParameterVector.VECTOR_TYPE_ANY: 'polygon'}
+
+    # Inputs of the same type get different layers, so overlays do not
+    # intersect a layer with itself
+    used = {}
+
+    def layer(datatype):
+        used[datatype] = used.get(datatype, -1) + 1
+        return getData(folder, datatype, scale, seed + used[datatype])
+
+    for param in alg.parameters:
+        if param.hidden:
+            continue
+        if isinstance(param, ParameterRaster):
+            value = layer('raster')
+        elif isinstance(param, ParameterVector):
+            value = layer(shapetypes.get(param.shapetype[0], 'polygon'))
+        elif isinstance(param, ParameterTable):
+            value = layer('point')
+        elif isinstance(param, ParameterMultipleInput):
+            if param.datatype == ParameterMultipleInput.TYPE_RASTER:
+                value = layer('raster')
+            else:
+                value = layer(shapetypes.get(param.datatype, 'polygon'))
+        elif isinstance(param, ParameterTableField):
+            if param.datatype == ParameterTableField.DATA_TYPE_NUMBER:
+                value = 'value'
+            else:
+                value = 'category'
+        elif isinstance(param, ParameterExtent):
+            value = '%f,%f,%f,%f' % (XMIN, XMIN + SIZE, YMIN, YMIN + SIZE)
+        elif isinstance(param, (ParameterFile, ParameterFixedTable)):
+            raise ValueError('Parameter %s cannot be set automatically'
+                             % param.name)
+        else:
+            value = param.default
+        if not param.setValue(value):
+            raise ValueError('Wrong value for parameter %s: %s'
+                             % (param.name, unicode(value)))
+
+
+# =========================================================
+# Execution
+
+def runOne(name, folder, scale, seed):
+    """Runs an algorithm in this process and prints its results. This
+    is what the processes started by runBenchmark() do.
+    """
+    from qgis.core import QgsApplication
+    app = QgsApplication([], False)
+    if 'QGISPATH' in os.environ:
+        app.setPrefixPath(os.environ['QGISPATH'], True)
+    app.initQgis()
+
+    from processing.core.Processing import Processing
+    from processing.core.AlgorithmStats import AlgorithmStats
+    from processing.core.SilentProgress import SilentProgress
+    Processing.initialize()
+    alg = Processing.getAlgorithm(name)
+    if alg is None:
+        raise ValueError('Algorithm not found: %s' % name)
+    alg = alg.getCopy()
+    getParameterValues(alg, folder, scale, seed)
+
+    memory = AlgorithmStats.getPeakMemory()
+    alg.execute(SilentProgress())
+    stats = alg.executionStats
+    result = {
+        'time': stats.wallTime,
+        'cpu': stats.cpuTime,
+        'phases': dict((phase, wall) for (phase, wall, cpu) in
+                       stats.phases),
+        'featuresRead': stats.featuresRead,
+        'featuresWritten': stats.featuresWritten,
+        'memory': None,
+        }
+    if memory is not None:
+        result['memory'] = stats.peakMemory - memory
+    print RESULT_PREFIX + json.dumps(result)
+    app.exitQgis()
+
+
+def runBenchmark(name, folder, scale, seed, timeout):
+    """Runs an algorithm in a new process, and returns a dict with its
+    results. Raises GeoAlgorithmExecutionException if it fails or
+    times out.
+    """
+    from processing.core.ProcessRunner import ProcessRunner
+    from processing.core.GeoAlgorithmExecutionException import \
+            GeoAlgorithmExecutionException
+
+    def quote(s):
+        return '"%s"' % s
+
+    command = ' '.join([quote(sys.executable), quote(__file__), '--run',
+                        name, quote(folder), str(scale), str(seed)])
+    lines = ProcessRunner(command, timeout=timeout).run()
+    for line in lines:
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise GeoAlgorithmExecutionException('\n'.join(lines[-20:]))
+
+
+def compare(results, baseline, tolerance, keys=None):
+    """Returns a list of (key, description) tuples with the results
+    that are worse than those in the baseline.
+
+    Only the given keys are compared, or all the keys in both the
+    results and the baseline if None. A result that is missing or has
+    failed is a regression if it succeeded in the baseline.
+    """
+    if keys is None:
+        keys = set(results.keys()) | set(baseline.keys())
+    regressions = []
+    for key in sorted(keys):
+        base = baseline.get(key)
+        if base is None or 'error' in base:
+            continue
+        result = results.get(key)
+        if result is None:
+            regressions.append((key, 'no result, was %.3f s'
+                               % base['time']))
+            continue
+        if 'error' in result:
+            regressions.append((key, 'failed (%s), was %.3f s'
+                               % (result['error'].strip().split('\n')[-1],
+                               base['time'])))
+            continue
+        if result['time'] > base['time'] * (1 + tolerance) \
+                and result['time'] - base['time'] > MIN_TIME_DIFFERENCE:
+            regressions.append((key, 'time %.3f s, was %.3f s'
+                               % (result['time'], base['time'])))
+        if result['memory'] is not None and base['memory'] is not None \
+                and result['memory'] > base['memory'] * (1 + tolerance) \
+                and result['memory'] - base['memory'] \
+                > MIN_MEMORY_DIFFERENCE:
+            regressions.append((key, 'memory %.1f MB, was %.1f MB'
+                               % (result['memory'] / 1048576.0,
+                               base['memory'] / 1048576.0)))
+    return regressions
+
+
+def main(args):
+    if gdal is None:
+        print 'GDAL/OGR and NumPy are needed to create the benchmark data'
+        return 2
+
+    if args.run:
+        (name, folder, scale, seed) = args.run
+        runOne(name, folder, int(scale), int(seed))
+        return 0
+
+    from qgis.core import QgsApplication
+    app = QgsApplication([], False)
+    if 'QGISPATH' in os.environ:
+        app.setPrefixPath(os.environ['QGISPATH'], True)
+    app.initQgis()
+    from processing.core.Processing import Processing
+    Processing.initialize()
+
+    scales = sorted(int(s) for s in args.scales.split(','))
+    names = getAlgorithmNames(args.algorithms)
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline) \
+            and not args.save_baseline:
+        baseline = json.load(open(args.baseline))
+
+    print '%-45s%10s%12s%14s%12s%12s' % ('Algorithm', 'Size', 'Time (s)',
+            'Items/s', 'Memory (MB)', 'Baseline')
+    results = {}
+    keys = set()
+    for name in names:
+        failed = None
+        for scale in scales:
+            key = '%s@%i' % (name, scale)
+            keys.add(key)
+            if failed is not None:
+                # Larger layers would take even longer, or fail too
+                results[key] = {'error': 'Skipped, since it failed with '
+                                'a smaller size: ' + failed}
+                continue
+            try:
+                # Creates the input layers, if they do not exist yet, so
+                # that does not count towards the timeout
+                getParameterValues(Processing.getAlgorithm(name).getCopy(),
+                                   args.data, scale, args.seed)
+                result = runBenchmark(name, args.data, scale, args.seed,
+                                      args.timeout)
+            except Exception, e:
+                results[key] = {'error': unicode(e)}
+                failed = unicode(e).strip().split('\n')[-1]
+                print '%-45s%10i  Failed: %s' % (name, scale, failed[:60])
+                continue
+            results[key] = result
+            throughput = scale / max(result['time'], 1e-6)
+            if result['memory'] is None:
+                memory = '-'
+            else:
+                memory = '%.1f' % (result['memory'] / 1048576.0)
+            if key in baseline and 'time' in baseline[key]:
+                base = '%.3f' % baseline[key]['time']
+            else:
+                base = '-'
+            print '%-45s%10i%12.3f%14.0f%12s%12s' % (name, scale,
+                    result['time'], throughput, memory, base)
+
+    if args.output:
+        json.dump(results, open(args.output, 'w'), indent=2,
+                  sort_keys=True)
+    if args.save_baseline:
+        json.dump(results, open(args.baseline, 'w'), indent=2,
+                  sort_keys=True)
+        print 'Baseline saved to %s' % args.baseline
+
+    regressions = compare(results, baseline, args.tolerance, keys)
+    if regressions:
+        print '\nRegressions:'
+        for (key, description) in regressions:
+            print '  %s: %s' % (key, description)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+            description='Processing benchmark suite.')
+    parser.add_argument('-s', dest='scales', default=DEFAULT_SCALES,
+            help='Comma separated sizes of the input layers, in features '
+            'or cells. Default: %s' % DEFAULT_SCALES)
+    parser.add_argument('-a', dest='algorithms', default=None,
+            help='Regular expression to select the algorithms to run, '
+            'by command line name.')
+    parser.add_argument('-d', dest='data',
+            default=os.path.join(tempfile.gettempdir(),
+                                 'processing_benchmark'),
+            help='Folder where synthetic layers are stored.')
+    parser.add_argument('-b', dest='baseline', default=None,
+            help='Baseline file to compare the results against.')
+    parser.add_argument('--save-baseline', dest='save_baseline',
+            action='store_true',
+            help='Save the results to the baseline file instead.')
+    parser.add_argument('-o', dest='output', default=None,
+            help='File to save the results to.')
+    parser.add_argument('-t', dest='tolerance', type=float, default=0.2,
+            help='Relative increase in time or memory considered a '
+            'regression. Default: 0.2')
+    parser.add_argument('--timeout', dest='timeout', type=float,
+            default=600, help='Max. seconds for each run. Default: 600')
+    parser.add_argument('--seed', dest='seed', type=int, default=1,
+            help='Seed of the synthetic layers. Default: 1')
+    parser.add_argument('--run', nargs=4, default=None,
+            help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.save_baseline and not args.baseline:
+        parser.error('--save-baseline requires -b')
+    sys.exit(main(args))
@@ -110,6 +110,14 @@ class ModelerAlgorithmTest(unittest.TestCase):
         depends = model.getDependsOnAlgorithms(4)
         self.assertEquals([3, 2, 1, 0], depends)
 
+    def testReloadModels(self):
+        provider = Providers.providers['model']
+        algs = dict((alg.commandLineName(), alg) for alg in provider.algs)
+        provider.loadAlgorithms()
+        self.assertEqual(len(algs), len(provider.algs))
+        for alg in provider.algs:
+            self.assertTrue(alg is algs[alg.commandLineName()])
+
     def test_modelersagagrass(self):
         outputs = processing.runalg('modeler:sagagrass', points(), None)
         output = outputs['CENTROIDS_ALG1']
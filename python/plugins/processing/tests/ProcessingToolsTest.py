@@ -25,12 +25,32 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import os
+import random
 import unittest
+import numpy
+from osgeo import gdal, ogr
+from PyQt4.QtCore import QVariant, QDate
+from qgis.core import QGis, QgsCoordinateReferenceSystem, QgsFeature, \
+    QgsField, QgsGeometry, QgsPoint
 
 import processing
 from processing.core import Processing
-from processing.tools.vector import values
+from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
+from processing.core.AlgorithmStats import AlgorithmStats
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+from processing.core.SilentProgress import SilentProgress
+from processing.core.VectorWriter import VectorWriter
+from processing.core.RasterWriter import RasterWriter
+from processing.tools.vector import values, indexedlayer, IndexedLayer, \
+    dissolve, duplicateGeometries, numericColumns, valueCounts
+from processing.tools.raster import ZoneStatistics, RasterStatistics, \
+    blocks
 from processing.tools.dataobjects import *
+from processing.tools.system import isWindows, getTempFilename
+from processing.tools.kdtree import KDTree
 
 from processing.tests.TestData import points, points2, polygons, polygons2, \
     lines, union, table, polygonsGeoJson, raster
@@ -67,6 +87,22 @@ class ProcessingToolsTest(unittest.TestCase):
         self.assertEqual(1, len(features))
         layer.setSelectedFeatures([])
 
+    def test_featuresWithRequest(self):
+        layer = processing.getObject(points())
+        index = layer.fieldNameIndex('ID')
+        feature = layer.getFeatures().next()
+        layer.setSelectedFeatures([feature.id()])
+        features = list(processing.features(layer, attributes=['ID'],
+                        geometry=False))
+        layer.setSelectedFeatures([])
+        self.assertEqual(1, len(features))
+        self.assertEqual(feature.id(), features[0].id())
+        self.assertEqual(feature.attributes()[index],
+                         features[0].attributes()[index])
+        rect = feature.geometry().boundingBox()
+        features = list(processing.features(layer, rect=rect))
+        self.assertIn(feature.id(), [f.id() for f in features])
+
     def test_attributeValues(self):
         layer = processing.getObject(points())
         attributeValues = values(layer, 'ID')
@@ -76,6 +112,201 @@ class ProcessingToolsTest(unittest.TestCase):
             i += 1
         self.assertEquals(13, i)
 
+    def test_columns(self):
+        layer = processing.getObject(points())
+        column = numericColumns(layer, 'ID')['ID']
+        self.assertEqual(range(1, 13), [int(v) for v in column.compressed()])
+        counts = valueCounts(layer, 'ID')
+        self.assertEqual(12, len(counts))
+        self.assertTrue(all(count == 1 for (value, count) in counts))
+
+    def test_indexedlayer(self):
+        layer = processing.getObject(points())
+        index = indexedlayer(layer)
+        self.assertEqual(12, len(index))
+        for feature in layer.getFeatures():
+            self.assertEqual(feature.attributes(),
+                             index.attributeValues(feature.id()))
+            self.assertTrue(feature.geometry().equals(
+                            index.geometry(feature.id())))
+
+    def test_indexedlayerOnDisk(self):
+        layer = processing.getObject(points())
+        index = IndexedLayer(layer, 0.0001)
+        self.assertIsNotNone(index.db)
+        self.assertEqual(12, len(index))
+        for feature in layer.getFeatures():
+            stored = index.feature(feature.id())
+            self.assertEqual(feature.attributes(), stored.attributes())
+            self.assertTrue(feature.geometry().equals(stored.geometry()))
+
+    def test_dissolve(self):
+        layer = processing.getObject(polygons())
+        groups = dissolve(processing.features(layer))
+        self.assertEqual(1, len(groups))
+        (attrs, geom) = groups[0]
+        for feature in layer.getFeatures():
+            self.assertTrue(geom.contains(feature.geometry().centroid()))
+
+    def test_zonestatistics(self):
+        statistics = ZoneStatistics(3)
+        statistics.add(numpy.array([0, 1, 0]), numpy.array([1.0, 5.0, 3.0]))
+        statistics.add(numpy.array([0, 0]), numpy.array([3.0, 8.0]))
+        stats = statistics.statistics(0)
+        self.assertEqual(4, stats['count'])
+        self.assertEqual(3, stats['unique'])
+        self.assertAlmostEqual(3.75, stats['mean'])
+        self.assertAlmostEqual(3.0, stats['median'])
+        self.assertAlmostEqual(numpy.std([1, 3, 3, 8]), stats['std'])
+        self.assertEqual(1.0, stats['min'])
+        self.assertEqual(8.0, stats['max'])
+        self.assertEqual(5.0, statistics.statistics(1)['median'])
+        self.assertIsNone(statistics.statistics(2))
+
+    def test_rasterstatistics(self):
+        layer = processing.getObject(raster())
+        stats = RasterStatistics()
+        halves = [RasterStatistics(), RasterStatistics()]
+        for (i, (x, y, block)) in enumerate(blocks(layer)):
+            stats.add(block)
+            halves[i % 2].add(block)
+        halves[0].merge(halves[1])
+        self.assertEqual(stats.count, halves[0].count)
+        self.assertEqual(stats.nodata, halves[0].nodata)
+        self.assertAlmostEqual(stats.mean, halves[0].mean)
+        self.assertAlmostEqual(stats.std(), halves[0].std())
+        values = list(processing.scanraster(layer, SilentProgress()))
+        self.assertEqual(stats.count + stats.nodata, len(values))
+
+    def test_rasterwriter(self):
+        filename = getTempFilename('tif')
+        writer = RasterWriter(filename, 0, 0, 50, 30, 1, 1,
+                              QgsCoordinateReferenceSystem('EPSG:4326'))
+        # Only 2 of the 28 tiles fit in the cache
+        writer.TILE_SIZE = 8
+        writer.MAX_CACHED_TILES = 2
+        expected = numpy.empty((30, 50), numpy.float32)
+        expected.fill(writer.nodata)
+        cells = [(x, y) for x in xrange(50) for y in xrange(20)]
+        random.Random(0).shuffle(cells)
+        for (x, y) in cells:
+            writer.setValue(x * 100 + y, x, y)
+            expected[y, x] = x * 100 + y
+        for (x, y) in cells[:50]:
+            self.assertEqual(expected[y, x], writer.getValue(x, y))
+        block = numpy.arange(60).reshape(5, 12)
+        writer.setBlock(block, 3, 18)
+        expected[18:23, 3:15] = block
+        writer.setValue(-1, 4, 19)
+        expected[19, 4] = -1
+        writer.close()
+        dataset = gdal.Open(filename)
+        self.assertTrue(numpy.array_equal(expected,
+                        dataset.GetRasterBand(1).ReadAsArray()))
+        self.assertEqual(255, RasterWriter.nodataValue(gdal.GDT_Byte))
+        self.assertEqual(-32768, RasterWriter.nodataValue(gdal.GDT_Int16))
+
+    def test_vectorwriterBatches(self):
+        layer = processing.getObject(points())
+        writer = VectorWriter('memory:', None,
+                              layer.pendingFields().toList(),
+                              layer.wkbType(), layer.crs(), batchSize=5)
+        writer.addFeatures(layer.getFeatures())
+        writer.close()
+        self.assertEqual(12, writer.stats()[0])
+        self.assertEqual(12, writer.memLayer.featureCount())
+
+    def test_vectorwriterTransaction(self):
+        filename = getTempFilename('sqlite')
+        writer = VectorWriter(filename, None,
+                              [QgsField('DATE', QVariant.Date),
+                              QgsField('NAME', QVariant.String)],
+                              QGis.WKBPoint,
+                              QgsCoordinateReferenceSystem('EPSG:4326'))
+        feature = QgsFeature()
+        feature.setGeometry(QgsGeometry.fromPoint(QgsPoint(1, 2)))
+        feature.setAttributes([QDate(2013, 10, 1), u'\xe1rbol'])
+        writer.addFeature(feature)
+        writer.close()
+        layer = ogr.Open(filename).GetLayer(0)
+        defn = layer.GetLayerDefn()
+        self.assertEqual(ogr.OFTDate, defn.GetFieldDefn(0).GetType())
+        ogrFeature = layer.GetNextFeature()
+        self.assertEqual([2013, 10, 1],
+                         ogrFeature.GetFieldAsDateTime(0)[:3])
+        self.assertEqual(u'\xe1rbol',
+                         ogrFeature.GetFieldAsString(1).decode('utf-8'))
+
+    def test_searchAlgorithms(self):
+        alg = Processing.Processing.getAlgorithm('qgis:fixeddistancebuffer')
+        self.assertIn(alg, Processing.Processing.searchAlgorithms('BUFFER'))
+        self.assertIn(alg, Processing.Processing.searchAlgorithms('d d'))
+        self.assertEqual(alg, Processing.Processing.getAlgorithmFromFullName(
+                         alg.name))
+
+    def test_exportCache(self):
+        layer = processing.getObject(polygonsGeoJson())
+        exported = exportVectorLayer(layer)
+        self.assertTrue(os.path.exists(exported))
+        self.assertEqual(exported, exportVectorLayer(layer))
+        layer.setSubsetString('"POLY_NUM_A" > 1')
+        self.assertNotEqual(exported, exportVectorLayer(layer))
+        layer.setSubsetString('')
+
+    def test_layerIndex(self):
+        layer = load(points(), 'indexedpoints')
+        self.assertEqual(layer, getObjectFromName('indexedpoints'))
+        layer.setLayerName('renamedpoints')
+        self.assertIsNone(getObjectFromName('indexedpoints'))
+        self.assertEqual(layer, getObjectFromName('renamedpoints'))
+        QgsMapLayerRegistry.instance().removeMapLayers([layer.id()])
+        self.assertIsNone(getObjectFromName('renamedpoints'))
+
+    def test_log(self):
+        ProcessingLog.addToLog(ProcessingLog.LOG_WARNING, 'test\nwarning')
+        entries = ProcessingLog.getLogEntries([ProcessingLog.LOG_WARNING])
+        self.assertEqual('test|warning',
+                         entries[ProcessingLog.LOG_WARNING][-1].text)
+
+    @unittest.skipIf(isWindows(), 'Uses POSIX shell commands')
+    def test_processRunner(self):
+        lines = ProcessRunner('echo first && echo second').run()
+        self.assertEqual(['first', 'second'], [l.strip() for l in lines])
+        runner = ProcessRunner('sleep 10', timeout=0.5)
+        self.assertRaises(GeoAlgorithmExecutionException, runner.run)
+        progress = SilentProgress()
+        progress.canceled = True
+        runner = ProcessRunner('sleep 10', progress)
+        self.assertRaises(GeoAlgorithmExecutionException, runner.run)
+
+    def test_algstats(self):
+        processing.runalg('qgis:countpointsinpolygon', polygons(), points(),
+                          'NUMPOINTS', None)
+        stats = AlgorithmStats.getExecutions('qgis:countpointsinpolygon')[0]
+        self.assertFalse(stats.failed)
+        self.assertIn('processAlgorithm', [p[0] for p in stats.phases])
+        nPolygons = getObjectFromUri(polygons()).featureCount()
+        nPoints = getObjectFromUri(points()).featureCount()
+        self.assertEqual(stats.featuresRead, nPolygons + nPoints)
+        self.assertEqual(stats.featuresWritten, nPolygons)
+
+    def test_duplicateGeometries(self):
+        layer = getObjectFromUri(points())
+        feats = list(processing.features(layer))
+        result = list(duplicateGeometries(feats * 2))
+        expected = [(feat.id() if first is None else first) for (feat,
+                    first) in result[:len(feats)]]
+        self.assertEqual([first for (feat, first) in result[len(feats):]],
+                         expected)
+
+    def test_kdtree(self):
+        points = numpy.random.RandomState(0).rand(1000, 2)
+        (distances, indices) = KDTree(points).query(points[:50], 5)
+        for (point, d, i) in zip(points[:50], distances, indices):
+            expected = numpy.sqrt(((points - point) ** 2).sum(1))
+            self.assertTrue(numpy.allclose(d, numpy.sort(expected)[:5]))
+            self.assertTrue(numpy.allclose(expected[i], d))
+
     def test_extent(self):
         pass
 
@@ -86,6 +86,29 @@ class RunAlgTest(ParametrizedTestCase):
         values = [str(attr) for attr in attrs]
         self.assertEqual(expectedvalues, values)
 
+    def test_qgisdistancematrixwithoutellipsoidal(self):
+        # Called as it was before the ELLIPSOIDAL parameter was added
+        output = None if self.useTempFiles else getTempFilename('csv')
+        outputs = processing.runalg('qgis:distancematrix', points(), 'ID',
+                                    points(), 'ID', 0, 1, output)
+        output = outputs['DISTANCE_MATRIX']
+        with open(output) as f:
+            lines = f.read().splitlines()
+        self.assertEqual('InputID,TargetID,Distance', lines[0])
+        for line in lines[1:]:
+            (inID, targetID, distance) = line.split(',')
+            self.assertEqual(inID, targetID)
+            self.assertEqual(0, float(distance))
+
+    def test_mmqgisxdeleteduplicategeometrieswithouttolerance(self):
+        # Called as it was before the TOLERANCE parameter was added
+        outputs = processing.runalg('mmqgisx:deleteduplicategeometries',
+                                    polygons(), self.getOutputFile())
+        output = outputs['SAVENAME']
+        layer = dataobjects.getObjectFromUri(output, True)
+        source = dataobjects.getObjectFromUri(polygons(), True)
+        self.assertEqual(source.featureCount(), layer.featureCount())
+
 
 def suite():
     suite = unittest.TestSuite()
@@ -193,6 +193,7 @@ class ProcessingProviderTestCase(unittest.TestCase):
 def algSuite(dialog='none', threaded=True, unthreaded=True,
              provider=None, algName=None):
     s = unittest.TestSuite()
+    Processing.loadLazyProviders()
     for (provider, algs) in Processing.algs.items():
         if not algs.items():
             print bcolors.WARNING, 'WARNING: %s seems to provide no algs!' \
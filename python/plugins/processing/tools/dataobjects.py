@@ -31,6 +31,7 @@ from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing import interface
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.ExportCache import ExportCache
 from processing.gdal.GdalUtils import GdalUtils
 from processing.tools.system import *
 
@@ -60,7 +61,7 @@ def getSupportedOutputRasterLayerExtensions():
 
 
 def getSupportedOutputTableExtensions():
-    exts = ['csv']
+    exts = ['csv', 'sqlite']
     return exts
 
 
@@ -77,15 +78,19 @@ def getRasterLayers():
 
 def getVectorLayers(shapetype=[-1]):
     layers = QgsMapLayerRegistry.instance().mapLayers().values()
-    vector = []
-    for layer in layers:
-        if layer.type() == layer.VectorLayer:
-            if shapetype == ALL_TYPES or layer.geometryType() in shapetype:
-                uri = unicode(layer.source())
-                if not uri.lower().endswith('csv') \
-                        and not uri.lower().endswith('dbf'):
-                    vector.append(layer)
-    return vector
+    return [layer for layer in layers if isVectorLayer(layer, shapetype)]
+
+
+def isVectorLayer(layer, shapetype=[-1]):
+    """Returns True if the layer is one of those returned by
+    getVectorLayers(shapetype).
+    """
+    if layer.type() == layer.VectorLayer:
+        if shapetype == ALL_TYPES or layer.geometryType() in shapetype:
+            uri = unicode(layer.source())
+            return not uri.lower().endswith('csv') \
+                and not uri.lower().endswith('dbf')
+    return False
 
 
 def getAllLayers():
@@ -185,11 +190,123 @@ def load(fileName, name=None, crs=None, style=None):
     return qgslayer
 
 
+class LayerIndex:
+    """Layers in the map layer registry, indexed by source and by
+    name.
+
+    The index is kept in sync with the registry through its signals,
+    so finding a layer does not require going through all of them.
+    Only layers that getObjectFromUri() can return (vector layers and
+    GDAL raster layers) are indexed.
+    """
+
+    def __init__(self):
+        self.registry = None
+        self.layers = {}
+        self.sources = {}
+        self.names = {}
+
+    def connect(self):
+        registry = QgsMapLayerRegistry.instance()
+        if registry is self.registry:
+            return
+        self.registry = registry
+        self.layers = {}
+        self.sources = {}
+        self.names = {}
+        registry.layersAdded.connect(self.layersAdded)
+        registry.layersRemoved.connect(self.layersRemoved)
+        self.layersAdded(registry.mapLayers().values())
+
+    def layersAdded(self, layers):
+        for layer in layers:
+            if layer.type() == layer.VectorLayer \
+                    or layer.type() == layer.RasterLayer \
+                    and layer.providerType() == 'gdal':
+                self.addLayer(layer)
+                layer.layerNameChanged.connect(
+                        lambda layerId=layer.id(): self.updateLayer(layerId))
+
+    def layersRemoved(self, layerIds):
+        for layerId in layerIds:
+            self.removeLayer(unicode(layerId))
+
+    def addLayer(self, layer):
+        layerId = unicode(layer.id())
+        source = unicode(layer.source())
+        name = unicode(layer.name())
+        self.layers[layerId] = (layer, source, name)
+        self.sources.setdefault(source, []).append(layer)
+        self.names.setdefault(name, []).append(layer)
+
+    def removeLayer(self, layerId):
+        if layerId not in self.layers:
+            return
+        (layer, source, name) = self.layers.pop(layerId)
+        for (index, key) in [(self.sources, source), (self.names, name)]:
+            layers = index[key]
+            layers.remove(layer)
+            if not layers:
+                del index[key]
+
+    def updateLayer(self, layerId):
+        if layerId in self.layers:
+            layer = self.layers[layerId][0]
+            self.removeLayer(layerId)
+            self.addLayer(layer)
+
+    def getFromSource(self, source):
+        self.connect()
+        layers = self.sources.get(unicode(source))
+        if layers:
+            return layers[0]
+        return None
+
+    def getFromName(self, name):
+        self.connect()
+        return list(self.names.get(unicode(name), []))
+
+
+layerIndex = LayerIndex()
+
+
+def registerTemporaryLayer(layer):
+    """Makes a layer that is not in the map layer registry available
+    to getObjectFromUri(), until unregisterTemporaryLayer() is called.
+    """
+    layerIndex.connect()
+    layerIndex.addLayer(layer)
+
+
+def unregisterTemporaryLayer(layer):
+    layerIndex.removeLayer(unicode(layer.id()))
+
+
+def getRasterLayerFromName(name):
+    """Returns the first layer with the given name among those
+    returned by getRasterLayers().
+    """
+    for layer in layerIndex.getFromName(name):
+        if layer.type() == layer.RasterLayer:
+            return layer
+    return None
+
+
+def getVectorLayerFromName(name, shapetype=[-1]):
+    """Returns the first layer with the given name among those
+    returned by getVectorLayers(shapetype).
+    """
+    for layer in layerIndex.getFromName(name):
+        if isVectorLayer(layer, shapetype):
+            return layer
+    return None
+
+
 def getObjectFromName(name):
-    layers = getAllLayers()
-    for layer in layers:
-        if layer.name() == name:
+    for layer in layerIndex.getFromName(name):
+        if layer.type() == layer.RasterLayer or isVectorLayer(layer):
             return layer
+    return None
 
 
 def getObject(uriorname):
@@ -208,18 +325,9 @@ def getObjectFromUri(uri, forceLoad=True):
 
     if uri is None:
         return None
-    layers = getRasterLayers()
-    for layer in layers:
-        if layer.source() == uri:
-            return layer
-    layers = getVectorLayers()
-    for layer in layers:
-        if layer.source() == uri:
-            return layer
-    tables = getTables()
-    for table in tables:
-        if table.source() == uri:
-            return table
+    layer = layerIndex.getFromSource(uri)
+    if layer is not None:
+        return layer
     if forceLoad:
         settings = QSettings()
         prjSetting = settings.value('/Projections/defaultBehaviour')
@@ -270,10 +378,15 @@ def exportVectorLayer(layer):
     filename = ''.join(c for c in filename if c in validChars)
     if len(filename) == 0:
         filename = 'layer'
-    output = getTempFilenameInTempFolder(filename + '.shp')
     provider = layer.dataProvider()
     useSelection = ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED)
     if useSelection and layer.selectedFeatureCount() != 0:
+        key = ExportCache.getKey(layer, 'vector',
+                                 sorted(layer.selectedFeaturesIds()))
+        output = ExportCache.getExport(key)
+        if output is not None:
+            return output
+        output = getTempFilenameInTempFolder(filename + '.shp')
         writer = QgsVectorFileWriter(output, systemEncoding,
                                      layer.pendingFields(),
                                      provider.geometryType(), layer.crs())
@@ -281,6 +394,7 @@ def exportVectorLayer(layer):
         for feat in selection:
             writer.addFeature(feat)
         del writer
+        ExportCache.addExport(key, layer, output)
         return output
     else:
         isASCII = True
@@ -289,12 +403,18 @@ def exportVectorLayer(layer):
         except UnicodeEncodeError:
             isASCII = False
         if not unicode(layer.source()).endswith('shp') or not isASCII:
+            key = ExportCache.getKey(layer, 'vector')
+            output = ExportCache.getExport(key)
+            if output is not None:
+                return output
+            output = getTempFilenameInTempFolder(filename + '.shp')
             writer = QgsVectorFileWriter(output, systemEncoding,
                     layer.pendingFields(), provider.geometryType(),
                     layer.crs())
             for feat in layer.getFeatures():
                 writer.addFeature(feat)
             del writer
+            ExportCache.addExport(key, layer, output)
             return output
         else:
             return unicode(layer.source())
@@ -332,7 +452,6 @@ def exportTable(table):
 
     settings = QSettings()
     systemEncoding = settings.value('/UI/encoding', 'System')
-    output = getTempFilename('dbf')
     provider = table.dataProvider()
     isASCII = True
     try:
@@ -342,12 +461,18 @@ def exportTable(table):
     isDbf = unicode(table.source()).endswith('dbf') \
         or unicode(table.source()).endswith('shp')
     if not isDbf or not isASCII:
+        key = ExportCache.getKey(table, 'table')
+        output = ExportCache.getExport(key)
+        if output is not None:
+            return output
+        output = getTempFilenameInTempFolder('table.dbf')
         writer = QgsVectorFileWriter(output, systemEncoding,
                                      provider.fields(), QGis.WKBNoGeometry,
                                      QgsCoordinateReferenceSystem('4326'))
         for feat in table.getFeatures():
             writer.addFeature(feat)
         del writer
+        ExportCache.addExport(key, table, output)
         return output
     else:
         filename = unicode(table.source())
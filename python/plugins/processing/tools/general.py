@@ -25,18 +25,22 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import time
 from qgis.core import *
 from processing.core.Processing import Processing
+from processing.core.AlgorithmStats import AlgorithmStats
 from processing.gui.Postprocessing import Postprocessing
 from processing.parameters.ParameterSelection import ParameterSelection
 
 
 def alglist(text=None):
+    if text is not None:
+        found = Processing.searchAlgorithms(text)
     s = ''
     for provider in Processing.algs.values():
         sortedlist = sorted(provider.values(), key=lambda alg: alg.name)
         for alg in sortedlist:
-            if text is None or text.lower() in alg.name.lower():
+            if text is None or alg in found:
                 s += alg.name.ljust(50, '-') + '--->' + alg.commandLineName() \
                     + '\n'
     print s
@@ -67,6 +71,74 @@ def alghelp(name):
         print 'Algorithm not found'
 
 
+def algstats(name=None, limit=10, profile=False):
+    """Prints the time spent in each phase of the last executions of
+    an algorithm, the oldest first, so they can be compared. If no name
+    is given, the mean time of all the algorithms executed is printed
+    instead.
+
+    If profile is True, the profile of the last execution is printed
+    too. Algorithms are only profiled if the 'Profile algorithms'
+    option is enabled.
+    """
+    if name is None:
+        s = 'Algorithm'.ljust(50) + 'Runs'.rjust(6) + 'Mean (s)'.rjust(12) \
+            + 'Min (s)'.rjust(12) + 'Max (s)'.rjust(12) + '\n'
+        for (algname, count, mean, minimum, maximum) in \
+                AlgorithmStats.getSummary():
+            s += algname.ljust(50) + str(count).rjust(6) \
+                + ('%.3f' % mean).rjust(12) + ('%.3f' % minimum).rjust(12) \
+                + ('%.3f' % maximum).rjust(12) + '\n'
+        print s
+        return
+
+    alg = Processing.getAlgorithm(name)
+    if alg is not None:
+        name = alg.commandLineName()
+    executions = list(reversed(AlgorithmStats.getExecutions(name, limit)))
+    if not executions:
+        print 'No executions found'
+        return
+
+    phases = []
+    for stats in executions:
+        for (phase, wall, cpu) in stats.phases:
+            if phase not in phases:
+                phases.append(phase)
+
+    def megabytes(size):
+        if size is None:
+            return '-'
+        return '%.1f' % (size / 1048576.0)
+
+    rows = [('Date', lambda stats: time.strftime('%m-%d %H:%M',
+            time.localtime(stats.started))),
+            ('Total time (s)', lambda stats: '%.3f' % stats.wallTime),
+            ('CPU time (s)', lambda stats: '%.3f' % stats.cpuTime)]
+    for phase in phases:
+        rows.append(('  ' + phase, lambda stats, phase=phase: '%.3f'
+                    % stats.getPhaseTime(phase)))
+    rows.extend([('Features read', lambda stats: str(stats.featuresRead)),
+                 ('Features written', lambda stats:
+                    str(stats.featuresWritten)),
+                 ('Temporary outputs (MB)', lambda stats:
+                    megabytes(stats.tempBytes)),
+                 ('Peak memory (MB)', lambda stats:
+                    megabytes(stats.peakMemory)),
+                 ('Failed', lambda stats: str(stats.failed))])
+    s = name + '\n'
+    for (label, value) in rows:
+        s += label.ljust(30) + ''.join([value(stats).rjust(14) for stats in
+                                        executions]) + '\n'
+    if profile:
+        profiled = [stats for stats in executions if stats.profile]
+        if profiled:
+            s += '\n' + profiled[-1].profile
+        else:
+            s += '\nNo profile found\n'
+    print s
+
+
 def runalg(algOrName, *args):
     alg = Processing.runAlgorithm(algOrName, None, *args)
     if alg is not None:
@@ -86,6 +86,7 @@ def createBaseHelpFile(alg, folder):
 
 
 def createBaseHelpFiles(folder):
+    Processing.loadLazyProviders(False)
     for provider in Processing.providers:
         for alg in provider.algs:
             createBaseHelpFile(alg, folder)
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    kdtree.py
+    ---------------------
+    Date                 : October 2013
+    Copyright            : (C) 2013 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2013'
+__copyright__ = '(C) 2013, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import numpy
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+
+# Max. number of distances computed at once, which limits the memory
+# used by queries
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class KDTree:
+    """A KD-tree of points, to find the nearest ones to a large number
+    of other points at once.
+
+    Queries are answered for blocks of points at a time using NumPy,
+    instead of one point at a time, so finding the nearest neighbours
+    of a million points takes seconds rather than hours.
+
+    Usage:
+
+        tree = KDTree(points)
+        (distances, indices) = tree.query(otherPoints, k)
+
+    points is an array with one row per point and one column per
+    dimension. distances and indices have one row for each of the
+    query points, with the euclidean distances to their k nearest
+    points and the indices of those in the points array, the nearest
+    first.
+    """
+
+    LEAF_SIZE = 32
+
+    def __init__(self, points, leafSize=None):
+        self.points = numpy.asarray(points, dtype=numpy.float64)
+        if self.points.ndim == 1:
+            self.points = self.points.reshape((-1, 1))
+        (self.count, self.dimensions) = self.points.shape
+        self.leafSize = leafSize or self.LEAF_SIZE
+        self.build()
+
+    def build(self):
+        # Points are reordered so the points of each node are
+        # contiguous. Nodes are split at the median of their widest
+        # dimension, by position, so duplicate points do not create
+        # large leaves.
+        order = numpy.arange(self.count)
+        starts = [0]
+        ends = [self.count]
+        splitDims = [0]
+        splitValues = [0.0]
+        lefts = [-1]
+        rights = [-1]
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            (start, end) = (starts[node], ends[node])
+            if end - start <= self.leafSize:
+                continue
+            idx = order[start:end]
+            points = self.points[idx]
+            dim = int(numpy.argmax(points.max(0) - points.min(0)))
+            idx = idx[numpy.argsort(points[:, dim], kind='mergesort')]
+            order[start:end] = idx
+            mid = (start + end) // 2
+            splitDims[node] = dim
+            splitValues[node] = self.points[order[mid], dim]
+            for (childStart, childEnd) in [(start, mid), (mid, end)]:
+                starts.append(childStart)
+                ends.append(childEnd)
+                splitDims.append(0)
+                splitValues.append(0.0)
+                lefts.append(-1)
+                rights.append(-1)
+                stack.append(len(starts) - 1)
+            lefts[node] = len(starts) - 2
+            rights[node] = len(starts) - 1
+
+        self.order = order
+        self.sorted = self.points[order]
+        self.starts = numpy.array(starts, dtype=numpy.intp)
+        self.ends = numpy.array(ends, dtype=numpy.intp)
+        self.splitDims = numpy.array(splitDims, dtype=numpy.intp)
+        self.splitValues = numpy.array(splitValues, dtype=numpy.float64)
+        self.lefts = numpy.array(lefts, dtype=numpy.intp)
+        self.rights = numpy.array(rights, dtype=numpy.intp)
+
+        # Bounding boxes of the nodes. Children are always created
+        # after their parents, so they can be computed backwards.
+        nodes = len(starts)
+        self.mins = numpy.zeros((nodes, self.dimensions))
+        self.maxs = numpy.zeros((nodes, self.dimensions))
+        if self.count == 0:
+            return
+        leaves = numpy.nonzero(self.lefts < 0)[0]
+        leaves = leaves[numpy.argsort(self.starts[leaves])]
+        self.mins[leaves] = numpy.minimum.reduceat(self.sorted,
+                self.starts[leaves])
+        self.maxs[leaves] = numpy.maximum.reduceat(self.sorted,
+                self.starts[leaves])
+        for node in xrange(nodes - 1, -1, -1):
+            if lefts[node] >= 0:
+                self.mins[node] = numpy.minimum(self.mins[lefts[node]],
+                        self.mins[rights[node]])
+                self.maxs[node] = numpy.maximum(self.maxs[lefts[node]],
+                        self.maxs[rights[node]])
+
+    def query(self, points, k):
+        """Returns the distances to the k nearest points, and their
+        indices, for each of the given points.
+        """
+        distances = []
+        indices = []
+        for (start, d, i) in self.queryBlocks(points, k):
+            distances.append(d)
+            indices.append(i)
+        if not distances:
+            k = min(k, self.count)
+            return (numpy.zeros((0, k)), numpy.zeros((0, k), dtype=int))
+        return (numpy.vstack(distances), numpy.vstack(indices))
+
+    def queryBlocks(self, points, k):
+        """Like query(), but returns an iterator over the results for
+        consecutive blocks of the given points, as (start, distances,
+        indices) tuples, where start is the index of the first point
+        in the block. This way large results do not have to be kept
+        in memory.
+        """
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(
+                (-1, self.dimensions))
+        k = min(k, self.count)
+        if k <= 0:
+            return
+
+        if k * 4 > self.count:
+            # Most of the tree would be visited, so it is faster to
+            # compute all the distances
+            size = max(1, BLOCK_SIZE // self.count)
+            for start in xrange(0, len(points), size):
+                (d, i) = self.queryAll(points[start:start + size], k)
+                yield (start, d, i)
+        else:
+            size = max(1, BLOCK_SIZE // (8 * max(k, self.leafSize)))
+            for start in xrange(0, len(points), size):
+                (d, i) = self.queryTree(points[start:start + size], k)
+                yield (start, d, i)
+
+    def queryAll(self, points, k):
+        d2 = numpy.zeros((len(points), self.count))
+        for dim in xrange(self.dimensions):
+            diff = points[:, dim, numpy.newaxis] - self.sorted[:, dim]
+            d2 += diff * diff
+        nearest = numpy.argsort(d2, axis=1, kind='mergesort')[:, :k]
+        rows = numpy.arange(len(points))[:, numpy.newaxis]
+        return (numpy.sqrt(d2[rows, nearest]), self.order[nearest])
+
+    def queryTree(self, points, k):
+        count = len(points)
+        queries = numpy.arange(count)
+
+        # Start with the smallest node containing each point that has
+        # at least k points, so there is a first estimate of the
+        # distance to the k-th nearest point
+        first = numpy.zeros(count, dtype=numpy.intp)
+        while True:
+            left = self.lefts[first]
+            inner = left >= 0
+            goLeft = points[queries, self.splitDims[first]] \
+                < self.splitValues[first]
+            child = numpy.where(goLeft, left, self.rights[first])
+            move = inner & (self.ends[child] - self.starts[child] >= k)
+            if not move.any():
+                break
+            first = numpy.where(move, child, first)
+
+        bestD2 = numpy.empty((count, k))
+        bestD2.fill(numpy.inf)
+        bestPos = numpy.zeros((count, k), dtype=numpy.intp)
+        (bestD2, bestPos) = self.merge(bestD2, bestPos,
+                *self.candidates(points, queries, first))
+
+        # Then visit the rest of the tree for all the points at the same
+        # time, discarding nodes farther than the k-th nearest point
+        # found so far, and the first node, which has already been
+        # visited
+        pairQueries = queries
+        pairNodes = numpy.zeros(count, dtype=numpy.intp)
+        while len(pairQueries):
+            p = points[pairQueries]
+            gap = numpy.maximum(self.mins[pairNodes] - p, 0) \
+                + numpy.maximum(p - self.maxs[pairNodes], 0)
+            d2 = (gap * gap).sum(1)
+            keep = (d2 < bestD2[pairQueries, -1]) \
+                & (pairNodes != first[pairQueries])
+            pairQueries = pairQueries[keep]
+            pairNodes = pairNodes[keep]
+            leaf = self.lefts[pairNodes] < 0
+            if leaf.any():
+                (bestD2, bestPos) = self.merge(bestD2, bestPos,
+                        *self.candidates(points, pairQueries[leaf],
+                        pairNodes[leaf]))
+            inner = ~leaf
+            pairQueries = numpy.concatenate([pairQueries[inner],
+                    pairQueries[inner]])
+            pairNodes = numpy.concatenate([self.lefts[pairNodes[inner]],
+                    self.rights[pairNodes[inner]]])
+
+        return (numpy.sqrt(bestD2), self.order[bestPos])
+
+    def candidates(self, points, queries, nodes):
+        """Returns the query indices, squared distances and positions
+        of all the (query, point) pairs for the points in the given
+        nodes.
+        """
+        starts = self.starts[nodes]
+        sizes = self.ends[nodes] - starts
+        offsets = numpy.arange(sizes.max())
+        valid = offsets < sizes[:, numpy.newaxis]
+        positions = (starts[:, numpy.newaxis] + offsets)[valid]
+        queries = numpy.repeat(queries, sizes)
+        diff = points[queries] - self.sorted[positions]
+        return (queries, (diff * diff).sum(1), positions)
+
+    def merge(self, bestD2, bestPos, queries, d2, positions):
+        """Returns the k nearest points of each query among the current
+        ones and the given candidates.
+        """
+        (count, k) = bestD2.shape
+
+        # Most candidates are usually farther than the current k-th
+        # nearest point, so they are discarded before sorting
+        closer = d2 < bestD2[queries, -1]
+        (queries, d2, positions) = (queries[closer], d2[closer],
+                                    positions[closer])
+        if not len(queries):
+            return (bestD2, bestPos)
+
+        # Candidates are put in a matrix with a row for each query,
+        # after its current nearest points, and the rows are sorted
+        order = numpy.argsort(queries, kind='mergesort')
+        (queries, d2, positions) = (queries[order], d2[order],
+                                    positions[order])
+        counts = numpy.bincount(queries, minlength=count)
+        firsts = numpy.cumsum(counts) - counts
+        columns = k + numpy.arange(len(queries)) - firsts[queries]
+        width = k + counts.max()
+        allD2 = numpy.empty((count, width))
+        allD2.fill(numpy.inf)
+        allD2[:, :k] = bestD2
+        allD2[queries, columns] = d2
+        allPos = numpy.zeros((count, width), dtype=numpy.intp)
+        allPos[:, :k] = bestPos
+        allPos[queries, columns] = positions
+        nearest = numpy.argsort(allD2, axis=1, kind='mergesort')[:, :k]
+        rows = numpy.arange(count)[:, numpy.newaxis]
+        return (allD2[rows, nearest], allPos[rows, nearest])
+
+
+class PointIndex:
+    """Finds the nearest points of a layer to the points of another
+    one, or the same one, using a KDTree.
+
+    Points are given as arrays with x and y columns. If ellipsoidal is
+    True, they must be longitudes and latitudes in degrees, and
+    distances are measured in meters on the WGS84 ellipsoid. The
+    nearest points are found using the straight distance between their
+    geocentric coordinates, which sorts them as the distance on the
+    ellipsoid does, except for points at almost the same distance.
+    """
+
+    def __init__(self, points, ellipsoidal=False):
+        self.points = numpy.asarray(points, dtype=numpy.float64).reshape(
+                (-1, 2))
+        self.ellipsoidal = ellipsoidal
+        self.tree = KDTree(self.treeCoordinates(self.points))
+
+    def __len__(self):
+        return len(self.points)
+
+    def treeCoordinates(self, points):
+        if self.ellipsoidal:
+            return geocentric(points[:, 0], points[:, 1])
+        return points
+
+    def query(self, points, k):
+        distances = []
+        indices = []
+        for (start, d, i) in self.queryBlocks(points, k):
+            distances.append(d)
+            indices.append(i)
+        if not distances:
+            k = min(k, len(self.points))
+            return (numpy.zeros((0, k)), numpy.zeros((0, k), dtype=int))
+        return (numpy.vstack(distances), numpy.vstack(indices))
+
+    def queryBlocks(self, points, k):
+        """Returns an iterator over (start, distances, indices) tuples,
+        as KDTree.queryBlocks() does.
+        """
+        points = numpy.asarray(points, dtype=numpy.float64).reshape((-1, 2))
+        for (start, d, i) in self.tree.queryBlocks(
+                self.treeCoordinates(points), k):
+            if self.ellipsoidal:
+                block = points[start:start + len(d)]
+                d = self.measure(block[:, numpy.newaxis], self.points[i])
+                nearest = numpy.argsort(d, axis=1, kind='mergesort')
+                rows = numpy.arange(len(d))[:, numpy.newaxis]
+                (d, i) = (d[rows, nearest], i[rows, nearest])
+            yield (start, d, i)
+
+    def distanceBlocks(self, points, indices):
+        """Returns an iterator over (start, distances) tuples with the
+        distances from consecutive blocks of the given points to the
+        indexed points with the given indices.
+        """
+        points = numpy.asarray(points, dtype=numpy.float64).reshape((-1, 2))
+        targets = self.points[numpy.asarray(indices, dtype=numpy.intp)]
+        size = max(1, BLOCK_SIZE // max(1, len(targets)))
+        for start in xrange(0, len(points), size):
+            block = points[start:start + size]
+            yield (start, self.measure(block[:, numpy.newaxis], targets))
+
+    def measure(self, a, b):
+        """Returns the distances between two arrays of points, which
+        are broadcast against each other.
+        """
+        if self.ellipsoidal:
+            return ellipsoidalDistance(a[..., 0], a[..., 1], b[..., 0],
+                                       b[..., 1])
+        diff = a - b
+        return numpy.sqrt((diff * diff).sum(-1))
+
+
+def geocentric(lon, lat, a=WGS84_A, f=WGS84_F):
+    """Converts longitudes and latitudes in degrees to geocentric
+    coordinates in meters, as an array with x, y and z columns.
+    """
+    lon = numpy.radians(lon)
+    lat = numpy.radians(lat)
+    e2 = f * (2 - f)
+    sinLat = numpy.sin(lat)
+    n = a / numpy.sqrt(1 - e2 * sinLat * sinLat)
+    return numpy.column_stack([n * numpy.cos(lat) * numpy.cos(lon),
+                              n * numpy.cos(lat) * numpy.sin(lon),
+                              n * (1 - e2) * sinLat])
+
+
+def ellipsoidalDistance(lon1, lat1, lon2, lat2, a=WGS84_A, f=WGS84_F):
+    """Returns the distances in meters between points given by their
+    longitudes and latitudes in degrees, on an ellipsoid, using
+    Vincenty's inverse formula. Arguments are NumPy arrays, which are
+    broadcast against each other.
+    """
+    b = (1 - f) * a
+    l = numpy.radians(lon2) - numpy.radians(lon1)
+    u1 = numpy.arctan((1 - f) * numpy.tan(numpy.radians(lat1)))
+    u2 = numpy.arctan((1 - f) * numpy.tan(numpy.radians(lat2)))
+    (sinU1, cosU1) = (numpy.sin(u1), numpy.cos(u1))
+    (sinU2, cosU2) = (numpy.sin(u2), numpy.cos(u2))
+    lam = l + numpy.zeros(numpy.broadcast(u1, u2).shape)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        for iteration in xrange(100):
+            (sinLam, cosLam) = (numpy.sin(lam), numpy.cos(lam))
+            sinSigma = numpy.sqrt((cosU2 * sinLam) ** 2 + (cosU1 * sinU2
+                                  - sinU1 * cosU2 * cosLam) ** 2)
+            cosSigma = sinU1 * sinU2 + cosU1 * cosU2 * cosLam
+            sigma = numpy.arctan2(sinSigma, cosSigma)
+            sinAlpha = numpy.where(sinSigma == 0, 0,
+                    cosU1 * cosU2 * sinLam / sinSigma)
+            cos2Alpha = 1 - sinAlpha * sinAlpha
+
+            # cos2Alpha is 0 for points on the equator
+            cos2SigmaM = numpy.where(cos2Alpha == 0, 0,
+                    cosSigma - 2 * sinU1 * sinU2 / cos2Alpha)
+            c = f / 16 * cos2Alpha * (4 + f * (4 - 3 * cos2Alpha))
+            previous = lam
+            lam = l + (1 - c) * f * sinAlpha * (sigma + c * sinSigma
+                    * (cos2SigmaM + c * cosSigma * (-1 + 2 * cos2SigmaM
+                    * cos2SigmaM)))
+
+            # Nearly antipodal points may not converge, in which case
+            # the last approximation is used
+            if numpy.all(numpy.abs(lam - previous) < 1e-12):
+                break
+
+    u2 = cos2Alpha * (a * a - b * b) / (b * b)
+    bigA = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    bigB = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    deltaSigma = bigB * sinSigma * (cos2SigmaM + bigB / 4 * (cosSigma
+            * (-1 + 2 * cos2SigmaM * cos2SigmaM) - bigB / 6 * cos2SigmaM
+            * (-3 + 4 * sinSigma * sinSigma) * (-3 + 4 * cos2SigmaM
+            * cos2SigmaM)))
+    return b * bigA * (sigma - deltaSigma)
@@ -25,25 +25,134 @@ __copyright__ = '(C) 2013, Victor Olaya  and Alexander Bruy'
 
 __revision__ = '$Format:%H$'
 
-import struct
-from osgeo import gdal
+import math
+import numpy
+from osgeo import gdal, gdal_array
 from osgeo.gdalconst import *
 
+# Minimum number of cells read at once by blocks()
+BLOCK_PIXELS = 1024 * 1024
+
 
 def scanraster(layer, progress):
-    filename = unicode(layer.source())
+    """Returns an iterator over the values of the first band of a raster
+    layer, row by row. No-data cells are returned as None.
+
+    This is slow for large layers, since each value is converted to a
+    Python object. Use blocks() to process values as NumPy arrays.
+    """
+    for (xOffset, yOffset, block) in blocks(layer, progress=progress,
+                                            fullRows=True):
+        for row in block.tolist():
+            for value in row:
+                yield value
+
+
+def blocks(layer, bandNumber=1, progress=None, fullRows=False):
+    """Returns an iterator over the blocks of a band of a raster layer.
+
+    Blocks follow the natural block size of the band, so each of them is
+    read from disk only once. Small blocks, such as the single scanlines
+    of striped files, are grouped to reduce the number of reads.
+    If fullRows is True, each block covers the whole width of the layer
+    and blocks are returned from top to bottom.
+
+    Each item is a tuple (xOffset, yOffset, block), where block is a
+    NumPy masked array with no-data and NaN cells masked.
+
+    The layer can be a QgsRasterLayer or the path to a raster file.
+    """
+    if hasattr(layer, 'source'):
+        filename = unicode(layer.source())
+    else:
+        filename = unicode(layer)
     dataset = gdal.Open(filename, GA_ReadOnly)
-    band = dataset.GetRasterBand(1)
+    band = dataset.GetRasterBand(bandNumber)
     nodata = band.GetNoDataValue()
-    for y in xrange(band.YSize):
-        progress.setPercentage(y / float(band.YSize) * 100)
-        scanline = band.ReadRaster(0, y, band.XSize, 1, band.XSize, 1,
-                                   band.DataType)
-        values = struct.unpack('f' * band.XSize, scanline)
-        for value in values:
-            if value == nodata:
-                value = None
-            yield value
+    (xSize, ySize) = (band.XSize, band.YSize)
+    (blockXSize, blockYSize) = band.GetBlockSize()
+    if fullRows:
+        blockXSize = xSize
+    blockXSize = min(blockXSize, xSize)
+    blockYSize *= max(1, BLOCK_PIXELS / (blockXSize * blockYSize))
+    blockYSize = min(blockYSize, ySize)
+    dataType = gdal_array.GDALTypeCodeToNumericTypeCode(band.DataType)
+    floating = numpy.issubdtype(numpy.dtype(dataType), numpy.floating)
+
+    for yOffset in xrange(0, ySize, blockYSize):
+        if progress is not None:
+            progress.setPercentage(int(yOffset * 100 / ySize))
+        height = min(blockYSize, ySize - yOffset)
+        for xOffset in xrange(0, xSize, blockXSize):
+            width = min(blockXSize, xSize - xOffset)
+            data = band.ReadAsArray(xOffset, yOffset, width, height)
+            mask = numpy.zeros(data.shape, bool)
+            if nodata is not None:
+                mask |= data == nodata
+            if floating:
+                mask |= numpy.isnan(data)
+            yield (xOffset, yOffset, numpy.ma.MaskedArray(data, mask=mask))
+    dataset = None
+
+
+class RasterStatistics:
+    """Statistics of raster values, accumulated block by block.
+
+    The mean and variance are updated with the parallel form of
+    Welford's algorithm, so they are numerically stable and two
+    instances filled with different blocks can be merged.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nodata = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, block):
+        """Adds the values of a masked array, as returned by blocks()."""
+        values = block.compressed().astype(numpy.float64)
+        self.nodata += block.size - values.size
+        if values.size == 0:
+            return
+        other = RasterStatistics()
+        other.count = values.size
+        other.sum = values.sum()
+        other.mean = other.sum / values.size
+        other.m2 = ((values - other.mean) ** 2).sum()
+        other.min = values.min()
+        other.max = values.max()
+        self.merge(other)
+
+    def merge(self, other):
+        """Adds the values accumulated by another instance."""
+        self.nodata += other.nodata
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.min = other.min
+            self.max = other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.sum += other.sum
+        self.count = count
+
+    def variance(self):
+        """Returns the sample variance of the values."""
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    def std(self):
+        return math.sqrt(self.variance())
 
 
 def mapToPixel(mX, mY, geoTransform):
@@ -121,3 +230,125 @@ def invertGeoTransform(geoTransform):
                           * geoTransform[4]) * invDet
 
     return outGeoTransform
+
+
+class ZoneStatistics:
+    """Per-zone statistics of the values of a raster, accumulated block
+    by block.
+
+    Each call to add() receives the values of a block along with the
+    zone each value belongs to, and updates count, sum, mean, variance,
+    min and max of all zones at once using sorted reductions. Values
+    are also kept as a sorted array of distinct values with their
+    counts, needed for the number of unique values and the median.
+    Those are only kept until finish() is called for the zone, so
+    memory is bounded by the zones that are still being read.
+    """
+
+    def __init__(self, numZones):
+        self.count = numpy.zeros(numZones, numpy.int64)
+        self.sum = numpy.zeros(numZones)
+        self.mean = numpy.zeros(numZones)
+        self.m2 = numpy.zeros(numZones)
+        self.min = numpy.empty(numZones)
+        self.min.fill(numpy.inf)
+        self.max = numpy.empty(numZones)
+        self.max.fill(-numpy.inf)
+        self.unique = numpy.zeros(numZones, numpy.int64)
+        self.median = numpy.empty(numZones)
+        self.median.fill(numpy.nan)
+        self.values = {}
+
+    def add(self, zones, values):
+        """Adds a block of values.
+
+        @param zones     Zone of each value (1-d integer array)
+        @param values    Values (1-d float array of the same size),
+                         already excluding nodata
+        """
+        if zones.size == 0:
+            return
+        values = values.astype(numpy.float64)
+        order = numpy.lexsort((values, zones))
+        zones = zones[order]
+        values = values[order]
+
+        # Boundaries of each zone and of each distinct value in it
+        zoneChange = numpy.empty(zones.size, bool)
+        zoneChange[0] = True
+        zoneChange[1:] = zones[1:] != zones[:-1]
+        valueChange = zoneChange.copy()
+        valueChange[1:] |= values[1:] != values[:-1]
+        starts = numpy.flatnonzero(zoneChange)
+        ends = numpy.append(starts[1:], zones.size)
+        ids = zones[starts]
+
+        n = ends - starts
+        sums = numpy.add.reduceat(values, starts)
+        means = sums / n
+        m2 = numpy.add.reduceat((values - numpy.repeat(means, n)) ** 2,
+                                starts)
+
+        # Merge with previous blocks (Chan et al. parallel variance)
+        oldN = self.count[ids]
+        total = oldN + n
+        delta = means - self.mean[ids]
+        self.mean[ids] += delta * n / total
+        self.m2[ids] += m2 + delta ** 2 * oldN * n / total
+        self.count[ids] = total
+        self.sum[ids] += sums
+        self.min[ids] = numpy.minimum(self.min[ids], values[starts])
+        self.max[ids] = numpy.maximum(self.max[ids], values[ends - 1])
+
+        distinct = numpy.flatnonzero(valueChange)
+        distinctValues = values[distinct]
+        distinctCounts = numpy.diff(numpy.append(distinct, zones.size))
+        bounds = numpy.searchsorted(distinct, numpy.append(starts,
+                                    zones.size))
+        for (i, zone) in enumerate(ids):
+            zoneValues = distinctValues[bounds[i]:bounds[i + 1]]
+            zoneCounts = distinctCounts[bounds[i]:bounds[i + 1]]
+            if zone in self.values:
+                (oldValues, oldCounts) = self.values[zone]
+                (zoneValues, inverse) = numpy.unique(numpy.concatenate(
+                        (oldValues, zoneValues)), return_inverse=True)
+                zoneCounts = numpy.bincount(inverse,
+                        weights=numpy.concatenate((oldCounts, zoneCounts)))
+            self.values[zone] = (zoneValues, zoneCounts)
+
+    def finish(self, zone):
+        """Computes the statistics that need all the values of the
+        zone, and releases them. No more values should be added to
+        the zone after calling this.
+        """
+        if zone not in self.values:
+            return
+        (zoneValues, zoneCounts) = self.values.pop(zone)
+        self.unique[zone] = zoneValues.size
+        cumulative = numpy.cumsum(zoneCounts)
+        total = cumulative[-1]
+        middle = numpy.searchsorted(cumulative, [(total - 1) // 2,
+                                    total // 2], side='right')
+        self.median[zone] = zoneValues[middle].mean()
+
+    def statistics(self, zone):
+        """Returns a dict with the statistics of a zone, or None if
+        it contains no values.
+        """
+        self.finish(zone)
+        count = int(self.count[zone])
+        if count == 0:
+            return None
+        variance = self.m2[zone] / count
+        return {
+            'min': float(self.min[zone]),
+            'max': float(self.max[zone]),
+            'sum': float(self.sum[zone]),
+            'count': count,
+            'mean': float(self.mean[zone]),
+            'std': float(numpy.sqrt(variance)),
+            'var': float(variance),
+            'unique': int(self.unique[zone]),
+            'range': float(self.max[zone] - self.min[zone]),
+            'median': float(self.median[zone]),
+            }
@@ -25,12 +25,28 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import os
+import uuid
+import struct
+import hashlib
+import sqlite3
+import cPickle
+import numpy
+from collections import OrderedDict
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.AlgorithmStats import AlgorithmStats
+from processing.tools.system import getTempFilename
 
 
-def features(layer):
+# Selections with more than this fraction of the features in a layer
+# are read by iterating over the whole layer and skipping the features
+# that are not selected, instead of requesting each one by its id
+SELECTION_SCAN_RATIO = 0.1
+
+
+def features(layer, attributes=None, geometry=True, rect=None):
     """This returns an iterator over features in a vector layer,
     considering the selection that might exist in the layer, and the
     configuration that indicates whether to use only selected feature
@@ -38,44 +54,177 @@ def features(layer):
 
     This should be used by algorithms instead of calling the QGis API
     directly, to ensure a consistent behaviour across algorithms.
+
+    Algorithms should only request what they need from the data
+    provider. Attributes is a list of field names or zero-based field
+    indices to fetch, or None to fetch all of them. The values of the
+    other fields are null. If geometry is False, features have no
+    geometry. If a rectangle is given, only features whose bounding
+    box intersects it are returned, and the length of the iterator is
+    just an upper bound of the number of features.
     """
     class Features:
 
-        def __init__(self, layer):
+        def __init__(self, layer, request):
             self.layer = layer
+            self.request = request
             self.selection = False
-            self.iter = layer.getFeatures()
             if ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED):
-                selected = layer.selectedFeatures()
+                selected = layer.selectedFeaturesIds()
                 if len(selected) > 0:
                     self.selection = True
-                    self.iter = iter(selected)
+                    self.selected = selected
 
         def __iter__(self):
-            return self.iter
+            count = 0
+            try:
+                for feature in self.fetch():
+                    count += 1
+                    yield feature
+            finally:
+                AlgorithmStats.addFeaturesRead(count)
+
+        def fetch(self):
+            if not self.selection:
+                return self.layer.getFeatures(self.request)
+            if self.request.filterType() == QgsFeatureRequest.FilterRect \
+                    or len(self.selected) > SELECTION_SCAN_RATIO \
+                    * self.layer.featureCount():
+                return self.scanSelection()
+            return self.fetchSelection()
+
+        def scanSelection(self):
+            for feature in self.layer.getFeatures(self.request):
+                if feature.id() in self.selected:
+                    yield feature
+
+        def fetchSelection(self):
+            request = QgsFeatureRequest(self.request)
+            feature = QgsFeature()
+            for fid in sorted(self.selected):
+                request.setFilterFid(fid)
+                if self.layer.getFeatures(request).nextFeature(feature):
+                    yield QgsFeature(feature)
 
         def __len__(self):
             if self.selection:
-                return int(self.layer.selectedFeatureCount())
+                return len(self.selected)
             else:
                 return int(self.layer.featureCount())
 
-    return Features(layer)
+    request = QgsFeatureRequest()
+    if attributes is not None:
+        request.setSubsetOfAttributes([resolveFieldIndex(layer, attr)
+                                      for attr in attributes])
+    if not geometry:
+        request.setFlags(request.flags() | QgsFeatureRequest.NoGeometry)
+    if rect is not None:
+        request.setFilterRect(rect)
+    return Features(layer, request)
+
+
+MEMORY_GEOMETRY_TYPES = {
+    QGis.WKBPoint: 'Point',
+    QGis.WKBPoint25D: 'Point',
+    QGis.WKBLineString: 'LineString',
+    QGis.WKBLineString25D: 'LineString',
+    QGis.WKBPolygon: 'Polygon',
+    QGis.WKBPolygon25D: 'Polygon',
+    QGis.WKBMultiPoint: 'MultiPoint',
+    QGis.WKBMultiPoint25D: 'MultiPoint',
+    QGis.WKBMultiLineString: 'MultiLineString',
+    QGis.WKBMultiLineString25D: 'MultiLineString',
+    QGis.WKBMultiPolygon: 'MultiPolygon',
+    QGis.WKBMultiPolygon25D: 'MultiPolygon',
+    }
+
+
+def memoryLayer(layer, feats, name='layer'):
+    """Returns a new memory layer with the fields, geometry type and
+    CRS of the given layer, containing the given features.
+
+    The source of the returned layer is unique, so once registered
+    with dataobjects.registerTemporaryLayer() it can be used as the
+    value of a parameter, like the filename of a file based layer.
+    """
+    uri = MEMORY_GEOMETRY_TYPES.get(layer.wkbType(), 'None') + '?'
+    if layer.crs().isValid():
+        uri += 'crs=' + layer.crs().authid() + '&'
+    uri += 'uid=' + uuid.uuid4().hex
+    memLayer = QgsVectorLayer(uri, name, 'memory')
+    provider = memLayer.dataProvider()
+    provider.addAttributes(layer.pendingFields().toList())
+    memLayer.updateFields()
+    provider.addFeatures(feats)
+    memLayer.updateExtents()
+    return memLayer
 
 
 def uniqueValues(layer, attribute):
-    """Returns a list of unique values for a given attribute.
+    """Returns a list of unique values for a given attribute, in the
+    order in which they are found.
 
     Attribute can be defined using a field names or a zero-based
     field index. It considers the existing selection.
     """
-    values = []
-    fieldIndex = resolveFieldIndex(layer, attribute)
-    feats = features(layer)
-    for feat in feats:
-        if feat.attributes()[fieldIndex] not in values:
-            values.append(feat.attributes()[fieldIndex])
-    return values
+    return [value for (value, count) in valueCounts(layer, attribute)]
+
+
+def valueCounts(layer, attribute):
+    """Returns a list of (value, count) tuples with the number of
+    features that have each value of a given attribute, in the order
+    in which values are found. Null values are counted together.
+
+    Attribute can be defined using a field names or a zero-based
+    field index. It considers the existing selection.
+    """
+    index = resolveFieldIndex(layer, attribute)
+    counts = OrderedDict()
+    for feat in features(layer, [index], False):
+        value = feat.attributes()[index]
+        key = valueKey(value)
+        if key in counts:
+            counts[key][1] += 1
+        else:
+            counts[key] = [value, 1]
+    return [tuple(item) for item in counts.itervalues()]
+
+
+def valueGroups(layer, attribute):
+    """Returns a list of (value, fids) tuples with the ids of the
+    features that have each value of a given attribute, in the order
+    in which values are found. Null values are grouped together.
+
+    Attribute can be defined using a field names or a zero-based
+    field index. It considers the existing selection.
+    """
+    index = resolveFieldIndex(layer, attribute)
+    groups = OrderedDict()
+    for feat in features(layer, [index], False):
+        value = feat.attributes()[index]
+        key = valueKey(value)
+        if key in groups:
+            groups[key][1].append(feat.id())
+        else:
+            groups[key] = (value, [feat.id()])
+    return groups.values()
+
+
+def valueKey(value):
+    """Returns a hashable key for an attribute value, which is the
+    same for all null values.
+    """
+    if isNull(value):
+        return None
+    try:
+        hash(value)
+    except TypeError:
+        return unicode(value)
+    return value
+
+
+def isNull(value):
+    return value is None or isinstance(value, QPyNullVariant)
 
 
 def resolveFieldIndex(layer, attr):
@@ -107,33 +256,504 @@ def values(layer, *attributes):
     It considers the existing selection.
 
     It assummes fields are numeric or contain values that can be parsed
-    to a number.
+    to a number. Values that cannot be parsed are returned as None.
     """
     ret = {}
-    for attr in attributes:
-        index = resolveFieldIndex(layer, attr)
-        values = []
-        feats = features(layer)
-        for feature in feats:
-            try:
-                v = float(feature.attributes()[index])
-                values.append(v)
-            except:
-                values.append(None)
-        ret[attr] = values
+    for (attr, column) in numericColumns(layer, *attributes).iteritems():
+        ret[attr] = column.tolist()
     return ret
 
 
+NUMERIC_TYPES = [QVariant.Int, QVariant.UInt, QVariant.LongLong,
+                 QVariant.ULongLong, QVariant.Double]
+
+
+def columns(layer, *attributes):
+    """Returns the values of the passed fields in a vector layer, read
+    in a single pass that fetches only those attributes and no
+    geometries.
+
+    Fields can be passed as field names or as zero-based field
+    indices. Returns a dict of NumPy masked arrays, with the passed
+    field identifiers as keys, in which null values are masked.
+    Numeric fields are returned as arrays of floats, and other fields
+    as arrays of objects. It considers the existing selection.
+    """
+    fields = layer.pendingFields()
+    indices = [resolveFieldIndex(layer, attr) for attr in attributes]
+    data = [[] for i in indices]
+    for feat in features(layer, indices, False):
+        attrs = feat.attributes()
+        for (column, i) in zip(data, indices):
+            column.append(attrs[i])
+
+    ret = {}
+    for (attr, i, values) in zip(attributes, indices, data):
+        if fields[i].type() in NUMERIC_TYPES:
+            ret[attr] = numericColumn(values)
+        else:
+            mask = numpy.zeros(len(values), dtype=bool)
+            array = numpy.empty(len(values), dtype=object)
+            for (j, v) in enumerate(values):
+                if isNull(v):
+                    mask[j] = True
+                else:
+                    array[j] = v
+            ret[attr] = numpy.ma.array(array, mask=mask)
+    return ret
+
+
+def numericColumns(layer, *attributes):
+    """Like columns(), but values of all fields are parsed to numbers.
+    Values that cannot be parsed are masked.
+    """
+    ret = columns(layer, *attributes)
+    for (attr, column) in ret.items():
+        ret[attr] = numericColumn(column)
+    return ret
+
+
+def numericColumn(values):
+    """Returns a masked array of floats with the passed values, in
+    which those that cannot be parsed to a number are masked. The
+    values can also be a column returned by columns().
+    """
+    if isinstance(values, numpy.ma.MaskedArray):
+        if values.dtype.kind == 'f':
+            return values
+        values = values.tolist()
+    mask = numpy.zeros(len(values), dtype=bool)
+    array = numpy.zeros(len(values))
+    for (i, v) in enumerate(values):
+        try:
+            array[i] = float(v)
+        except (TypeError, ValueError):
+            mask[i] = True
+    return numpy.ma.array(array, mask=mask)
+
+
 def spatialindex(layer):
     """Creates a spatial index for the passed vector layer.
     """
     idx = QgsSpatialIndex()
-    feats = features(layer)
+    feats = features(layer, attributes=[])
     for ft in feats:
         idx.insertFeature(ft)
     return idx
 
 
+def pointCoordinates(layer, fieldIndex=None, crs=None):
+    """Returns the coordinates of the points in a vector layer, as a
+    NumPy array with x and y columns and a row for each feature, and
+    a list with the values of the given field for each of them, or
+    their ids if no field is given.
+
+    If a CRS is given, coordinates are transformed to it. It considers
+    the existing selection.
+    """
+    transform = None
+    if crs is not None and crs != layer.crs():
+        transform = QgsCoordinateTransform(layer.crs(), crs)
+    coords = []
+    values = []
+    if fieldIndex is None:
+        feats = features(layer, attributes=[])
+    else:
+        feats = features(layer, attributes=[fieldIndex])
+    for feature in feats:
+        point = feature.geometry().asPoint()
+        if transform is not None:
+            point = transform.transform(point)
+        coords.append((point.x(), point.y()))
+        if fieldIndex is None:
+            values.append(feature.id())
+        else:
+            values.append(feature.attributes()[fieldIndex])
+    return (numpy.array(coords, dtype=numpy.float64).reshape((-1, 2)),
+            values)
+
+
+def indexedlayer(layer, maxMemory=None, attributes=None):
+    """Creates a spatial index for the passed vector layer, and keeps
+    the geometries and attributes of its features, reading the layer
+    only once.
+
+    Only the given attributes are kept, as in the features() function.
+
+    Features can then be retrieved by id without querying the data
+    provider again. If the stored features need more than maxMemory
+    megabytes, the remaining ones are written to a temporary file
+    on disk. If maxMemory is None, the value in the Processing
+    configuration is used. A value of 0 means no limit.
+    """
+    if maxMemory is None:
+        try:
+            maxMemory = int(ProcessingConfig.getSetting(
+                    ProcessingConfig.FEATURE_CACHE_SIZE))
+        except (TypeError, ValueError):
+            maxMemory = 0
+    return IndexedLayer(layer, maxMemory, attributes)
+
+
+class IndexedLayer:
+    """A spatial index along with a store of the indexed features.
+
+    It is created by the indexedlayer() function, and can be used in
+    place of the QgsSpatialIndex returned by spatialindex().
+    """
+
+    def __init__(self, layer, maxMemory=0, attributes=None):
+        self.index = QgsSpatialIndex()
+        self.geometries = {}
+        self.attributes = {}
+        self.maxBytes = maxMemory * 1024 * 1024
+        self.usedBytes = 0
+        self.db = None
+        self.dbFilename = None
+        self.bbox = None
+        for feat in features(layer, attributes):
+            self.index.insertFeature(feat)
+            self.store(feat)
+        if self.db is not None:
+            self.db.commit()
+
+    def store(self, feat):
+        geom = feat.geometry()
+        if geom is not None:
+            geom = QgsGeometry(geom)
+            if self.bbox is None:
+                self.bbox = QgsRectangle(geom.boundingBox())
+            else:
+                self.bbox.combineExtentWith(geom.boundingBox())
+        attrs = feat.attributes()
+        if self.maxBytes and self.usedBytes > self.maxBytes:
+            self.spill(feat.id(), geom, attrs)
+            return
+        self.geometries[feat.id()] = geom
+        self.attributes[feat.id()] = attrs
+        if self.maxBytes and geom is not None:
+            # Rough estimate of the memory used by the feature
+            self.usedBytes += geom.wkbSize() + 16 * len(attrs) + 100
+
+    def spill(self, fid, geom, attrs):
+        if self.db is None:
+            self.dbFilename = getTempFilename('sqlite')
+            self.db = sqlite3.connect(self.dbFilename)
+            self.db.execute('CREATE TABLE features (fid INTEGER PRIMARY KEY, '
+                            'wkb BLOB, attrs BLOB)')
+        if geom is not None:
+            wkb = sqlite3.Binary(geom.asWkb())
+        else:
+            wkb = None
+        attrs = [None if isinstance(v, QPyNullVariant) else v for v in attrs]
+        self.db.execute('INSERT INTO features VALUES (?, ?, ?)', (fid, wkb,
+                        sqlite3.Binary(cPickle.dumps(attrs, 2))))
+
+    def intersects(self, rect):
+        return self.index.intersects(rect)
+
+    def extent(self):
+        """Returns the bounding box of all the stored geometries, or
+        None if there are none.
+        """
+        return self.bbox
+
+    def nearestNeighbor(self, point, neighbors):
+        return self.index.nearestNeighbor(point, neighbors)
+
+    def ids(self):
+        """Returns the sorted ids of all the stored features."""
+        fids = self.geometries.keys()
+        if self.db is not None:
+            fids.extend(row[0] for row in
+                        self.db.execute('SELECT fid FROM features'))
+        return sorted(fids)
+
+    def geometry(self, fid):
+        """Returns the geometry of the feature with the given id.
+
+        The returned geometry is shared, so it should not be modified.
+        """
+        if fid in self.geometries:
+            return self.geometries[fid]
+        return self.fetch(fid)[0]
+
+    def attributeValues(self, fid):
+        if fid in self.attributes:
+            return self.attributes[fid]
+        return self.fetch(fid)[1]
+
+    def feature(self, fid):
+        """Returns a new QgsFeature with the geometry and attributes
+        of the feature with the given id.
+        """
+        if fid in self.geometries:
+            (geom, attrs) = (self.geometries[fid], self.attributes[fid])
+        else:
+            (geom, attrs) = self.fetch(fid)
+        feat = QgsFeature(fid)
+        if geom is not None:
+            feat.setGeometry(geom)
+        feat.setAttributes(attrs)
+        return feat
+
+    def fetch(self, fid):
+        if self.db is None:
+            raise KeyError(fid)
+        row = self.db.execute('SELECT wkb, attrs FROM features WHERE fid=?',
+                              (fid, )).fetchone()
+        if row is None:
+            raise KeyError(fid)
+        if row[0] is not None:
+            geom = QgsGeometry()
+            geom.fromWkb(str(row[0]))
+        else:
+            geom = None
+        return (geom, cPickle.loads(str(row[1])))
+
+    def __len__(self):
+        count = len(self.geometries)
+        if self.db is not None:
+            count += self.db.execute(
+                    'SELECT COUNT(*) FROM features').fetchone()[0]
+        return count
+
+    def __del__(self):
+        if self.db is not None:
+            self.db.close()
+            try:
+                os.remove(self.dbFilename)
+            except OSError:
+                pass
+
+
+class CascadedUnion:
+    """Computes the union of a set of geometries.
+
+    Instead of adding each geometry to a single one that keeps
+    growing, geometries are merged in pairs of similar size, which is
+    much faster for a large number of geometries. Only a few partial
+    results are kept in memory, so geometries can be added one by one
+    while iterating over a layer.
+    """
+
+    def __init__(self):
+        # Partial results, as (level, geometry) tuples. A geometry at
+        # a given level is the union of 2^level added geometries
+        self.partials = []
+
+    def add(self, geom):
+        geom = QgsGeometry(geom)
+        level = 0
+        while self.partials and self.partials[-1][0] == level:
+            geom = self.combine(self.partials.pop()[1], geom)
+            level += 1
+        self.partials.append((level, geom))
+
+    def result(self):
+        """Returns the union of all added geometries, or None if no
+        geometry was added.
+        """
+        geom = None
+        for (level, partial) in reversed(self.partials):
+            if geom is None:
+                geom = partial
+            else:
+                geom = self.combine(partial, geom)
+        return geom
+
+    @staticmethod
+    def combine(geomA, geomB):
+        geom = geomA.combine(geomB)
+        if geom is None:
+            raise ValueError('Geometry exception while computing union')
+        return QgsGeometry(geom)
+
+
+def dissolve(feats, fieldIndex=None, progress=None):
+    """Groups features by the value of a given field and computes the
+    union of the geometries in each group, in a single pass over the
+    features.
+
+    If fieldIndex is None, all features are dissolved into a single
+    group. Returns a list of (attributes, geometry) tuples, one for
+    each group, in the order in which groups are found. Attributes
+    are taken from the first feature in each group.
+
+    It raises a ValueError if geometries cannot be combined.
+    """
+    groups = OrderedDict()
+    total = 100.0 / max(1, len(feats))
+    for (current, feat) in enumerate(feats):
+        attrs = feat.attributes()
+        if fieldIndex is None:
+            key = None
+        else:
+            key = unicode(attrs[fieldIndex]).strip()
+        if key not in groups:
+            groups[key] = (attrs, CascadedUnion())
+        groups[key][1].add(feat.geometry())
+        if progress is not None:
+            progress.setPercentage(int(current * total))
+
+    return [(attrs, union.result()) for (attrs, union) in groups.values()]
+
+
+def normalizedWkb(wkb, tolerance=0):
+    """Returns a copy of a WKB geometry in little endian byte order,
+    so equal geometries have equal WKB whatever the byte order used
+    by the data provider.
+
+    If tolerance is greater than 0, coordinates are snapped to a grid
+    with cells of that size, and stored as integers. Geometries are
+    only equal if they have the same vertices in the same order.
+    """
+    parts = []
+    readWkb(str(wkb), 0, tolerance, parts)
+    return ''.join(parts)
+
+
+def readWkb(wkb, offset, tolerance, parts):
+    if wkb[offset] == '\x01':
+        endian = '<'
+    else:
+        endian = '>'
+    (wkbType, ) = struct.unpack_from(endian + 'I', wkb, offset + 1)
+    offset += 5
+    parts.append(struct.pack('<I', wkbType))
+    dims = 2
+    if wkbType & 0x80000000:
+        dims = 3
+    baseType = wkbType & 0xff
+    if baseType == 1:
+        return readCoordinates(wkb, offset, 1, dims, endian, tolerance,
+                               parts)
+    elif baseType == 2:
+        return readRing(wkb, offset, dims, endian, tolerance, parts)
+    elif baseType == 3:
+        (rings, ) = struct.unpack_from(endian + 'I', wkb, offset)
+        offset += 4
+        parts.append(struct.pack('<I', rings))
+        for i in xrange(rings):
+            offset = readRing(wkb, offset, dims, endian, tolerance, parts)
+        return offset
+    elif baseType in (4, 5, 6, 7):
+        (geoms, ) = struct.unpack_from(endian + 'I', wkb, offset)
+        offset += 4
+        parts.append(struct.pack('<I', geoms))
+        for i in xrange(geoms):
+            offset = readWkb(wkb, offset, tolerance, parts)
+        return offset
+    raise ValueError('Unsupported WKB geometry type: %d' % wkbType)
+
+
+def readRing(wkb, offset, dims, endian, tolerance, parts):
+    (points, ) = struct.unpack_from(endian + 'I', wkb, offset)
+    parts.append(struct.pack('<I', points))
+    return readCoordinates(wkb, offset + 4, points, dims, endian,
+                           tolerance, parts)
+
+
+def readCoordinates(wkb, offset, points, dims, endian, tolerance, parts):
+    coords = numpy.frombuffer(wkb, dtype=endian + 'f8', count=points
+                              * dims, offset=offset)
+    if tolerance > 0:
+        coords = numpy.round(coords / tolerance).astype('<i8')
+    else:
+        # Adding zero turns -0.0 into 0.0
+        coords = coords.astype('<f8') + 0.0
+    parts.append(coords.tostring())
+    return offset + 8 * points * dims
+
+
+def geometryHash(geom, tolerance=0):
+    """Returns a hash of the normalized WKB of a geometry, or None if
+    the geometry is empty.
+    """
+    if geom is None or geom.wkbSize() == 0:
+        return None
+    return hashlib.md5(normalizedWkb(geom.asWkb(), tolerance)).digest()
+
+
+class GeometryHashes:
+    """Finds features with equal geometries while iterating over a
+    layer, keeping only the hash of each geometry found and the id of
+    the first feature that had it.
+
+    If the hashes need more than maxMemory megabytes, they are moved
+    to a temporary SQLite database. A value of 0 means no limit, and
+    None the value in the Processing configuration.
+    """
+
+    # Rough estimate of the memory used by each hash in the dictionary
+    ENTRY_BYTES = 150
+
+    def __init__(self, tolerance=0, maxMemory=None):
+        if maxMemory is None:
+            try:
+                maxMemory = int(ProcessingConfig.getSetting(
+                        ProcessingConfig.FEATURE_CACHE_SIZE))
+            except (TypeError, ValueError):
+                maxMemory = 0
+        self.tolerance = tolerance
+        self.maxEntries = maxMemory * 1024 * 1024 // self.ENTRY_BYTES
+        self.hashes = {}
+        self.db = None
+        self.dbFilename = None
+
+    def add(self, feat):
+        """Returns the id of the first feature added with the same
+        geometry as the given one, or None if there is none. Features
+        without geometry are never considered duplicates.
+        """
+        key = geometryHash(feat.geometry(), self.tolerance)
+        if key is None:
+            return None
+        if key in self.hashes:
+            return self.hashes[key]
+        if self.db is not None:
+            row = self.db.execute('SELECT fid FROM hashes WHERE hash=?',
+                                  (sqlite3.Binary(key), )).fetchone()
+            if row is not None:
+                return row[0]
+        self.hashes[key] = feat.id()
+        if self.maxEntries and len(self.hashes) >= self.maxEntries:
+            self.spill()
+        return None
+
+    def spill(self):
+        if self.db is None:
+            self.dbFilename = getTempFilename('sqlite')
+            self.db = sqlite3.connect(self.dbFilename)
+            self.db.execute('PRAGMA synchronous=OFF')
+            self.db.execute('CREATE TABLE hashes (hash BLOB PRIMARY KEY, '
+                            'fid INTEGER)')
+        self.db.executemany('INSERT INTO hashes VALUES (?, ?)',
+                            ((sqlite3.Binary(key), fid) for (key, fid) in
+                            self.hashes.iteritems()))
+        self.db.commit()
+        self.hashes = {}
+
+    def __del__(self):
+        if self.db is not None:
+            self.db.close()
+            try:
+                os.remove(self.dbFilename)
+            except OSError:
+                pass
+
+
+def duplicateGeometries(feats, tolerance=0, maxMemory=None):
+    """Returns an iterator over (feature, fid) tuples for the passed
+    features, in the same order, where fid is the id of the first
+    feature with the same geometry, or None if the feature is the
+    first one with it.
+    """
+    hashes = GeometryHashes(tolerance, maxMemory)
+    for feat in feats:
+        yield (feat, hashes.add(feat))
+
+
 def createUniqueFieldName(fieldName, fieldList):
     def nextname(name):
         num = 1
@@ -228,16 +848,11 @@ def simpleMeasure(geom, method=0, ellips=None, crs=None):
 
 
 def getUniqueValues(layer, fieldIndex):
-    values = []
-    feats = features(layer)
-    for feat in feats:
-        if feat.attributes()[fieldIndex] not in values:
-            values.append(feat.attributes()[fieldIndex])
-    return values
+    return uniqueValues(layer, fieldIndex)
 
 
 def getUniqueValuesCount(layer, fieldIndex):
-    return len(getUniqueValues(layer, fieldIndex))
+    return len(valueCounts(layer, fieldIndex))
 
 
 def combineVectorFields(layerA, layerB):